@@ -0,0 +1,5 @@
+from .AutoException import AutoException
+
+
+class AutoAuthenticationError(AutoException):
+    """HTTP 401/403 - access denied or blocked."""
@@ -0,0 +1,5 @@
+from .AutoException import AutoException
+
+
+class AutoBodyTooLargeError(AutoException):
+    """Response body larger than the tracker's max_body_size; retrying will not help."""
@@ -0,0 +1,8 @@
+class AutoException(Exception):
+    """Base class for errors raised while fetching a tracked URL."""
+
+    def __init__(self, url: str, message: str = "", status: int = None):
+        self.url = url
+        self.status = status
+        self.message = message or self.__class__.__name__
+        super().__init__(f"{url}: {self.message}" if status is None else f"{url}: HTTP {status} {self.message}")
@@ -0,0 +1,5 @@
+from .AutoException import AutoException
+
+
+class AutoNetworkError(AutoException):
+    """Timeout, DNS or connection failure before a response was received."""
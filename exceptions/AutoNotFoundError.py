@@ -0,0 +1,5 @@
+from .AutoException import AutoException
+
+
+class AutoNotFoundError(AutoException):
+    """HTTP 404/410 - the page is gone; retrying will not help."""
@@ -0,0 +1,9 @@
+from .AutoException import AutoException
+
+
+class AutoRateLimitError(AutoException):
+    """HTTP 429 Too Many Requests; retry_after is the server-requested wait in seconds, if any."""
+
+    def __init__(self, url: str, message: str = "", status: int = 429, retry_after: float = None):
+        super().__init__(url, message, status)
+        self.retry_after = retry_after
@@ -0,0 +1,5 @@
+from .AutoException import AutoException
+
+
+class AutoServerError(AutoException):
+    """HTTP 5xx response."""
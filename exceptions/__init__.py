@@ -0,0 +1,17 @@
+from .AutoException import AutoException
+from .AutoAuthenticationError import AutoAuthenticationError
+from .AutoBodyTooLargeError import AutoBodyTooLargeError
+from .AutoNetworkError import AutoNetworkError
+from .AutoNotFoundError import AutoNotFoundError
+from .AutoRateLimitError import AutoRateLimitError
+from .AutoServerError import AutoServerError
+
+__all__ = [
+    "AutoException",
+    "AutoAuthenticationError",
+    "AutoBodyTooLargeError",
+    "AutoNetworkError",
+    "AutoNotFoundError",
+    "AutoRateLimitError",
+    "AutoServerError",
+]
@@ -1,30 +1,60 @@
-import asyncio
+import bisect
+import collections
 import datetime
 import json
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import queue
-import time
 
+from results import ResultTable
+from store import SnapshotStore
 from tracker import ClassTracker
 
+# Таб "Данни" показва само последните снимки; цялата история е в data_store
+DATA_VIEW_SNAPSHOTS = 200
+# Максимален брой съобщения от опашката, обработени за едно извикване на check_queue
+QUEUE_BATCH = 500
+# Списъкът с проследявани се записва до толкова ms след последната промяна (а не след всяка)
+SAVE_TRACKED_DELAY = 1000
+# "Извлечи веднъж" веднага след периодично извличане (или по време на него) не изтегля страниците отново
+FRESH_FOR = 5
+
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, store_path: str = "snapshots.db", tracked_path: str = "gui_tracked.json"):
+        # store_path=None: данните се пазят само в паметта, в компактна ResultTable (виж results.py)
         super().__init__()
         self.title("Проследяване на уеб елементи")
         self.geometry("1100x800")
-        self.tracker = ClassTracker()
-        self.data_store = {}
+        self.tracker = ClassTracker(fresh_for=FRESH_FOR)
+        self.data_store = SnapshotStore(store_path) if store_path is not None else ResultTable()
+        self.tracker.changes.store = self.data_store
+        self.tracker.changes.subscribe(self.on_changes)
         self.running = False
-        self.thread = None
         self.q = queue.Queue()
+        self.shown_snapshots = collections.deque()  # брой редове на всяка показана снимка
+        # Редовете на дървото по URL и по (URL, селектор), за да се пипат само променените
+        self.url_items = {}
+        self.selector_items = {}
+        self.tracked_path = tracked_path  # проследяваните се пазят тук между стартиранията
+        self._save_pending = None
 
         self.create_widgets()
-        self.update_tracked_tree()
+        self.load_tracked()
         self.update_data_display()
         self.check_queue()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        if self._save_pending is not None:
+            self.after_cancel(self._save_pending)
+            self.save_tracked()
+        self.running = False
+        self.tracker.close()
+        self.data_store.close()
+        self.destroy()
 
     def create_widgets(self):
         notebook = ttk.Notebook(self)
@@ -50,7 +80,11 @@ class App(tk.Tk):
         self.entry_selector = ttk.Entry(add_frame, width=60)
         self.entry_selector.grid(row=1, column=1, padx=5, pady=5)
 
-        ttk.Button(add_frame, text="Добави", command=self.add_tracked).grid(row=2, column=1, pady=10, sticky="e")
+        ttk.Label(add_frame, text="Интервал за URL (сек.):").grid(row=2, column=0, sticky="e", padx=5, pady=5)
+        self.entry_url_interval = ttk.Entry(add_frame, width=10)
+        self.entry_url_interval.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+        ttk.Button(add_frame, text="Добави", command=self.add_tracked).grid(row=3, column=1, pady=10, sticky="e")
 
         # Treeview
         tree_frame = ttk.Frame(tab_tracked)
@@ -70,6 +104,8 @@ class App(tk.Tk):
         control_frame.pack(fill="x", padx=10, pady=10)
 
         ttk.Button(control_frame, text="Премахни избран елемент", command=self.remove_selected).pack(side="left", padx=5)
+        ttk.Button(control_frame, text="Импорт на списък", command=self.import_tracked).pack(side="left", padx=5)
+        ttk.Button(control_frame, text="Експорт на списък", command=self.export_tracked).pack(side="left", padx=5)
 
         # Периодично извличане
         periodic_frame = ttk.LabelFrame(tab_tracked, text="Периодично извличане")
@@ -96,6 +132,7 @@ class App(tk.Tk):
         save_frame.pack(pady=10)
 
         ttk.Button(save_frame, text="Запиши в JSON", command=self.save_json).pack(side="left", padx=10)
+        ttk.Button(save_frame, text="Запиши в JSONL", command=self.save_jsonl).pack(side="left", padx=10)
         ttk.Button(save_frame, text="Запиши в CSV", command=self.save_csv).pack(side="left", padx=10)
         ttk.Button(save_frame, text="Зареди от JSON", command=self.load_json).pack(side="left", padx=10)
 
@@ -103,32 +140,139 @@ class App(tk.Tk):
         self.log_text = scrolledtext.ScrolledText(tab_log)
         self.log_text.pack(fill="both", expand=True, padx=10, pady=10)
 
-    def log(self, message):
-        self.log_text.insert(tk.END, message + "\n")
+        ttk.Button(tab_log, text="Покажи метрики", command=self.show_metrics).pack(pady=(0, 10))
+
+    def log(self, *messages):
+        self.log_text.insert(tk.END, "".join(message + "\n" for message in messages))
         self.log_text.see(tk.END)
 
-    def update_tracked_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        for url, selectors in self.tracker.tracked.items():
-            url_item = self.tree.insert("", "end", iid=url, text=url, open=True)
-            for sel in sorted(selectors):
-                self.tree.insert(url_item, "end", text=sel)
+    def show_metrics(self):
+        self.log(self.tracker.metrics.summary())
+
+    def insert_tracked_rows(self, pairs):
+        """Add rows for newly tracked (url, selector) pairs; selectors stay sorted under their URL."""
+        by_url = {}
+        for url, selector in pairs:
+            by_url.setdefault(url, []).append(selector)
+        for url, selectors in by_url.items():
+            selectors.sort()
+            url_item = self.url_items.get(url)
+            if url_item is None:
+                url_item = self.url_items[url] = self.tree.insert("", "end", text=url, open=True)
+                for sel in selectors:
+                    self.selector_items[url, sel] = self.tree.insert(url_item, "end", text=sel)
+                continue
+            shown = [self.tree.item(item, "text") for item in self.tree.get_children(url_item)]
+            for sel in selectors:
+                position = bisect.bisect(shown, sel)
+                shown.insert(position, sel)
+                self.selector_items[url, sel] = self.tree.insert(url_item, position, text=sel)
+
+    def delete_url_row(self, url: str):
+        self.tree.delete(self.url_items.pop(url))
+        for key in [key for key in self.selector_items if key[0] == url]:
+            del self.selector_items[key]
+
+    def delete_selector_row(self, url: str, selector: str):
+        self.tree.delete(self.selector_items.pop((url, selector)))
+        if not self.tree.get_children(self.url_items[url]):
+            self.delete_url_row(url)
+
+    # --- Списък с проследявани: файл ---
+
+    def load_tracked(self):
+        if not os.path.exists(self.tracked_path):
+            return
+        try:
+            added = self.tracker.import_tracked(self.tracked_path)
+        except (OSError, ValueError) as e:
+            self.log(f"Списъкът с проследявани не е зареден: {e}")
+            return
+        self.insert_tracked_rows(added)
+        self.log(f"Заредени {len(added)} селектора за {len(self.tracker.tracked)} URL-а от {self.tracked_path}.")
+
+    def save_tracked_later(self):
+        if self._save_pending is None:
+            self._save_pending = self.after(SAVE_TRACKED_DELAY, self.save_tracked)
+
+    def save_tracked(self):
+        self._save_pending = None
+        try:
+            self.tracker.export_tracked(self.tracked_path)
+        except OSError as e:
+            self.log(f"Грешка при запис на {self.tracked_path}: {e}")
+
+    def import_tracked(self):
+        file = filedialog.askopenfilename(
+            filetypes=[("JSON / CSV / текст", "*.json *.csv *.txt *.json.gz *.csv.gz"), ("Всички файлове", "*.*")]
+        )
+        if not file:
+            return
+        try:
+            added = self.tracker.import_tracked(file)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Грешка", f"Неуспешен импорт: {e}")
+            return
+        self.insert_tracked_rows(added)
+        self.save_tracked_later()
+        self.log(f"Импортирани {len(added)} нови селектора от {file}.")
+
+    def export_tracked(self):
+        file = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON (конфигурация за cli.py)", "*.json"), ("CSV", "*.csv"), ("Текст", "*.txt")],
+        )
+        if file:
+            count = self.tracker.export_tracked(file)
+            self.log(f"Експортирани {count} селектора в: {file}")
 
     def update_data_display(self):
         self.data_text.delete("1.0", tk.END)
-        if self.data_store:
-            self.data_text.insert(tk.END, json.dumps(self.data_store, ensure_ascii=False, indent=4))
+        self.shown_snapshots.clear()
+        snapshots = self.data_store.latest(DATA_VIEW_SNAPSHOTS)
+        if snapshots:
+            self.append_snapshots(snapshots)
         else:
             self.data_text.insert(tk.END, "Все още няма събрани данни.")
 
+    def append_snapshots(self, snapshots):
+        if not self.shown_snapshots:
+            self.data_text.delete("1.0", tk.END)
+        blocks = []
+        for timestamp, data in snapshots:
+            block = json.dumps({timestamp: data}, ensure_ascii=False, indent=4) + "\n"
+            self.shown_snapshots.append(block.count("\n"))
+            blocks.append(block)
+        self.data_text.insert(tk.END, "".join(blocks))
+
+        # Махаме най-старите снимки отгоре, за да не расте текстът безкрайно
+        stale_lines = 0
+        while len(self.shown_snapshots) > DATA_VIEW_SNAPSHOTS:
+            stale_lines += self.shown_snapshots.popleft()
+        if stale_lines:
+            self.data_text.delete("1.0", f"{stale_lines + 1}.0")
+        self.data_text.see(tk.END)
+
     def add_tracked(self):
         url = self.entry_url.get().strip()
         selector = self.entry_selector.get().strip()
         if not url or not selector:
             messagebox.showerror("Грешка", "Моля, попълнете и двете полета.")
             return
+        url_interval = self.entry_url_interval.get().strip()
+        if url_interval:
+            try:
+                url_interval = int(url_interval)
+                if url_interval <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Грешка", "Интервалът за URL трябва да е положително цяло число.")
+                return
 
         status = self.tracker.add(url, selector)
+        if url_interval:
+            self.tracker.set_interval(url, url_interval)
+            self.log(f"Интервал за {url}: {url_interval} секунди.")
         if status == 0:
             self.log(f"Внимание: Селекторът '{selector}' вече съществува за {url}.")
         elif status == 1:
@@ -136,9 +280,13 @@ class App(tk.Tk):
         elif status == 2:
             self.log(f"Добавен селектор '{selector}' към съществуващ URL {url}.")
 
-        self.update_tracked_tree()
+        if status:
+            self.insert_tracked_rows([(url, selector)])
+        if status or url_interval:
+            self.save_tracked_later()
         self.entry_url.delete(0, tk.END)
         self.entry_selector.delete(0, tk.END)
+        self.entry_url_interval.delete(0, tk.END)
 
     def remove_selected(self):
         selected = self.tree.selection()
@@ -153,41 +301,67 @@ class App(tk.Tk):
             url = self.tree.item(item, "text")
             if messagebox.askyesno("Потвърждение", f"Премахване на URL {url} и всички негови селектори?"):
                 self.tracker.remove_url(url)
-                self.tree.delete(item)
+                self.delete_url_row(url)
+                self.save_tracked_later()
                 self.log(f"Премахнат URL: {url}")
         else:  # Селектор
             selector = self.tree.item(item, "text")
             url = self.tree.item(parent, "text")
             if messagebox.askyesno("Потвърждение", f"Премахване на селектор '{selector}' от {url}?"):
                 self.tracker.remove_selector(url, selector)
-                self.tree.delete(item)
+                self.delete_selector_row(url, selector)
+                self.save_tracked_later()
                 self.log(f"Премахнат селектор '{selector}' от {url}")
-                if not self.tree.get_children(parent):
-                    self.tree.delete(parent)
-
-        self.update_tracked_tree()
 
     def check_queue(self):
+        messages, snapshots = [], []
         try:
-            while True:
+            for _ in range(QUEUE_BATCH):
                 item = self.q.get_nowait()
                 if isinstance(item, str):
-                    self.log(item)
+                    messages.append(item)
                 elif isinstance(item, tuple):
-                    timestamp, data = item
-                    self.data_store[timestamp] = data
-                    self.update_data_display()
+                    snapshots.append(item)
         except queue.Empty:
             pass
-        self.after(200, self.check_queue)
+
+        # Един insert на партида вместо по един на съобщение/снимка
+        if messages:
+            self.log(*messages)
+        if snapshots:
+            self.append_snapshots(snapshots[-DATA_VIEW_SNAPSHOTS:])
+        self.after(10 if self.q.qsize() else 200, self.check_queue)
+
+    def cache_summary(self):
+        cache = self.tracker.page_cache
+        summary = f"Кеш: {cache.hits}/{cache.requests} непроменени страници ({cache.hit_rate:.0%})."
+        errors = self.tracker.error_summary()
+        if errors:
+            summary += " Грешки: " + ", ".join(f"{name} x{count}" for name, count in sorted(errors.items()))
+        return summary
+
+    def record(self, timestamp, url, result):
+        # Записват се само keyframe-ове и делти; в таба "Данни" се показват само промените
+        changes = self.tracker.changes.observe(timestamp, url, result)
+        if changes:
+            changed = {change.selector for change in changes}
+            self.q.put((timestamp, {url: {s: texts for s, texts in result.items() if s in changed}}))
+
+    def on_changes(self, changes):
+        for change in changes:
+            self.q.put(f"[{change.timestamp}] Промяна в {change.url} '{change.selector}': "
+                       f"+{len(change.added)} -{len(change.removed)} ~{len(change.changed)}")
+
+    def extract_to_store(self, timestamp):
+        return self.tracker.extract_all(on_result=lambda url, result: self.record(timestamp, url, result))
 
     def single_extract(self):
         timestamp = datetime.datetime.now().isoformat()
         self.q.put(f"[{timestamp}] Ръчно извличане започна...")
         try:
-            data = asyncio.run(self.tracker.extract_all_async())
-            self.q.put((timestamp, data))
-            self.q.put(f"[{timestamp}] Ръчно извличане завърши успешно.")
+            self.extract_to_store(timestamp)
+            self.q.put(f"[{timestamp}] Ръчно извличане завърши успешно. {self.cache_summary()}")
+            self.q.put(self.tracker.metrics.summary())
         except Exception as e:
             self.q.put(f"[{timestamp}] Грешка при ръчно извличане: {e}")
 
@@ -197,17 +371,11 @@ class App(tk.Tk):
             return
         threading.Thread(target=self.single_extract, daemon=True).start()
 
-    def periodic_task(self, interval):
-        while self.running:
-            timestamp = datetime.datetime.now().isoformat()
-            self.q.put(f"[{timestamp}] Периодично извличане започна...")
-            try:
-                data = asyncio.run(self.tracker.extract_all_async())
-                self.q.put((timestamp, data))
-                self.q.put(f"[{timestamp}] Периодично извличане завърши.")
-            except Exception as e:
-                self.q.put(f"[{timestamp}] Грешка при периодично извличане: {e}")
-            time.sleep(interval)
+    def on_scheduled_result(self, timestamp, url, result):
+        # Извиква се от loop-а на tracker-а за всеки URL, когато дойде неговият срок
+        self.record(timestamp, url, result)
+        if result is None:
+            self.q.put(f"[{timestamp}] Грешка при периодично извличане на {url}: {self.tracker.last_errors.get(url)}")
 
     def start_periodic(self):
         if self.running:
@@ -227,34 +395,48 @@ class App(tk.Tk):
         self.running = True
         self.btn_start.config(state="disabled")
         self.btn_stop.config(state="normal")
-        self.thread = threading.Thread(target=self.periodic_task, args=(interval,), daemon=True)
-        self.thread.start()
-        self.log(f"Периодично извличане стартирано с интервал {interval} секунди.")
+        self.tracker.start_schedule(self.on_scheduled_result, interval)
+        self.log(f"Периодично извличане стартирано с интервал {interval} секунди (URL-и със собствен интервал го запазват).")
 
     def stop_periodic(self):
         self.running = False
+        self.tracker.stop_schedule()
         self.btn_start.config(state="normal")
         self.btn_stop.config(state="disabled")
         self.log("Периодичното извличане е спряно.")
 
     def save_json(self):
-        file = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON файлове", "*.json")])
+        file = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON файлове", "*.json"), ("Компресиран JSON", "*.json.gz")]
+        )
         if file:
-            self.tracker.save_to_json(self.data_store, file)
+            self.tracker.save_to_json(self.data_store.states(), file)
             self.log(f"Данните са записани в JSON: {file}")
 
+    def save_jsonl(self):
+        file = filedialog.asksaveasfilename(
+            defaultextension=".jsonl.gz", filetypes=[("Компресиран JSON Lines", "*.jsonl.gz"), ("JSON Lines", "*.jsonl")]
+        )
+        if file:
+            lines = self.tracker.save_to_jsonl(self.data_store.states(), file)
+            self.log(f"Данните са записани в JSON Lines ({lines} реда): {file}")
+
     def save_csv(self):
-        file = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV файлове", "*.csv")])
+        file = filedialog.asksaveasfilename(
+            defaultextension=".csv", filetypes=[("CSV файлове", "*.csv"), ("Компресиран CSV", "*.csv.gz")]
+        )
         if file:
-            self.tracker.save_to_csv(self.data_store, file)
-            self.log(f"Данните са записани в CSV: {file}")
+            rows = self.tracker.save_to_csv(self.data_store.states(), file)
+            self.log(f"Данните са записани в CSV ({rows} реда): {file}")
 
     def load_json(self):
-        file = filedialog.askopenfilename(filetypes=[("JSON файлове", "*.json")])
+        file = filedialog.askopenfilename(
+            filetypes=[("JSON / JSON Lines", "*.json *.jsonl *.json.gz *.jsonl.gz"), ("Всички файлове", "*.*")]
+        )
         if file:
             try:
-                self.data_store = self.tracker.load_from_json(file)
+                self.data_store.update(self.tracker.iter_from_file(file))
                 self.update_data_display()
                 self.log(f"Данните са заредени от: {file}")
             except Exception as e:
-                messagebox.showerror("Грешка", f"Неуспешно зареждане: {e}")
\ No newline at end of file
+                messagebox.showerror("Грешка", f"Неуспешно зареждане: {e}")
@@ -0,0 +1,247 @@
+import datetime
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # незадължителна зависимост; без нея се компресира със zlib
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash    BLOB PRIMARY KEY,  -- blake2b на несвитото тяло
+    segment INTEGER NOT NULL,
+    offset  INTEGER NOT NULL,
+    length  INTEGER NOT NULL,  -- байтове в сегмента (компресирани)
+    size    INTEGER NOT NULL,  -- байтове на несвитото тяло (UTF-8)
+    codec   TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    url       TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    hash      BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_url_timestamp ON pages (url, timestamp);
+"""
+
+SEGMENT_SIZE = 64 * 2 ** 20
+
+logger = logging.getLogger(__name__)
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This archive holds zstd blobs; install zstandard to read them")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def read_blob(path: str, offset: int, length: int, codec: str) -> str:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return decompress(f.read(length), codec).decode("utf-8")
+
+
+class HtmlArchive:
+    """Content-addressed archive of fetched pages: every distinct body is stored once.
+
+    Bodies are compressed (zstd if installed, else zlib) and appended to segment files of about
+    `segment_size` bytes; index.db maps each (url, timestamp) to the hash of its body. add() only
+    queues the page: hashing, compression and writes happen on a background thread. The fetch loop
+    calls add(block=False), which drops the page (counted in stats()["dropped"]) rather than wait
+    when `max_pending` pages are already queued. Write errors are logged and raised by flush().
+    """
+
+    def __init__(self, path: str = "html_archive", segment_size: int = SEGMENT_SIZE, max_pending: int = 256):
+        self.path = path
+        self.segment_size = segment_size
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        segments = sorted(int(name[8:-5]) for name in os.listdir(path)
+                          if name.startswith("segment-") and name.endswith(".pack"))
+        self._segment = segments[-1] if segments else 1
+        self._file = open(self.segment_path(self._segment), "ab")
+
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self.dropped = 0  # страници, изпуснати при пълна опашка (add(block=False))
+        self.errors = 0  # неуспешни записи
+        self._writer = threading.Thread(target=self._write_loop, name="html-archive", daemon=True)
+        self._writer.start()
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"segment-{segment:06d}.pack")
+
+    # --- Запис ---
+
+    def add(self, url: str, html: str, timestamp: str = None, block: bool = True) -> bool:
+        """Queue one fetched page (str or decoding.Body) for archiving; False if it was dropped.
+
+        With block=False (the event loop) a full queue drops the page instead of waiting for the disk.
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now().isoformat()
+        try:
+            self._queue.put((url, timestamp, html), block)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning("HTML archive queue is full; dropping pages (see stats()['dropped'])")
+            return False
+        return True
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:  # записва се в лога и се вдига при следващия flush()
+                logger.exception("Archiving %s failed", item[0])
+                self.errors += 1
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, url: str, timestamp: str, html: str):
+        # Body от тракера се декодира (ако не е UTF-8) тук, в нишката за запис, а не в loop-а
+        body = html.encode("utf-8") if isinstance(html, str) else html.utf8()
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        row = None
+        if known is None:
+            data = compress(body, self.codec)
+            if self._file.tell() and self._file.tell() + len(data) > self.segment_size:
+                self._file.close()
+                self._segment += 1
+                self._file = open(self.segment_path(self._segment), "ab")
+            offset = self._file.tell()
+            self._file.write(data)
+            # Тялото е в сегмента, преди индексът да сочи към него
+            self._file.flush()
+            row = (digest, self._segment, offset, len(data), len(body), self.codec)
+        with self._lock, self._conn:
+            if row is not None:
+                self._conn.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", row)
+            self._conn.execute("INSERT INTO pages VALUES (?, ?, ?)", (url, timestamp, digest))
+
+    def flush(self):
+        """Wait until every queued page is written."""
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._file.close()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "HtmlArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Четене ---
+
+    def read(self, digest: bytes) -> str:
+        """The body stored under `digest`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length, codec FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(digest.hex())
+        segment, offset, length, codec = row
+        return read_blob(self.segment_path(segment), offset, length, codec)
+
+    def get(self, url: str, timestamp: str = None) -> str:
+        """The page of `url` as fetched at `timestamp` (the latest one at or before it); None if missing."""
+        sql = "SELECT hash FROM pages WHERE url = ?"
+        params = [url]
+        if timestamp is not None:
+            sql += " AND timestamp <= ?"
+            params.append(timestamp)
+        with self._lock:
+            row = self._conn.execute(sql + " ORDER BY timestamp DESC LIMIT 1", params).fetchone()
+        return None if row is None else self.read(row[0])
+
+    @staticmethod
+    def _where(url: str = None, start: str = None, end: str = None):
+        clauses, params = [], []
+        if url is not None:
+            clauses.append("url = ?")
+            params.append(url)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def entries(self, url: str = None, start: str = None, end: str = None):
+        """Yield (url, timestamp, hash) in timestamp order, optionally for one URL and a [start, end) range."""
+        where, params = self._where(url, start, end)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url, timestamp, hash FROM pages{where} ORDER BY timestamp, rowid", params
+            ).fetchall()
+        yield from rows
+
+    def scan(self, url: str = None, start: str = None, end: str = None):
+        """Yield (url, timestamp, hash, location) by URL, then time; read_blob(*location) loads the body.
+
+        Reads through its own connection, so a long scan neither loads the index into memory nor
+        blocks the writer.
+        """
+        where, params = self._where(url, start, end)
+        sql = (f"SELECT url, timestamp, hash, segment, offset, length, codec FROM pages JOIN blobs USING (hash)"
+               f"{where} ORDER BY url, timestamp, pages.rowid")
+        conn = sqlite3.connect(os.path.join(self.path, "index.db"))
+        try:
+            for url, timestamp, digest, segment, offset, length, codec in conn.execute(sql, params):
+                yield url, timestamp, digest, (self.segment_path(segment), offset, length, codec)
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Pages, distinct bodies, their raw size and the bytes they take in the segments; dropped and failed pages."""
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, raw, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM blobs"
+            ).fetchone()
+            fetched = self._conn.execute(
+                "SELECT COALESCE(SUM(blobs.size), 0) FROM pages JOIN blobs USING (hash)"
+            ).fetchone()[0]
+        return {"pages": pages, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored, "fetched_bytes": fetched,
+                "dropped": self.dropped, "errors": self.errors}
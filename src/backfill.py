@@ -0,0 +1,295 @@
+"""Re-extract saved pages with (new or fixed) selectors, in parallel, into the snapshot format.
+
+    python backfill.py html_archive --config tracked.json -o history.jsonl
+    python backfill.py html_archive -s ".css-1sw7q4x h6" --url https://www.olx.bg/... -o snapshots.db
+    python backfill.py saved_htmls --config tracked.json -o history.jsonl   # old one-file-per-page layout
+
+The source is an HtmlArchive directory (archive.py) or a directory of .html files written by the old
+save_fetched_html(). Output is JSON Lines (one {"timestamp", "url", "result"} record per page) or a
+SnapshotStore (.db). Running the same command again after an interruption resumes where it stopped.
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from archive import HtmlArchive, read_blob
+from engine import extract_page
+
+# Име на файл от старото save_fetched_html(): <URL без схема и забранени знаци>_<timestamp с "_">.html
+LEGACY_NAME_RE = re.compile(r"^(.*)_(\d{4}-\d{2}-\d{2}[T ]\d{2})_(\d{2})_(\d{2})(?:_(\d+))?\.html$")
+
+BATCH_SIZE = 32
+
+
+def safe_name(url: str) -> str:
+    """The file name prefix the old save_fetched_html() used for `url`."""
+    name = url.removeprefix("https://").removeprefix("http://")
+    for invalid in r'\/:*?"<>|':
+        name = name.replace(invalid, "_")
+    return name[:150] or "unknown_url"
+
+
+def legacy_pages(folder: str, urls=(), start: str = None, end: str = None):
+    """Yield (url, timestamp, key, location) for the .html files in `folder`, by URL, then time.
+
+    The original URL cannot be recovered from a file name; names of `urls` are mapped back to them,
+    other files keep the name prefix as their URL.
+    """
+    names = {safe_name(url): url for url in urls}
+    found = []
+    for entry in os.scandir(folder):
+        match = LEGACY_NAME_RE.match(entry.name)
+        if match is None:
+            continue
+        prefix, day_hour, minutes, seconds, fraction = match.groups()
+        timestamp = f"{day_hour}:{minutes}:{seconds}" + (f".{fraction}" if fraction else "")
+        if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+            continue
+        found.append((names.get(prefix, prefix), timestamp, entry.path))
+    found.sort()
+    for url, timestamp, path in found:
+        yield url, timestamp, path, path
+
+
+def archive_pages(path: str, url: str = None, start: str = None, end: str = None):
+    with HtmlArchive(path) as archive:
+        yield from archive.scan(url, start, end)
+
+
+def load_page(location) -> str:
+    if isinstance(location, str):
+        with open(location, "r", encoding="utf-8") as f:
+            return f.read()
+    return read_blob(*location)
+
+
+def extract_batch(engine_name: str, pages: list) -> list:
+    """Picklable worker entry point: [(location, selectors)] -> results; unreadable pages give None."""
+    results = []
+    for location, selectors in pages:
+        try:
+            html = load_page(location)
+        except (OSError, ValueError, zlib.error):
+            results.append(None)
+            continue
+        results.append(extract_page(engine_name, html, selectors))
+    return results
+
+
+# --- Изход ---
+
+class JsonlOutput:
+    """Appends records in processing order, so the last complete line is where a rerun resumes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last = self._recover()  # (url, timestamp) на последния изцяло записан ред
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _recover(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            tail, position = b"", end
+            while position > 0 and tail.count(b"\n") < 2:
+                step = min(1 << 16, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+            complete = tail.rfind(b"\n") + 1
+            # Ред, записан наполовина при прекъсване, се изрязва и извлича наново
+            if position + complete != end:
+                f.truncate(position + complete)
+        lines = tail[:complete].splitlines()
+        if not lines:
+            return None
+        record = json.loads(lines[-1])
+        return record["url"], record["timestamp"]
+
+    def done(self, url: str, timestamp: str) -> bool:
+        return self.last is not None and (url, timestamp) <= self.last
+
+    def write(self, results: list):
+        for timestamp, url, result in results:
+            record = {"timestamp": timestamp, "url": url, "result": result}
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class StoreOutput:
+    """Writes each batch in one transaction; results already in the store are skipped."""
+
+    def __init__(self, path: str):
+        from store import SnapshotStore
+
+        self.store = SnapshotStore(path)
+        self._url = None
+        self._done = set()
+
+    def done(self, url: str, timestamp: str) -> bool:
+        # Страниците идват по URL, затова в паметта е само историята на текущия URL
+        if url != self._url:
+            self._url = url
+            self._done = {row_timestamp for row_timestamp, _ in self.store.keys(url=url)}
+        return timestamp in self._done
+
+    def write(self, results: list):
+        self.store.add_results(results)
+
+    def close(self):
+        self.store.close()
+
+
+def open_output(path: str):
+    if path.endswith(".db"):
+        return StoreOutput(path)
+    if path.endswith(".jsonl"):
+        return JsonlOutput(path)
+    raise ValueError(f"{path}: backfill writes .jsonl or a SnapshotStore .db (compress afterwards)")
+
+
+# --- Backfill ---
+
+def backfill(source: str, output: str, selectors=(), tracked: dict = None, url: str = None, start: str = None,
+             end: str = None, engine: str = "lxml", workers: int = None, batch_size: int = BATCH_SIZE,
+             progress=None) -> dict:
+    """Extract every saved page in `source` within [start, end) and append the results to `output`.
+
+    A page gets the selectors `tracked` lists for its URL plus `selectors`; pages with none are
+    skipped. Parsing is spread over `workers` processes (default: all cores), a few batches at a time;
+    a page whose body is the same as the previous page of its URL reuses that result. progress(counts)
+    is called after every written batch. Returns counts of pages written, parsed, skipped and failed.
+    """
+    tracked = tracked or {}
+    selectors = tuple(selectors)
+    selector_sets = {}
+
+    def selectors_for(page_url: str) -> tuple:
+        if page_url not in selector_sets:
+            combined = tuple(dict.fromkeys([*tracked.get(page_url, ()), *selectors]))
+            try:
+                extract_page(engine, "<html></html>", combined)  # невалиден селектор - грешка още тук
+            except Exception as e:
+                raise ValueError(f"Invalid selector for {page_url}: {e}") from e
+            selector_sets[page_url] = combined
+        return selector_sets[page_url]
+
+    if os.path.exists(os.path.join(source, "index.db")):
+        pages = archive_pages(source, url, start, end)
+    else:
+        pages = legacy_pages(source, tracked, start, end)
+        if url is not None:
+            pages = (page for page in pages if page[0] == url)
+
+    counts = {"pages": 0, "parsed": 0, "skipped": 0, "failed": 0}
+    sink = open_output(output)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    window = collections.deque()  # (future, [(url, timestamp, индекс в партидата или None)])
+    previous = None  # резултатът на последната записана страница
+
+    def drain(keep: int):
+        nonlocal previous
+        while len(window) > keep:
+            future, entries = window.popleft()
+            results = future.result()
+            rows = []
+            for page_url, timestamp, position in entries:
+                if position is not None:
+                    previous = results[position]
+                    counts["failed"] += previous is None
+                rows.append((timestamp, page_url, previous))
+            sink.write(rows)
+            counts["pages"] += len(rows)
+            if progress is not None:
+                progress(counts)
+
+    try:
+        entries, batch = [], []
+        last = None  # (url, ключ на тялото) на предишната страница
+        for page_url, timestamp, key, location in pages:
+            page_selectors = selectors_for(page_url)
+            if not page_selectors or sink.done(page_url, timestamp):
+                counts["skipped"] += 1
+                last = None
+                continue
+            if last == (page_url, key):
+                entries.append((page_url, timestamp, None))
+            else:
+                entries.append((page_url, timestamp, len(batch)))
+                batch.append((location, page_selectors))
+            last = page_url, key
+            if len(batch) >= batch_size:
+                window.append((executor.submit(extract_batch, engine, batch), entries))
+                counts["parsed"] += len(batch)
+                entries, batch = [], []
+                drain(2 * workers)
+        if entries:
+            window.append((executor.submit(extract_batch, engine, batch), entries))
+            counts["parsed"] += len(batch)
+        drain(0)
+    finally:
+        for future, _ in window:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+        sink.close()
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="HtmlArchive directory or a directory of saved .html pages")
+    parser.add_argument("-o", "--output", required=True, help="JSON Lines file (.jsonl) or SnapshotStore (.db)")
+    parser.add_argument("--config", help="tracked.json: apply each URL's selectors to its pages")
+    parser.add_argument("-s", "--selector", action="append", default=[], help="selector for every page (repeatable)")
+    parser.add_argument("--url", help="only pages of this URL")
+    parser.add_argument("--start", help="only pages fetched at or after this ISO timestamp")
+    parser.add_argument("--end", help="only pages fetched before this ISO timestamp")
+    parser.add_argument("--engine", choices=["lxml", "bs4"], default="lxml")
+    parser.add_argument("--workers", type=int, help="parse processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    from cli import load_config, log
+
+    tracked = {}
+    try:
+        if args.config:
+            tracked = load_config(args.config)["tracked"]
+    except (OSError, ValueError) as e:
+        log(f"Грешка в конфигурацията: {e}")
+        return 2
+    if not tracked and not args.selector:
+        parser.error("give selectors with --config and/or --selector")
+
+    started = time.perf_counter()
+    reported = [0]
+
+    def progress(counts):
+        if counts["pages"] - reported[0] >= 10_000:
+            reported[0] = counts["pages"]
+            log(f"{counts['pages']} страници ({counts['pages'] / (time.perf_counter() - started):.0f}/s)")
+
+    try:
+        counts = backfill(args.source, args.output, args.selector, tracked, args.url, args.start, args.end,
+                          args.engine, args.workers, progress=progress)
+    except ValueError as e:
+        log(f"Грешка: {e}")
+        return 2
+    log(f"Записани {counts['pages']} страници за {time.perf_counter() - started:.1f} s "
+        f"(парсвани {counts['parsed']}, пропуснати {counts['skipped']}, неуспешни {counts['failed']}).")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+import bootstrap  # noqa: F401 - бенчмарковете се пускат с python -m benchmarks.<name> от src/
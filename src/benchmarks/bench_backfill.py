@@ -0,0 +1,71 @@
+"""Backfill benchmark: the old page-by-page loop over saved_htmls/ files vs backfill() over an archive.
+
+    cd src
+    python -m benchmarks.bench_backfill [--urls 10] [--ticks 200] [--change-every 6] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from archive import HtmlArchive
+from backfill import LEGACY_NAME_RE, backfill, safe_name
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from tracker import ClassTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=200, help="saved pages per URL (5 minutes apart)")
+    parser.add_argument("--change-every", type=int, default=6, help="ticks between changes of a page's body")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    bodies = [make_page(40, 200, seed=i) for i in range(20)]
+    urls = [f"https://www.olx.bg/cars/{i}/" for i in range(args.urls)]
+    pages = args.urls * args.ticks
+    print(f"{pages} saved pages ({args.urls} URLs x {args.ticks} ticks, body changes every {args.change_every})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "saved_htmls")
+        os.makedirs(folder)
+        with HtmlArchive(os.path.join(tmp, "archive")) as archive:
+            for tick in range(args.ticks):
+                timestamp = f"2026-01-{1 + tick // 288:02d}T{tick % 288 // 12:02d}:{tick % 12 * 5:02d}:00"
+                for i, url in enumerate(urls):
+                    html = bodies[(i + tick // args.change_every) % len(bodies)]
+                    archive.add(url, html, timestamp)
+                    name = f"{safe_name(url)}_{timestamp.replace(':', '_')}.html"
+                    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+                        f.write(html)
+            archive.flush()
+            stats = archive.stats()
+        files = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+        print(f"  disk: {files / 2 ** 20:.1f} MB in {pages} files vs "
+              f"{stats['stored_bytes'] / 2 ** 20:.1f} MB archive ({stats['blobs']} distinct bodies)")
+
+        # Досегашният начин: файл по файл през extract_from_html в един процес
+        tracker = ClassTracker()
+        for url in urls:
+            for selector in OLX_SELECTORS:
+                tracker.add(url, selector)
+        names = {safe_name(url): url for url in urls}
+        start = time.perf_counter()
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                tracker.extract_from_html(names[LEGACY_NAME_RE.match(name).group(1)], f.read())
+        seconds = time.perf_counter() - start
+        tracker.close()
+        print(f"  {'page by page':22s} {seconds:8.2f} s  {pages / seconds:8.1f} pages/s")
+
+        for label, source in (("backfill, files", folder), ("backfill, archive", os.path.join(tmp, "archive"))):
+            output = os.path.join(tmp, f"{label.split(', ')[1]}.jsonl")
+            start = time.perf_counter()
+            counts = backfill(source, output, OLX_SELECTORS, workers=args.workers)
+            seconds = time.perf_counter() - start
+            print(f"  {label:22s} {seconds:8.2f} s  {pages / seconds:8.1f} pages/s  (parsed {counts['parsed']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Overlapping manual + periodic extraction: every URL fetched twice vs shared in-flight fetches.
+
+Two threads call extract_all() at the same moment, as "Извлечи веднъж" does while a periodic cycle runs.
+
+    cd src
+    python -m benchmarks.bench_coalesce [--urls 200] [--latency 0.05]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.server import StandInServer
+from tracker import ClassTracker
+
+
+class UncoalescedTracker(ClassTracker):
+    """The tracker before single-flight: each call does its own fetch and parse."""
+
+    async def extract_url_async(self, session, url, timeout=10):
+        return await self._extract_url(session, url, frozenset(self.tracked[url]), timeout)
+
+
+def overlapping(tracker_class, server, urls: int) -> tuple:
+    tracker = tracker_class(parse_mode="thread", host_rate=1000, host_burst=1000)
+    for i in range(urls):
+        tracker.add(f"{server.base}/cars/{i}/", "h6")
+    try:
+        tracker.extract_all()  # загряване: сесия, връзки, pool
+        before = server.statuses[200]
+        start = time.perf_counter()
+        threads = [threading.Thread(target=tracker.extract_all) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, server.statuses[200] - before
+    finally:
+        tracker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StandInServer(pages=1, latency=args.latency) as server:
+        print(f"2 overlapping extract_all() over {args.urls} URLs")
+        for label, tracker_class in (("separate fetches", UncoalescedTracker), ("single-flight", ClassTracker)):
+            seconds, fetched = overlapping(tracker_class, server, args.urls)
+            print(f"  {label:18s} {seconds:6.2f} s  {fetched:5d} pages fetched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Response decoding: aiohttp's response.text() vs the tracker's decoding layer (Python decode or bytes to lxml).
+
+Pages are gzip-compressed and served without a charset in Content-Type, like many hosts do;
+--no-meta also drops <meta charset>, so the encoding is detected once and then remembered for the host.
+
+    cd src
+    python -m benchmarks.bench_decode [--cards 400] [--padding-kb 1000] [--fetches 30] [--no-meta]
+"""
+import argparse
+import asyncio
+import gzip
+import threading
+import time
+
+from aiohttp import web
+
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from engine import extract_page
+from tracker import ClassTracker
+
+
+def serve(body: bytes, headers: dict) -> str:
+    """Serve `body` with `headers` on every path from a daemon thread; returns the base URL."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def handler(request):
+        return web.Response(body=body, headers=headers)
+
+    async def start():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    return asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=400)
+    parser.add_argument("--padding-kb", type=int, default=1000)
+    parser.add_argument("--fetches", type=int, default=30)
+    parser.add_argument("--no-meta", action="store_true", help="no <meta charset> in the page")
+    args = parser.parse_args()
+
+    page = make_page(args.cards, args.padding_kb)
+    if args.no_meta:
+        page = page.replace('<meta charset="utf-8">', "")
+    page = page.encode("utf-8")
+    url = serve(gzip.compress(page), {"Content-Type": "text/html", "Content-Encoding": "gzip"}) + "/cars/"
+    print(f"{args.fetches} fetches of a {len(page) / 2 ** 20:.1f} MB page ({len(gzip.compress(page)) / 2 ** 20:.2f} MB gzip)")
+
+    tracker = ClassTracker(parse_mode="inline", host_rate=1000, host_burst=1000)
+    tracker.add(url, OLX_SELECTORS[0])
+
+    async def text_then_parse():
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                body = await response.read()
+                start = time.perf_counter()
+                html = body.decode(response.get_encoding())  # каквото прави response.text()
+                decoded = time.perf_counter() - start
+        return extract_page("lxml", html, OLX_SELECTORS), decoded
+
+    async def layer_then_parse(native: bool):
+        decode = tracker.metrics.phases["decode"]
+        before = decode.sum
+        async with tracker.session_scope() as session:
+            _, html, _ = await tracker.fetch_page(session, url, native=native)
+        return extract_page("lxml", html, OLX_SELECTORS), decode.sum - before
+
+    modes = {
+        "response.text()": text_then_parse,
+        "decoding layer, str": lambda: layer_then_parse(False),
+        "decoding layer, bytes to lxml": lambda: layer_then_parse(True),
+    }
+    try:
+        for label, job in modes.items():
+            tracker.run(job())  # загряване
+            cpu, start = time.process_time(), time.perf_counter()
+            decoding = 0.0
+            for _ in range(args.fetches):
+                result, decoded = tracker.run(job())
+                decoding += decoded
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - start
+            print(f"  {label:30s} {wall / args.fetches * 1000:7.1f} ms/page  CPU {cpu / args.fetches * 1000:7.1f} ms/page"
+                  f"  decode {decoding / args.fetches * 1000:6.2f} ms/page  {len(result[OLX_SELECTORS[0]])} prices")
+        snapshot = tracker.metrics.snapshot()
+        print(f"  charset sources: {snapshot['charsets']}; {snapshot['decoded_bytes'] / 2 ** 20:.0f} MB decoded "
+              f"in Python, {snapshot['native_bytes'] / 2 ** 20:.0f} MB by lxml")
+    finally:
+        tracker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Extraction engine benchmark: BeautifulSoup vs lxml with compiled selectors.
+
+    cd src
+    python -m benchmarks.bench_engine [--pages 50] [--cards 40] [--padding-kb 200]
+"""
+import argparse
+import time
+
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from engine import get_engine
+
+
+def run(engine_name: str, pages: list, selectors: list) -> float:
+    engine = get_engine(engine_name)
+    start = time.perf_counter()
+    for html in pages:
+        engine.extract(html, selectors)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=40)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = [make_page(args.cards, args.padding_kb, seed=i) for i in range(args.pages)]
+    size_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    assert get_engine("lxml").extract(pages[0], OLX_SELECTORS) == get_engine("bs4").extract(pages[0], OLX_SELECTORS)
+
+    timings = {name: run(name, pages, OLX_SELECTORS) for name in ("bs4", "lxml")}
+    print(f"{args.pages} pages x {args.cards} cards, ~{size_kb:.0f} KB/page, {len(OLX_SELECTORS)} selectors")
+    for name, seconds in timings.items():
+        print(f"  {name:5s} {seconds:8.3f} s  {args.pages / seconds:8.1f} pages/s")
+    print(f"  speedup x{timings['bs4'] / timings['lxml']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
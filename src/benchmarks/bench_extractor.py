@@ -0,0 +1,56 @@
+"""Structured OLX card extraction: per-card BeautifulSoup vs one lxml parse per page.
+
+    cd src
+    python -m benchmarks.bench_extractor [--pages 50] [--cards 40] [--padding-kb 200]
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.olx_pages import make_page
+from extractor import Extractor
+
+SOURCE_URL = "https://www.olx.bg/avtomobili-kamioni-i-moto/"
+
+
+def soup_cards(extractor: Extractor, html: str) -> list:
+    ads = []
+    for card in BeautifulSoup(html, "lxml").select("div.css-1sw7q4x"):
+        price = extractor.get_price(card)
+        if price != "N/A":
+            ads.append((price, extractor.get_product(card), extractor.get_ad_url(card)))
+    return ads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=40)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = [make_page(args.cards, args.padding_kb, seed=i) for i in range(args.pages)]
+    extractor = Extractor(SOURCE_URL)
+    expected = [(ad.price, ad.title, ad.ad_url) for ad in extractor.parse_cards(pages[0])]
+    assert soup_cards(extractor, pages[0]) == expected
+
+    start = time.perf_counter()
+    for html in pages:
+        soup_cards(extractor, html)
+    soup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for html in pages:
+        extractor.extract_information_from_page(html)
+    lxml_seconds = time.perf_counter() - start
+
+    cards = args.pages * args.cards
+    print(f"{args.pages} pages x {args.cards} cards, ~{args.padding_kb} KB padding/page")
+    for name, seconds in (("bs4", soup_seconds), ("lxml", lxml_seconds)):
+        print(f"  {name:5s} {seconds:8.3f} s  {cards / seconds:10.0f} cards/s")
+    print(f"  speedup x{soup_seconds / lxml_seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Fetch->parse pipeline benchmark: inline parsing vs thread/process pools.
+
+Fetches are simulated with random latency so no network is involved.
+
+    cd src
+    python -m benchmarks.bench_pipeline [--pages 500] [--workers 16]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from tracker import ClassTracker
+
+
+def make_tracker(parse_mode: str, workers: int, pages: list, latency: float) -> ClassTracker:
+    tracker = ClassTracker(parse_mode=parse_mode, parse_workers=workers)
+    bodies = {}
+    for i, html in enumerate(pages):
+        url = f"https://www.olx.bg/bench/{i}/"
+        bodies[url] = html
+        for selector in OLX_SELECTORS:
+            tracker.add(url, selector)
+    rng = random.Random(0)
+
+    async def fetch_page(session, url, timeout=10, headers=None, native=False):
+        await asyncio.sleep(rng.uniform(0, latency))
+        return 200, bodies[url], {}
+
+    tracker.fetch_page = fetch_page
+    return tracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct page bodies to generate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--latency", type=float, default=0.5, help="max simulated fetch latency, seconds")
+    args = parser.parse_args()
+
+    distinct = [make_page(40, 200, seed=i) for i in range(args.distinct)]
+    pages = [distinct[i % len(distinct)] for i in range(args.pages)]
+    print(f"{args.pages} pages, {args.workers} workers, fetch latency 0-{args.latency}s")
+    for mode in ("inline", "thread", "process"):
+        tracker = make_tracker(mode, args.workers, pages, args.latency)
+        try:
+            if tracker.executor is not None:
+                # Загряване на работниците, за да не мерим стартирането им
+                list(tracker.executor.map(abs, range(args.workers)))
+            start = time.perf_counter()
+            tracker.extract_all()
+            seconds = time.perf_counter() - start
+        finally:
+            tracker.close()
+        print(f"  {mode:8s} {seconds:8.3f} s  {args.pages / seconds:8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Price analytics: re-walking crawler JSON Lines for every query vs a PriceHistory.
+
+    cd src
+    python -m benchmarks.bench_prices [--ads 20000] [--ticks 50]
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from extractor import Ad
+from prices import PriceHistory, parse_price
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"  {label:34s} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ads", type=int, default=20_000)
+    parser.add_argument("--ticks", type=int, default=50, help="crawls, an hour apart")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prices = [rng.randrange(1_000, 80_000) for _ in range(args.ads)]
+    searches = [f"https://www.olx.bg/avtomobili/{i}/" for i in range(20)]
+    print(f"{args.ads * args.ticks} observations ({args.ads} ads x {args.ticks} crawls)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ads.jsonl")
+        history = PriceHistory()
+        with open(path, "w", encoding="utf-8") as f:
+            for tick in range(args.ticks):
+                when = (datetime.datetime(2026, 1, 1) + datetime.timedelta(hours=tick)).strftime("%Y-%m-%d %H:%M:%S")
+                ads = []
+                for i in range(args.ads):
+                    if rng.random() < 0.02:
+                        prices[i] = int(prices[i] * rng.uniform(0.8, 1.05))
+                    ads.append(Ad(f"{prices[i] // 1000} {prices[i] % 1000:03d} лв.", "Golf",
+                                  f"https://www.olx.bg/d/ad/golf-CID360-ID{i:x}.html", searches[i % 20], when))
+                for ad in ads:
+                    f.write(json.dumps(ad.to_dict(), ensure_ascii=False) + "\n")
+                history.add_ads(ads)
+
+        def walk_json_drops():
+            series = {}
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    amount, _ = parse_price(record["Price"])
+                    series.setdefault(record["Ad_URL"], []).append(amount)
+            return [url for url, amounts in series.items() if amounts[-1] <= max(amounts[:-1]) * 0.9]
+
+        print("JSON Lines, every query re-reads and re-parses the file")
+        slow = timed("drops >= 10%", walk_json_drops)
+        print("PriceHistory")
+        fast = timed("drops >= 10%", lambda: history.drops(0.1))
+        timed("min/max/median of one ad", lambda: history.stats("1f"))
+        timed("6-hour windows of one search", lambda: history.aggregate(searches[0], 6 * 3600))
+        timed("daily windows of all searches", lambda: history.aggregate(window=86400))
+        history_path = os.path.join(tmp, "prices.bin")
+        timed("save", lambda: history.save(history_path))
+        timed("load", lambda: PriceHistory.load(history_path))
+        print(f"  size: {os.path.getsize(path) / 2 ** 20:.1f} MB JSON Lines vs "
+              f"{os.path.getsize(history_path) / 2 ** 20:.1f} MB PriceHistory; {len(slow)} == {len(fast)} drops")
+
+
+if __name__ == "__main__":
+    main()
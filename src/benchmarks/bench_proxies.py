@@ -0,0 +1,58 @@
+"""Throughput with 1..N egress proxies, each with its own rate budget to the target host.
+
+Every proxy is a local StandInServer answering the proxied requests itself; the tracked host
+(olx.test) does not resolve, so all pages come through the pool.
+
+    cd src
+    python -m benchmarks.bench_proxies [--urls 160] [--rate 20] [--proxies 1 2 4 8]
+"""
+import argparse
+import contextlib
+import time
+
+from benchmarks.server import StandInServer
+from tracker import ClassTracker
+
+
+def cycle(tracker: ClassTracker, urls: list) -> float:
+    for url in urls:
+        tracker.add(url, "h6")
+    try:
+        start = time.perf_counter()
+        result = tracker.extract_all()
+        seconds = time.perf_counter() - start
+        failed = sum(value is None for value in result.values())
+        if failed:
+            print(f"    {failed} failed: {tracker.error_summary()}")
+        return seconds
+    finally:
+        tracker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=160)
+    parser.add_argument("--rate", type=float, default=20, help="requests/s per egress address")
+    parser.add_argument("--proxies", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--strategy", choices=["least-loaded", "round-robin"], default="least-loaded")
+    args = parser.parse_args()
+
+    # burst=1: бюджетът е само rate, без начален запас, за да се вижда чистото мащабиране
+    options = dict(parse_mode="inline", host_rate=args.rate, host_burst=1)
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(StandInServer(pages=1, cards=5, padding_kb=5, latency=0.02))
+                   for _ in range(max(args.proxies))]
+        print(f"{args.urls} URLs, {args.rate:g} req/s per egress address")
+        seconds = cycle(ClassTracker(**options), [f"{servers[0].base}/cars/{i}/" for i in range(args.urls)])
+        print(f"  {'direct':12s} {seconds:6.2f} s  {args.urls / seconds:7.1f} pages/s")
+        urls = [f"http://olx.test/cars/{i}/" for i in range(args.urls)]
+        for count in args.proxies:
+            tracker = ClassTracker(**options, proxies=[server.base for server in servers[:count]],
+                                   proxy_strategy=args.strategy)
+            seconds = cycle(tracker, urls)
+            label = f"{count} prox{'y' if count == 1 else 'ies'}"
+            print(f"  {label:12s} {seconds:6.2f} s  {args.urls / seconds:7.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Memory of accumulated snapshots: nested dicts vs an interned ResultTable.
+
+Each tick re-extracts every URL, as a periodic cycle does: the texts are new str objects, and only
+`--churn` of them actually changed since the previous tick.
+
+    cd src
+    python -m benchmarks.bench_results [--urls 100] [--selectors 3] [--texts 20] [--ticks 200] [--churn 0.02]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from results import ResultTable
+
+
+def ticks(args):
+    """Yield (timestamp, snapshot) like extract_all() results, built from fresh strings every tick."""
+    rng = random.Random(0)
+    urls = [f"https://www.olx.bg/avtomobili-dzhipove/{i}/?search%5Border%5D=created_at%3Adesc" for i in range(args.urls)]
+    selectors = [f"div[data-cy='l-card'] .css-{i:x}1sw7q4x h6" for i in range(args.selectors)]
+    values = {(u, s, t): rng.randrange(1_000, 80_000) for u in range(args.urls)
+              for s in range(args.selectors) for t in range(args.texts)}
+    for tick in range(args.ticks):
+        for key in values:
+            if rng.random() < args.churn:
+                values[key] = rng.randrange(1_000, 80_000)
+        snapshot = {}
+        # "".join прави ново копие на низа - ключовете също идват наново от всяко извличане
+        for u, url in enumerate(urls):
+            snapshot["".join(url)] = {
+                "".join(selector): [f"VW Golf {values[u, s, t]:,} лв.".replace(",", " ") for t in range(args.texts)]
+                for s, selector in enumerate(selectors)
+            }
+        yield f"2026-01-01T{tick // 3600:02d}:{tick // 60 % 60:02d}:{tick % 60:02d}", snapshot
+
+
+def measure(label: str, args, store):
+    tracemalloc.start()
+    seconds = 0.0
+    for timestamp, snapshot in ticks(args):
+        start = time.perf_counter()
+        if isinstance(store, dict):
+            store[timestamp] = snapshot
+        else:
+            store.add(timestamp, snapshot)
+        seconds += time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Времето е под tracemalloc, т.е. по-бавно от обичайното - за сравнение между двата начина
+    print(f"  {label:14s} {size / 2 ** 20:8.1f} MB  {seconds / args.ticks * 1000:7.2f} ms to add a snapshot")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=100)
+    parser.add_argument("--selectors", type=int, default=3)
+    parser.add_argument("--texts", type=int, default=20, help="texts per selector")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--churn", type=float, default=0.02, help="share of texts that change each tick")
+    args = parser.parse_args()
+
+    print(f"{args.ticks} snapshots x {args.urls} URLs x {args.selectors} selectors x {args.texts} texts, "
+          f"{args.churn:.0%} changed per tick")
+    data = {}
+    plain = measure("nested dicts", args, data)
+    table = ResultTable()
+    compact = measure("ResultTable", args, table)
+    print(f"  {plain / compact:.1f}x smaller; {table.stats()}")
+
+    start = time.perf_counter()
+    restored = table.to_dict()
+    print(f"  to_dict() {time.perf_counter() - start:6.2f} s, lossless: {restored == data}")
+
+
+if __name__ == "__main__":
+    main()
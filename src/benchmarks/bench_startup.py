@@ -0,0 +1,72 @@
+"""Startup benchmark: wall time of fresh interpreters importing the tracker stack.
+
+    cd src
+    python -m benchmarks.bench_startup [--runs 10]
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def measure(command: list, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        # "import tracker" не минава през входна точка: коренът на репото (exceptions) идва от PYTHONPATH
+        subprocess.run(command, cwd=SRC, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False,
+                       env={**os.environ, "PYTHONPATH": os.path.dirname(SRC)})
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # Локален сървър с една малка страница, за да мерим старта, а не мрежата
+    root = tempfile.mkdtemp()
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write('<html><body><h1 class="title">Hello</h1></body></html>')
+    handler = functools.partial(QuietHandler, directory=root)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = os.path.join(root, "tracked.json")
+    with open(config, "w", encoding="utf-8") as f:
+        json.dump({"tracked": {f"http://127.0.0.1:{server.server_port}/index.html": [".title"]}}, f)
+
+    py = sys.executable
+    scenarios = {
+        "python (empty)": [py, "-c", "pass"],
+        "eager aiohttp+bs4+lxml (old tracker import)": [py, "-c", "import aiohttp, bs4, lxml.html"],
+        "import tracker": [py, "-c", "import tracker"],
+        "import app (no window)": [py, "-c", "import app"],
+        "cli.py --help": [py, "cli.py", "--help"],
+        "cli.py --once (1 local URL)": [py, "cli.py", config, "--once", "-o", os.devnull],
+    }
+    try:
+        for name, command in scenarios.items():
+            print(f"  {name:45s} {measure(command, args.runs) * 1000:8.1f} ms")
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Buffered vs streaming (incremental lxml) parsing of huge listing pages served from localhost.
+
+Peak memory is the Python heap (tracemalloc): the buffered body and its decoded text, not lxml's tree.
+The page is encoded once, so the server adds almost nothing to the heap.
+
+    cd src
+    python -m benchmarks.bench_stream [--cards 1000] [--padding-kb 2000] [--fetches 20]
+"""
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from aiohttp import web
+
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from tracker import ClassTracker
+
+
+def serve(body: bytes):
+    """Serve `body` on every path from a daemon thread; returns the base URL."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def handler(request):
+        return web.Response(body=body, content_type="text/html", charset="utf-8")
+
+    async def start():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    return asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--padding-kb", type=int, default=2000)
+    parser.add_argument("--fetches", type=int, default=20)
+    args = parser.parse_args()
+
+    modes = {
+        "buffered": {},
+        "stream": {"stream": True},
+        "stream, first matches": {"stream": True, "stream_stop_early": True},
+    }
+    body = make_page(args.cards, args.padding_kb).encode("utf-8")
+    url = serve(body) + "/cars/"
+    print(f"{args.fetches} fetches of a {len(body) / 2 ** 20:.1f} MB page with {args.cards} cards")
+    for label, options in modes.items():
+        tracker = ClassTracker(parse_mode="inline", **options)
+        for selector in OLX_SELECTORS:
+            tracker.add(url, selector)
+        try:
+            tracker.extract_all()  # загряване: сесия, връзка, компилирани селектори
+            tracemalloc.start()
+            start = time.perf_counter()
+            for _ in range(args.fetches):
+                tracker.page_cache.discard(url)
+                result = tracker.extract_all()[url]
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            tracker.close()
+        print(f"  {label:22s} {seconds / args.fetches * 1000:8.1f} ms/page  peak heap {peak / 2 ** 20:6.1f} MB"
+              f"  {len(result[OLX_SELECTORS[0]])} prices")
+
+
+if __name__ == "__main__":
+    main()
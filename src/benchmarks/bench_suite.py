@@ -0,0 +1,285 @@
+"""End-to-end benchmark suite against a local stand-in OLX server, with stored baselines.
+
+Each scenario runs in a fresh interpreter so its peak RSS is its own. Results are compared with
+benchmarks/baselines.json and the exit code is 1 when a metric regressed by more than --tolerance.
+
+    cd src
+    python -m benchmarks.bench_suite                   # all scenarios, compare with the baseline
+    python -m benchmarks.bench_suite --scenario crawl  # one scenario
+    python -m benchmarks.bench_suite --save            # record a new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(SRC, "benchmarks", "baselines.json")
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+def latency_metrics(samples: list) -> dict:
+    return {"p50_ms": percentile(samples, 50) * 1000, "p99_ms": percentile(samples, 99) * 1000}
+
+
+def make_tracker(args):
+    from ratelimit import RetryPolicy
+    from tracker import ClassTracker
+
+    class TimedTracker(ClassTracker):
+        """Records the latency of every fetch, including retries and waiting for the limits."""
+
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw)
+            self.latencies = []
+
+        async def fetch_with_retry(self, session, url, timeout=10, headers=None, fetch=None):
+            start = time.perf_counter()
+            try:
+                return await super().fetch_with_retry(session, url, timeout, headers, fetch)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+    # Всичко е на 127.0.0.1, затова лимитът на хост не трябва да е тесното място
+    tracker = TimedTracker(parse_mode=args.parse_mode, host_rate=10_000, host_burst=10_000,
+                           retry=RetryPolicy(attempts=4, base_delay=0.01))
+    if tracker.executor is not None:
+        list(tracker.executor.map(abs, range(os.cpu_count() or 1)))
+    return tracker
+
+
+# --- Сценарии ---
+
+def scenario_extract_all(args) -> dict:
+    """ClassTracker.extract_all_async over many search URLs with 2% 503s and 2% 429s."""
+    from benchmarks.olx_pages import OLX_SELECTORS
+    from benchmarks.server import StandInServer
+
+    urls = max(1, int(200 * args.scale))
+    with StandInServer(pages=1, latency=0.02, error_rate=0.02, rate_limit_rate=0.02) as server:
+        tracker = make_tracker(args)
+        try:
+            for i in range(urls):
+                for selector in OLX_SELECTORS:
+                    tracker.add(server.url(f"/cars/{i}/"), selector)
+            start = time.perf_counter()
+            data = tracker.extract_all()
+            seconds = time.perf_counter() - start
+        finally:
+            tracker.close()
+    results = [result for result in data.values() if result is not None]
+    ads = sum(len(result[OLX_SELECTORS[0]]) for result in results)
+    return {"seconds": seconds, "pages_per_s": len(results) / seconds, "ads_per_s": ads / seconds,
+            **latency_metrics(tracker.latencies), "failed": urls - len(results)}
+
+
+def scenario_crawl(args) -> dict:
+    """Crawler over the 25 result pages of several search URLs."""
+    import asyncio
+
+    from benchmarks.server import StandInServer
+    from crawler import Crawler
+
+    searches = max(1, int(8 * args.scale))
+    with StandInServer(pages=25, latency=0.02, error_rate=0.01, rate_limit_rate=0.01) as server:
+        tracker = make_tracker(args)
+        crawler = Crawler(tracker, concurrency=8)
+
+        async def crawl_all():
+            return await asyncio.gather(*(crawler.crawl_async(server.url(f"/cars/{i}/"), full=True)
+                                          for i in range(searches)))
+
+        try:
+            start = time.perf_counter()
+            results = tracker.run(crawl_all())
+            seconds = time.perf_counter() - start
+        finally:
+            tracker.close()
+    pages = sum(result.pages - len(result.errors) for result in results)
+    ads = sum(len(result.ads) for result in results)
+    return {"seconds": seconds, "pages_per_s": pages / seconds, "ads_per_s": ads / seconds,
+            **latency_metrics(tracker.latencies), "failed": sum(len(result.errors) for result in results)}
+
+
+def scenario_extract_from_html(args) -> dict:
+    """ClassTracker.extract_from_html on saved pages, no network."""
+    from benchmarks.olx_pages import OLX_SELECTORS, make_page
+    from tracker import ClassTracker
+
+    pages = max(1, int(100 * args.scale))
+    bodies = [make_page(40, 200, seed=i) for i in range(10)]
+    tracker = ClassTracker()
+    url = "https://www.olx.bg/cars/"
+    for selector in OLX_SELECTORS:
+        tracker.add(url, selector)
+    try:
+        samples, ads = [], 0
+        for i in range(pages):
+            start = time.perf_counter()
+            result = tracker.extract_from_html(url, bodies[i % len(bodies)])
+            samples.append(time.perf_counter() - start)
+            ads += len(result[OLX_SELECTORS[0]])
+    finally:
+        tracker.close()
+    seconds = sum(samples)
+    return {"seconds": seconds, "pages_per_s": pages / seconds, "ads_per_s": ads / seconds,
+            **latency_metrics(samples)}
+
+
+def scenario_export(args) -> dict:
+    """write_jsonl / write_csv / write_json and read_jsonl of a synthetic history."""
+    import datetime
+
+    import export
+
+    snapshots = max(1, int(200 * args.scale))
+    urls, selectors, texts = 20, 4, 40
+    rows = snapshots * urls * selectors * texts
+
+    def history():
+        for t in range(snapshots):
+            yield (datetime.datetime(2026, 1, 1) + datetime.timedelta(minutes=5 * t)).isoformat(), {
+                f"https://www.olx.bg/cars/{u}/": {
+                    f"div.css-1sw7q4x .field-{s}": [f"Volkswagen Golf {t}-{u}-{s}-{i} 15 900 лв." for i in range(texts)]
+                    for s in range(selectors)
+                }
+                for u in range(urls)
+            }
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write in (("jsonl", export.write_jsonl), ("csv", export.write_csv), ("json", export.write_json),
+                            ("jsonl_gz", export.write_jsonl)):
+            path = os.path.join(tmp, "export." + name.replace("_", "."))
+            start = time.perf_counter()
+            write(history(), path)
+            seconds = time.perf_counter() - start
+            metrics[f"{name}_write_rows_per_s"] = rows / seconds
+            metrics[f"{name}_write_mb_per_s"] = os.path.getsize(path) / seconds / 2 ** 20
+        start = time.perf_counter()
+        for _ in export.read_jsonl(os.path.join(tmp, "export.jsonl")):
+            pass
+        metrics["jsonl_read_rows_per_s"] = rows / (time.perf_counter() - start)
+    return metrics
+
+
+SCENARIOS = {
+    "extract_all": scenario_extract_all,
+    "crawl": scenario_crawl,
+    "extract_from_html": scenario_extract_from_html,
+    "export": scenario_export,
+}
+
+
+# --- Изпълнение и сравнение с baseline ---
+
+def run_scenario(name: str, args) -> dict:
+    """Run one scenario `--repeat` times, each in a fresh interpreter; the median of every metric."""
+    command = [sys.executable, "-m", "benchmarks.bench_suite", "--run", name, "--scale", str(args.scale),
+               "--parse-mode", args.parse_mode]
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(command, cwd=SRC, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+
+
+def run_in_process(name: str, args):
+    metrics = SCENARIOS[name](args)
+    metrics["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    if workers:
+        metrics["peak_rss_workers_mb"] = workers
+    print(json.dumps(metrics))
+
+
+def better(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 for informational metrics."""
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_ms", "_mb")):
+        return -1
+    return 0
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(scenario, {}).get(metric)
+            direction = better(metric)
+            if not reference or not direction:
+                continue
+            change = (value - reference) / reference * direction
+            if change < -tolerance:
+                found.append(f"{scenario}.{metric}: {value:.1f} vs baseline {reference:.1f} ({change:+.0%})")
+    return found
+
+
+def machine(args) -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count(),
+            "scale": args.scale, "parse_mode": args.parse_mode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the amount of work per scenario")
+    parser.add_argument("--parse-mode", choices=["process", "thread", "inline"], default="process")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--run", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_in_process(args.run, args)
+        return 0
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, args)
+        print(name)
+        for metric, value in results[name].items():
+            print(f"  {metric:28s} {value:12.1f}")
+
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        stored = {"machine": machine(args), "scenarios": {**stored.get("scenarios", {}), **results}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=4)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --save to record one.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    if {k: stored["machine"].get(k) for k in ("scale", "parse_mode")} != {"scale": args.scale,
+                                                                         "parse_mode": args.parse_mode}:
+        print(f"Baseline was recorded with {stored['machine']}; not comparable, skipping comparison.")
+        return 0
+    found = regressions(results, stored["scenarios"], args.tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
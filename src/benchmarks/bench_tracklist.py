@@ -0,0 +1,88 @@
+"""Bulk import of tracked URL/selector pairs: one add() + full tree rebuild per pair vs import_tracked().
+
+The Treeview part needs a display and is skipped without one.
+
+    cd src
+    python -m benchmarks.bench_tracklist [--urls 2000] [--selectors 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from tracker import ClassTracker
+
+SELECTORS = [".css-1sw7q4x h6", "[data-testid='ad-price']", ".css-16v5mdi h4", "p:nth-child(2)",
+             "div:-soup-contains('BMW')", "a.css-z3gu2d", "span.css-1c0ed4l"]
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"  {label:40s} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def rebuild(tree, tracked):
+    # Досегашният update_tracked_tree(): всичко се трие и вмъква наново
+    tree.delete(*tree.get_children())
+    for url, selectors in tracked.items():
+        url_item = tree.insert("", "end", text=url, open=True)
+        for sel in sorted(selectors):
+            tree.insert(url_item, "end", text=sel)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--selectors", type=int, default=5, help="selectors per URL")
+    args = parser.parse_args()
+
+    pairs = [(f"https://www.olx.bg/avtomobili/{i}/", SELECTORS[(i + j) % len(SELECTORS)])
+             for i in range(args.urls) for j in range(args.selectors)]
+    print(f"{len(pairs)} pairs ({args.urls} URLs x {args.selectors} selectors)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = ClassTracker()
+        source.add_many(pairs)
+        paths = {kind: os.path.join(tmp, f"tracked.{kind}") for kind in ("json", "csv", "txt")}
+        for kind, path in paths.items():
+            timed(f"export_tracked .{kind}", lambda: source.export_tracked(path))
+        source.close()
+        for kind, path in paths.items():
+            tracker = ClassTracker()
+            timed(f"import_tracked .{kind} (validate + add)", lambda: tracker.import_tracked(path))
+            tracker.close()
+
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+
+            root = tk.Tk()
+        except (ImportError, RuntimeError, tk.TclError) as e:
+            print(f"  Treeview: skipped ({e})")
+            return
+        tree = ttk.Treeview(root, show="tree")
+        tracker = ClassTracker()
+
+        def one_by_one():
+            for url, selector in pairs[:min(len(pairs), 2000)]:
+                tracker.add(url, selector)
+                rebuild(tree, tracker.tracked)
+
+        timed(f"add + rebuild, first {min(len(pairs), 2000)} pairs", one_by_one)
+        tracker.close()
+        tree.delete(*tree.get_children())
+        from app import App
+
+        # Само дървото от App, без останалия прозорец
+        view = SimpleNamespace(tree=tree, url_items={}, selector_items={}, tracker=ClassTracker())
+        timed("import_tracked + insert_tracked_rows",
+              lambda: App.insert_tracked_rows(view, view.tracker.import_tracked(paths["json"])))
+        view.tracker.close()
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
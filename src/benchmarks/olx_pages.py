@@ -0,0 +1,74 @@
+import random
+
+BRANDS = ["Volkswagen Golf", "BMW 320d", "Audi A4", "Opel Astra", "Toyota Corolla", "Mercedes C220", "Skoda Octavia"]
+TOWNS = ["София", "Пловдив", "Варна", "Бургас", "Русе", "Стара Загора"]
+
+CARD = """
+<div data-cy="l-card" data-testid="l-card" id="{ad_id}" class="css-1sw7q4x">
+  <div class="css-1apmciz">
+    <a class="css-z3gu2d" href="/d/ad/{slug}-CID360-ID{ad_id}.html">
+      <div type="list" class="css-pgsdrd"><img src="https://frankfurt.apollo.olxcdn.com/v1/files/{ad_id}/image;s=216x152" alt="{title}" class="css-8wsg1m"></div>
+    </a>
+    <div class="css-u2ayx9">
+      <a class="css-z3gu2d" href="/d/ad/{slug}-CID360-ID{ad_id}.html"><h6 class="css-1wxaaza">{title}
+          {year}</h6></a>
+      <p data-testid="ad-price" class="css-13afqrm">{price} лв.<span class="css-1ygi4zp">Договаряне</span></p>
+    </div>
+    <div class="css-odp1qd">
+      <p data-testid="location-date" class="css-1mwdrlh">{town} - {when}</p>
+      <div class="css-1kfqt7f"><span class="css-1cd0guq">{year} г. - {km} км</span></div>
+    </div>
+  </div>
+</div>
+"""
+
+BOILERPLATE = """
+<script type="application/json" id="olx-init-config">{blob}</script>
+<style>.css-1sw7q4x{{display:flex}}.css-13afqrm{{font-weight:700}}</style>
+<nav class="css-nav"><ul>{links}</ul></nav>
+"""
+
+
+def make_card(rng: random.Random, index: int) -> str:
+    brand = rng.choice(BRANDS)
+    ad_id = f"{index:x}{rng.randrange(16 ** 6):06x}"
+    return CARD.format(
+        ad_id=ad_id,
+        slug=brand.lower().replace(" ", "-"),
+        title=f"{brand} {rng.choice(['1.6', '1.9 TDI', '2.0 TFSI', '2.2 CDI'])}",
+        year=rng.randrange(2000, 2024),
+        price=f"{rng.randrange(1, 80)} {rng.randrange(1000):03d}",
+        town=rng.choice(TOWNS),
+        when=rng.choice(["Днес в 10:15 ч.", "Вчера в 18:02 ч.", "12 януари 2026 г."]),
+        km=rng.randrange(5, 400) * 1000,
+    )
+
+
+def make_page(cards: int = 40, padding_kb: int = 200, seed: int = 0, pages: int = 1) -> str:
+    """Synthetic OLX search results page with `cards` ad cards and ~`padding_kb` of scripts/markup.
+
+    With pages > 1 the page also has a pagination bar linking ?page=2..pages.
+    """
+    rng = random.Random(seed)
+    blob = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(padding_kb * 1024))
+    links = "".join(f'<li><a href="/cat/{i}/">Категория {i}</a></li>' for i in range(200))
+    body = "".join(make_card(rng, i) for i in range(cards))
+    pagination = "".join(
+        f'<li data-testid="pagination-list-item"><a data-testid="pagination-link-{n}" href="?page={n}">{n}</a></li>'
+        for n in range(2, pages + 1)
+    )
+    return (
+        "<!DOCTYPE html><html lang=\"bg\"><head><meta charset=\"utf-8\"><title>Коли - OLX.bg</title>"
+        + BOILERPLATE.format(blob=blob, links=links)
+        + f"</head><body><div data-testid=\"listing-grid\" class=\"css-j0t2x2\">{body}</div>"
+        + (f"<ul data-testid=\"pagination-list\">{pagination}</ul>" if pagination else "")
+        + "</body></html>"
+    )
+
+
+OLX_SELECTORS = [
+    "div.css-1sw7q4x p[data-testid='ad-price']",
+    "div.css-1sw7q4x h6",
+    "div[data-cy='l-card'] p[data-testid='location-date']",
+    "div.css-1sw7q4x a[href*='/d/ad/']",
+]
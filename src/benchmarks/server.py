@@ -0,0 +1,93 @@
+"""Local stand-in for OLX search pages, with injectable latency, server errors and 429s.
+
+    with StandInServer(latency=0.02, error_rate=0.01) as server:
+        server.url("/cars/1/")            # page 1; ?page=N for the rest
+"""
+import asyncio
+import random
+import threading
+import zlib
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.olx_pages import make_page
+
+
+class StandInServer:
+    """aiohttp server on its own thread and loop, so it never competes with the tracker loop.
+
+    Every path serves a search listing of `pages` pages; bodies are pre-generated (`distinct` of them)
+    and picked by path and page, so generating HTML is not part of what is measured.
+    """
+
+    def __init__(self, pages: int = 25, cards: int = 40, padding_kb: int = 200, distinct: int = 10,
+                 latency: float = 0.02, error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 0):
+        self.pages = pages
+        self.latency = latency  # средна латентност; всяка заявка е между 0.5x и 1.5x
+        self.error_rate = error_rate  # дял 503 отговори
+        self.rate_limit_rate = rate_limit_rate  # дял 429 отговори с Retry-After: 0
+        self.bodies = [make_page(cards, padding_kb, seed=seed + i, pages=pages) for i in range(distinct)]
+        self.cards = cards
+        self.statuses = Counter()
+        self._rng = random.Random(seed)
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self.base = None
+
+    async def handler(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency * self._rng.uniform(0.5, 1.5))
+        page = int(request.query.get("page", 1))
+        roll = self._rng.random()
+        if page > self.pages:
+            status = 404
+        elif roll < self.rate_limit_rate:
+            status = 429
+        elif roll < self.rate_limit_rate + self.error_rate:
+            status = 503
+        else:
+            status = 200
+        self.statuses[status] += 1
+        if status != 200:
+            return web.Response(status=status, headers={"Retry-After": "0"})
+        # crc32, а не hash(): едни и същи тела за едни и същи URL-и при всяко пускане
+        key = zlib.crc32(f"{request.path}?{page}".encode("utf-8"))
+        # Различни ID-та на обявите за всяка страница, за да не се "виждат" повторно между страниците
+        body = self.bodies[key % len(self.bodies)].replace("-ID", f"-ID{key:08x}")
+        return web.Response(text=body, content_type="text/html")
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base = f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,7 @@
+"""Puts the repository root on sys.path: the exceptions package lives there, while the entry points run from src/."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -0,0 +1,91 @@
+import hashlib
+
+
+class CachedPage:
+    __slots__ = ("selectors", "etag", "last_modified", "digest", "result")
+
+    def __init__(self, selectors: frozenset, etag: str, last_modified: str, digest: str, result: dict):
+        self.selectors = selectors
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.result = result
+
+
+class PageCache:
+    """Per-URL validators (ETag/Last-Modified), body hash and last extraction result.
+
+    The body hash is over the decompressed body bytes as received (a str body is hashed as UTF-8).
+    Streamed bodies are hashed the same way, chunk by chunk, up to where reading stopped. Results are
+    kept as tuples and handed out as fresh lists, so callers cannot change the cached copy.
+    """
+
+    def __init__(self):
+        self.entries = {}  # dict[str, CachedPage]
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+
+    @staticmethod
+    def digest(html: str) -> str:
+        # Байтовете на недекодирано тяло (decoding.Body) се хешират както са, str - като UTF-8
+        body = html.encode("utf-8") if isinstance(html, str) else html
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def request_headers(self, url: str, selectors: frozenset) -> dict:
+        entry = self.entries.get(url)
+        # При променени селектори ни трябва тялото, така че не пращаме условна заявка
+        if entry is None or entry.selectors != selectors:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def lookup(self, url: str, selectors: frozenset, html: str, headers=None, digest: str = None) -> dict:
+        """Return the cached result for a 304 (no html or digest) or an identical body, else None.
+
+        `digest` stands in for html when the caller hashed the body bytes itself (streamed bodies).
+        """
+        self.requests += 1
+        entry = self.entries.get(url)
+        if entry is None or entry.selectors != selectors:
+            return None
+        if html is None and digest is None:
+            self.not_modified += 1
+        elif (digest or self.digest(html)) == entry.digest:
+            self.unchanged += 1
+        else:
+            return None
+        if headers is not None:
+            entry.etag = headers.get("ETag", entry.etag)
+            entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+        return {selector: list(texts) for selector, texts in entry.result.items()}
+
+    def store(self, url: str, selectors: frozenset, headers, html: str, result: dict, digest: str = None):
+        headers = headers or {}
+        self.entries[url] = CachedPage(
+            selectors, headers.get("ETag"), headers.get("Last-Modified"), digest or self.digest(html),
+            {selector: tuple(texts) for selector, texts in result.items()},
+        )
+
+    def discard(self, url: str):
+        self.entries.pop(url, None)
+
+    @property
+    def hits(self) -> int:
+        return self.not_modified + self.unchanged
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "hit_rate": self.hit_rate,
+        }
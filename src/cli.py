@@ -0,0 +1,236 @@
+"""Headless tracker runner (no tkinter).
+
+    python cli.py tracked.json --once                     # one extraction, JSON Lines to stdout
+    python cli.py tracked.json --once -o result.jsonl.gz
+    python cli.py tracked.json --interval 300 --store snapshots.db
+    python cli.py tracked.json --once --crawl -o ads.jsonl # all result pages of each OLX search URL
+    python cli.py tracked.json --once --crawl --seen seen.db -o ads.jsonl  # only ads new since the last run
+    python cli.py tracked.json --interval 60 -o out.jsonl --proxy http://10.0.0.2:3128 --proxy http://10.0.0.3:3128
+
+The config file is JSON: {"tracked": {"<url>": ["<css selector>", ...]}, "interval": 300, "timeout": 10,
+"intervals": {"<url>": <seconds>}} - "intervals" optionally overrides the default interval per URL.
+An optional "proxies" list of proxy URLs (or {"<proxy url>": <weight>}) spreads the requests over those proxies.
+"""
+import argparse
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+
+import bootstrap  # noqa: F401 - пакетът exceptions е в корена на репото, а cli.py се стартира от src/
+
+# tracker (aiohttp, asyncio), store и export се импортират в run(): --help и грешките в
+# конфигурацията не плащат тяхното зареждане
+
+
+def log(message: str):
+    print(f"[{datetime.datetime.now().isoformat()}] {message}", file=sys.stderr, flush=True)
+
+
+def load_config(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    tracked = config.get("tracked")
+    if not isinstance(tracked, dict) or not tracked:
+        raise ValueError(f"{path}: 'tracked' must map each URL to a list of CSS selectors")
+    for url, selectors in tracked.items():
+        if isinstance(selectors, str):
+            tracked[url] = selectors = [selectors]
+        if not selectors or not all(isinstance(s, str) and s.strip() for s in selectors):
+            raise ValueError(f"{path}: no valid selectors for {url}")
+    proxies = config.get("proxies")
+    if proxies is not None and (not isinstance(proxies, (list, dict)) or not proxies
+                                or not all(isinstance(proxy, str) for proxy in proxies)):
+        raise ValueError(f"{path}: 'proxies' must be a list of proxy URLs or map proxy URLs to weights")
+    return config
+
+
+def write_changes(changes: list, output: str):
+    from export import open_text
+
+    with open_text(output, "a") as f:
+        for change in changes:
+            f.write(json.dumps(change.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def write_ads(ads: list, output: str):
+    from export import open_text
+
+    with open_text(output, "a") as f:
+        for ad in ads:
+            f.write(json.dumps(ad.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless web element tracker.")
+    parser.add_argument("config", help="JSON config with tracked URLs and selectors")
+    parser.add_argument("--once", action="store_true", help="run one extraction and exit")
+    parser.add_argument("--interval", type=int, help="default seconds between runs of each URL (overrides config)")
+    parser.add_argument("--timeout", type=int, help="per-request timeout in seconds (overrides config)")
+    parser.add_argument("-o", "--output", help="append results as JSON Lines to this file ('-' = stdout, .gz = gzip)")
+    parser.add_argument("--store", help="also write results to this SnapshotStore database (keyframes + deltas)")
+    parser.add_argument("--full-snapshots", action="store_true",
+                        help="store every result in full instead of keyframes + deltas")
+    parser.add_argument("--changes", action="store_true",
+                        help="write change events (added/removed/changed) instead of results to --output")
+    parser.add_argument("--archive", help="keep every fetched page in this HtmlArchive directory (deduplicated, compressed)")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file after every result")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile", help="with --once: cProfile the extraction cycle and dump the stats here")
+    parser.add_argument("--crawl", action="store_true",
+                        help="treat tracked URLs as OLX searches: crawl their result pages and write new ads to --output")
+    parser.add_argument("--full", action="store_true", help="with --crawl: walk every page, not only up to seen ads")
+    parser.add_argument("--seen", help="with --crawl: SeenIndex database of ads from earlier runs (default: in memory)")
+    parser.add_argument("--prices", help="with --crawl: add the crawled ads' prices to this PriceHistory file")
+    parser.add_argument("--stream", action="store_true",
+                        help="parse each body with lxml's incremental parser while it downloads")
+    parser.add_argument("--max-body-size", type=int, default=32 * 2 ** 20,
+                        help="refuse response bodies larger than this many bytes (default: 32 MiB)")
+    parser.add_argument("--proxy", action="append", metavar="URL",
+                        help="send requests through this HTTP proxy; repeat for a pool (overrides config 'proxies')")
+    parser.add_argument("--proxy-strategy", choices=["least-loaded", "round-robin"], default="least-loaded",
+                        help="how requests are spread over the proxies (default: least-loaded)")
+    parser.add_argument("--parse-mode", choices=["process", "thread", "inline"],
+                        help="parse pool (default: inline for --once, process otherwise)")
+    args = parser.parse_args(argv)
+    if args.once and args.output is None and args.store is None:
+        args.output = "-"
+    if not args.once and args.output is None and args.store is None:
+        parser.error("periodic mode needs --output and/or --store")
+    if args.crawl and args.output is None:
+        parser.error("--crawl writes ads to --output")
+    if args.profile and not args.once:
+        parser.error("--profile needs --once")
+    return args
+
+
+def run(args, config: dict, stop: threading.Event = None) -> int:
+    from export import write_jsonl
+    from tracker import ClassTracker
+
+    store = None
+    if args.store:
+        from store import SnapshotStore
+
+        store = SnapshotStore(args.store)
+
+    parse_mode = args.parse_mode or ("inline" if args.once else "process")
+    # "proxies" в конфигурацията: списък от URL-и или {url: тегло}
+    proxies = args.proxy or config.get("proxies") or None
+    tracker = ClassTracker(parse_mode=parse_mode, stream=args.stream, max_body_size=args.max_body_size,
+                           proxies=proxies, proxy_strategy=args.proxy_strategy)
+    for url, selectors in config["tracked"].items():
+        for selector in selectors:
+            tracker.add(url, selector.strip())
+    for url, seconds in config.get("intervals", {}).items():
+        tracker.set_interval(url, seconds)
+    if args.archive:
+        from archive import HtmlArchive
+
+        tracker.archive = HtmlArchive(args.archive)
+    timeout = args.timeout or config.get("timeout", 10)
+    interval = args.interval or config.get("interval", 300)
+    stop = stop or threading.Event()
+    failed = False
+    metrics_server = tracker.metrics.serve(args.metrics_port) if args.metrics_port else None
+    if args.profile:
+        tracker.profile_next_cycle(args.profile)
+
+    if not args.full_snapshots:
+        tracker.changes.store = store
+    if args.output and args.changes:
+        tracker.changes.subscribe(lambda changes: write_changes(changes, args.output))
+
+    def on_result(timestamp, url, result):
+        if args.full_snapshots and store is not None:
+            store.add_result(timestamp, url, result)
+        tracker.changes.observe(timestamp, url, result)
+        if args.output and not args.changes:
+            write_jsonl({timestamp: {url: result}}, args.output, mode="a")
+        if result is None:
+            log(f"Грешка при извличане на {url}: {tracker.last_errors.get(url)}")
+        if args.metrics_file:
+            tracker.metrics.write_prometheus(args.metrics_file)
+
+    try:
+        if args.crawl:
+            return crawl(args, tracker, timeout, interval, stop)
+        if args.once:
+            timestamp = datetime.datetime.now().isoformat()
+            data = tracker.extract_all(timeout, lambda url, result: on_result(timestamp, url, result))
+            errors = tracker.error_summary()
+            failed = bool(errors)
+            log(f"Извлечени {len(data)} URL-а." + (f" Грешки: {errors}" if errors else ""))
+            log(tracker.metrics.summary().replace("\n", "; "))
+            if args.metrics_file:
+                tracker.metrics.write_prometheus(args.metrics_file)
+        else:
+            tracker.start_schedule(on_result, interval, timeout=timeout)
+            log(f"Периодично извличане на {len(tracker.tracked)} URL-а, интервал по подразбиране {interval} секунди.")
+            while not stop.wait(1):
+                pass
+    finally:
+        tracker.close()
+        if store is not None:
+            store.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+    return 1 if failed else 0
+
+
+def crawl(args, tracker, timeout: int, interval: float, stop: threading.Event) -> int:
+    from crawler import Crawler
+
+    index = None
+    if args.seen:
+        from seen import SeenIndex
+
+        index = SeenIndex(args.seen)
+    crawler = Crawler(tracker, index)
+    history = None
+    if args.prices:
+        from prices import PriceHistory
+
+        history = PriceHistory.load(args.prices) if os.path.exists(args.prices) else PriceHistory()
+    try:
+        while True:
+            failed = False
+            for url in list(tracker.tracked):
+                result = crawler.crawl(url, timeout, full=args.full)
+                write_ads(result.ads, args.output)
+                if history is not None:
+                    # Всяко наблюдение, не само новите/обновените: иначе стабилните обяви липсват в редицата
+                    history.add_ads(result.observed)
+                failed = failed or bool(result.errors)
+                log(f"{url}: {len(result.ads)} нови/обновени обяви, {result.pages}/{result.last_page} страници"
+                    + (" (спряно при вече видени)" if result.stopped_early else "")
+                    + (f", грешки: {len(result.errors)}" if result.errors else ""))
+            if history is not None:
+                history.save(args.prices)
+            if args.metrics_file:
+                tracker.metrics.write_prometheus(args.metrics_file)
+            if args.once or stop.wait(interval):
+                return 1 if failed else 0
+    finally:
+        crawler.index.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        log(f"Грешка в конфигурацията: {e}")
+        return 2
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    return run(args, config, stop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
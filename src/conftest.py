@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+import bootstrap  # noqa: F401 - тестовете се пускат от src/, пакетът exceptions е в корена на репото
+
+
+@pytest.fixture
+def serve():
+    """Local aiohttp servers on a loop in their own thread: serve({route: handler}) -> base URL.
+
+    The loop is not the tracker's, since ClassTracker and cli.run() own theirs; all servers stop at teardown.
+    """
+    from aiohttp import web
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runners = []
+
+    async def start(routes):
+        app = web.Application()
+        for route, handler in routes.items():
+            app.router.add_get(route, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner
+
+    def start_server(routes: dict) -> str:
+        runner = asyncio.run_coroutine_threadsafe(start(routes), loop).result()
+        runners.append(runner)
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    yield start_server
+    for runner in runners:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
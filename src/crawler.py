@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from exceptions import AutoException
+from extractor import parse_listing
+from seen import NEW, SEEN, SeenIndex
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class CrawlResult:
+    """Outcome of one crawl of a search URL."""
+
+    __slots__ = ("url", "ads", "observed", "pages", "last_page", "stopped_early", "errors")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ads = []  # list[Ad] - нови и обновени обяви, без повторения
+        self.observed = []  # list[Ad] - всички обяви от обходените страници, видени или не (за PriceHistory)
+        self.pages = 0  # обработени страници
+        self.last_page = 1  # последна страница според пагинацията
+        self.stopped_early = False
+        self.errors = {}  # dict[str, AutoException] - URL на страница -> грешка
+
+    def __repr__(self) -> str:
+        return f"CrawlResult({self.url!r}, ads={len(self.ads)}, pages={self.pages}/{self.last_page})"
+
+
+class Crawler:
+    """Fetches the result pages behind an OLX search URL and collects their new and updated ads.
+
+    Pages are fetched concurrently (at most `concurrency` ahead, on top of the tracker's host rate
+    limit) but consumed in page order. Results are sorted newest first, so an incremental crawl stops
+    once `stop_after_seen` ads from earlier crawls have been met (a few promoted old ads on page 1 do
+    not stop it); its look-ahead starts at one page and doubles while pages hold only new ads.
+    Earlier crawls are remembered in `index` (a SeenIndex; in memory unless one is passed).
+    """
+
+    def __init__(self, tracker, index: SeenIndex = None, max_pages: int = 25, concurrency: int = 4,
+                 stop_after_seen: int = 3):
+        self.tracker = tracker
+        self.index = index if index is not None else SeenIndex(":memory:", bloom=False)
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.stop_after_seen = stop_after_seen
+
+    @staticmethod
+    def page_url(url: str, page: int) -> str:
+        parts = urlsplit(url)
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "page"]
+        if page > 1:
+            query.append(("page", str(page)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    async def fetch_listing(self, session: "aiohttp.ClientSession", url: str, page: int, timeout: int,
+                            extracted_at: str) -> tuple:
+        page_url = self.page_url(url, page)
+        _, html, _ = await self.tracker.fetch_with_retry(session, page_url, timeout)
+        if self.tracker.archive is not None:
+            self.tracker.archive.add(page_url, html, block=False)
+        executor = self.tracker.executor
+        if executor is None:
+            return parse_listing(url, html, extracted_at)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, parse_listing, url, html, extracted_at)
+
+    async def crawl_async(self, url: str, timeout: int = 10, full: bool = False) -> CrawlResult:
+        """Crawl `url`; full=True walks every page instead of stopping at already seen ads."""
+        result = CrawlResult(url)
+        extracted_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        collected = set()
+        met = 0
+        incremental = not full and bool(self.index)
+        window = 1 if incremental else self.concurrency
+        tasks = {}
+
+        async with self.tracker.session_scope() as session:
+            try:
+                ads, last_page = await self.fetch_listing(session, url, 1, timeout, extracted_at)
+            except AutoException as e:
+                result.errors[self.page_url(url, 1)] = e
+                return result
+            result.last_page = min(last_page, self.max_pages)
+
+            page, next_page = 1, 2
+            try:
+                while True:
+                    result.pages += 1
+                    met_before = met
+                    fresh = []
+                    for ad in ads:
+                        ad_id = ad.ad_id or ad.ad_url
+                        # Обява, изместена към следващата страница от нови обяви по време на обхождането
+                        if ad_id not in collected:
+                            collected.add(ad_id)
+                            fresh.append(ad)
+                    result.observed.extend(fresh)
+                    for ad, status in zip(fresh, self.index.observe(fresh, extracted_at)):
+                        if status != NEW:
+                            met += 1
+                        if status != SEEN:
+                            result.ads.append(ad)
+                    if incremental and met >= self.stop_after_seen:
+                        result.stopped_early = page < result.last_page
+                        break
+                    if met == met_before:
+                        window = min(window * 2, self.concurrency)
+
+                    page += 1
+                    if page > result.last_page:
+                        break
+                    while next_page <= result.last_page and next_page < page + window:
+                        tasks[next_page] = asyncio.ensure_future(
+                            self.fetch_listing(session, url, next_page, timeout, extracted_at)
+                        )
+                        next_page += 1
+                    try:
+                        ads, _ = await tasks.pop(page)
+                    except AutoException as e:
+                        result.errors[self.page_url(url, page)] = e
+                        ads = []
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return result
+
+    def crawl(self, url: str, timeout: int = 10, full: bool = False) -> CrawlResult:
+        return self.tracker.run(self.crawl_async(url, timeout, full))
@@ -0,0 +1,138 @@
+"""Response decoding: Content-Encoding (gzip, deflate, br, zstd) and the page's character encoding.
+
+The tracker's session turns aiohttp's automatic decompression off and advertises ACCEPT_ENCODING,
+so compressed and decompressed sizes can be told apart and only codecs we can decode are offered.
+"""
+import codecs
+import functools
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ACCEPT_ENCODING = ", ".join(
+    (["zstd"] if zstandard is not None else []) + (["br"] if brotli is not None else []) + ["gzip", "deflate"]
+)
+
+# Като при HTML prescan-а: <meta charset> се търси само в началото на документа
+SNIFF_BYTES = 4096
+META_CHARSET_RE = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+# Страница без charset, която не е валиден UTF-8, почти винаги е windows-1251 (за български сайтове)
+FALLBACK_ENCODING = "cp1251"
+
+
+class Body(bytes):
+    """Undecoded page bytes tagged with their `encoding`, for parsers that decode by themselves."""
+
+    def __new__(cls, data: bytes = b"", encoding: str = "utf-8"):
+        body = super().__new__(cls, data)
+        body.encoding = encoding
+        return body
+
+    def text(self) -> str:
+        return self.decode(self.encoding, errors="replace")
+
+    def utf8(self) -> bytes:
+        return bytes(self) if self.encoding == "utf-8" else self.text().encode("utf-8")
+
+
+class _Brotli:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def decompressor(content_encoding: str):
+    """An object with decompress(chunk) / flush() for a Content-Encoding header; None for identity.
+
+    Raises ValueError for codecs that were not advertised (or whose module is not installed).
+    """
+    name = (content_encoding or "identity").strip().lower()
+    if name == "identity":
+        return None
+    if name in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if name == "deflate":
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)  # zlib или gzip обвивка, по заглавието
+    if name == "br" and brotli is not None:
+        return _Brotli()
+    if name == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"unsupported Content-Encoding: {content_encoding}")
+
+
+@functools.lru_cache(maxsize=None)
+def normalize(name: str):
+    """Python codec name for a charset label, None if unknown."""
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except (LookupError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def lxml_can_decode(encoding: str) -> bool:
+    """True if libxml2 can decode `encoding` itself, so the parser can be given bytes."""
+    import lxml.html
+
+    try:
+        lxml.html.HTMLParser(encoding=encoding)
+    except LookupError:
+        return False
+    return True
+
+
+def sniff(body: bytes):
+    """Encoding declared by a byte order mark or a <meta charset> near the start of `body`, else None."""
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return encoding
+    match = META_CHARSET_RE.search(body, 0, SNIFF_BYTES)
+    return normalize(match.group(1).decode("ascii")) if match else None
+
+
+def is_utf8(body: bytes, final: bool = True) -> bool:
+    try:
+        # Инкрементален декодер: непълен символ в края на първото парче не е грешка
+        codecs.getincrementaldecoder("utf-8")().decode(body, final)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def decidable(charset: str, chunk: bytes, head: bytes) -> bool:
+    """True once a streamed page's encoding can be resolved: `chunk` is the newest piece, `head` the page start.
+
+    Until then the page has no known charset, no BOM or <meta charset> and only ASCII bytes, which
+    UTF-8 and windows-1251 read alike, so choosing either could be wrong for the bytes still to come.
+    """
+    return bool(charset and normalize(charset)) or not chunk.isascii() or sniff(head) is not None
+
+
+def resolve(charset: str, body: bytes, final: bool = True) -> tuple:
+    """(encoding, source) of a page, with source one of "header", "meta", "detected".
+
+    Order: the Content-Type charset, then a BOM or <meta charset>, then a UTF-8 check of `body`
+    (windows-1251 if it fails). Nothing is remembered per host: one site can mix encodings, so every
+    undeclared page gets the check. final=False means `body` is only the start of the page.
+    """
+    encoding = normalize(charset) if charset else None
+    if encoding is not None:
+        return encoding, "header"
+    encoding = sniff(body)
+    if encoding is not None:
+        return encoding, "meta"
+    return ("utf-8" if is_utf8(body, final) else FALLBACK_ENCODING), "detected"
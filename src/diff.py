@@ -0,0 +1,120 @@
+import difflib
+
+
+class Change:
+    """Difference between two consecutive results of one (url, selector)."""
+
+    __slots__ = ("timestamp", "url", "selector", "added", "removed", "changed")
+
+    def __init__(self, timestamp: str, url: str, selector: str, added=(), removed=(), changed=()):
+        self.timestamp = timestamp
+        self.url = url
+        self.selector = selector
+        self.added = tuple(added)
+        self.removed = tuple(removed)
+        self.changed = tuple(changed)  # (old, new) двойки на едни и същи позиции
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Change) and all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"Change({self.url!r}, {self.selector!r}, +{len(self.added)} "
+                f"-{len(self.removed)} ~{len(self.changed)})")
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": self.timestamp,
+            "url": self.url,
+            "selector": self.selector,
+            "added": list(self.added),
+            "removed": list(self.removed),
+            "changed": [list(pair) for pair in self.changed],
+        }
+
+
+def diff_texts(old: list, new: list) -> tuple:
+    """(added, removed, changed) between two text lists, aligned by difflib."""
+    added, removed, changed = [], [], []
+    if old == new:
+        return added, removed, changed
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "insert":
+            added.extend(new[j1:j2])
+        elif tag == "delete":
+            removed.extend(old[i1:i2])
+        elif tag == "replace":
+            # Еднакви позиции -> "промяна" (напр. нова цена); излишъкът е добавен/премахнат
+            pairs = min(i2 - i1, j2 - j1)
+            changed.extend(zip(old[i1:i1 + pairs], new[j1:j1 + pairs]))
+            removed.extend(old[i1 + pairs:i2])
+            added.extend(new[j1 + pairs:j2])
+    return added, removed, changed
+
+
+class ChangeDetector:
+    """Compares each result with the previous one for the same URL and emits only the differences.
+
+    With a store attached, results are persisted as a full keyframe (first sight of a URL, changed
+    selector set, or after `keyframe_every` deltas) followed by deltas that contain only the
+    selectors whose texts changed; unchanged results are not written at all.
+    """
+
+    def __init__(self, store=None, keyframe_every: int = 50):
+        self.store = store
+        self.keyframe_every = keyframe_every
+        self.state = {}  # dict[str, dict[str, list[str]]] - последен резултат на всеки URL
+        self.deltas = {}  # dict[str, int] - делти след последния keyframe
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """callback(changes: list[Change]) is called only when a result differs from the previous one."""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def forget(self, url: str):
+        self.state.pop(url, None)
+        self.deltas.pop(url, None)
+
+    def observe(self, timestamp: str, url: str, result: dict) -> list:
+        if result is None:
+            # Неуспешно извличане не е "всичко изчезна" - пазим предишното състояние
+            if self.store is not None:
+                self.store.add_result(timestamp, url, None, keyframe=False)
+            return []
+
+        previous = self.state.get(url)
+        changes = []
+        for selector, texts in result.items():
+            old = previous.get(selector, []) if previous is not None else []
+            change = Change(timestamp, url, selector, *diff_texts(old, texts))
+            if change:
+                changes.append(change)
+        if previous is not None:
+            for selector in previous.keys() - result.keys():
+                if previous[selector]:
+                    changes.append(Change(timestamp, url, selector, removed=previous[selector]))
+
+        keyframe = previous is None or previous.keys() != result.keys() or \
+            self.deltas.get(url, 0) >= self.keyframe_every
+        if self.store is not None:
+            if keyframe:
+                self.store.add_result(timestamp, url, result)
+            elif changes:
+                changed = {change.selector for change in changes}
+                self.store.add_result(timestamp, url, {s: result[s] for s in result if s in changed}, keyframe=False)
+        if keyframe:
+            self.deltas[url] = 0
+        elif changes:
+            self.deltas[url] = self.deltas.get(url, 0) + 1
+        self.state[url] = result
+
+        if changes:
+            for callback in self.subscribers:
+                callback(changes)
+        return changes
@@ -0,0 +1,224 @@
+import functools
+import time
+
+# lxml, cssselect и bs4 се импортират при първа употреба, за да е бърз стартът
+# (а в режим "process" основният процес изобщо не парсва)
+
+# Текстът в тези тагове не влиза в get_text() на родителя (същото поведение като bs4)
+SKIPPED_TAGS = frozenset({"script", "style", "template"})
+
+
+@functools.lru_cache(maxsize=None)
+def _translator():
+    from cssselect import HTMLTranslator
+
+    return HTMLTranslator()
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_selector(selector: str):
+    """Compile a CSS selector to an lxml XPath once; None if cssselect cannot translate it."""
+    from cssselect import SelectorError
+    from lxml import etree
+
+    try:
+        return etree.XPath(_translator().css_to_xpath(selector))
+    except (SelectorError, etree.XPathError):
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def valid_selector(selector: str) -> bool:
+    """True if either engine can match `selector` (cssselect, or soupsieve for the bs4 fallback)."""
+    if compile_selector(selector) is not None:
+        return True
+    import soupsieve
+
+    try:
+        soupsieve.compile(selector)
+    except (soupsieve.SelectorSyntaxError, ValueError, NotImplementedError):
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def _html_parser(encoding: str):
+    import lxml.html
+
+    return lxml.html.HTMLParser(encoding=encoding)
+
+
+def _strings(element, top: bool = True):
+    if element.text and (top or element.tag not in SKIPPED_TAGS):
+        yield element.text
+    for child in element:
+        # Коментари и processing instructions имат tag, който не е str
+        if isinstance(child.tag, str) and child.tag not in SKIPPED_TAGS:
+            yield from _strings(child, False)
+        if child.tail:
+            yield child.tail
+
+
+def element_text(element) -> str:
+    """Equivalent of bs4 `get_text(separator=" ", strip=True)` for an lxml element."""
+    return " ".join(s for s in (s.strip() for s in _strings(element)) if s)
+
+
+class SoupEngine:
+    """Compatibility engine: full BeautifulSoup tree and soupsieve selectors."""
+
+    name = "bs4"
+
+    def parse(self, html: str):
+        from bs4 import BeautifulSoup
+
+        # Байтове (decoding.Body) носят кодирането си
+        return BeautifulSoup(html, "lxml", from_encoding=getattr(html, "encoding", None))
+
+    def select_text(self, document, selector: str) -> list:
+        return [el.get_text(separator=" ", strip=True) for el in document.select(selector)]
+
+    def extract(self, html: str, selectors, timings: dict = None) -> dict:
+        """{selector: [texts]}; with `timings`, fills in seconds spent on "parse" and on each selector."""
+        start = time.perf_counter()
+        soup = self.parse(html)
+        if timings is None:
+            return {selector: self.select_text(soup, selector) for selector in selectors}
+        timings["parse"] = time.perf_counter() - start
+        result = {}
+        for selector in selectors:
+            start = time.perf_counter()
+            result[selector] = self.select_text(soup, selector)
+            timings[selector] = time.perf_counter() - start
+        return result
+
+
+class LxmlEngine:
+    """Parses with lxml.html and matches cached XPath compiled from CSS selectors."""
+
+    name = "lxml"
+
+    def __init__(self):
+        self.fallback = SoupEngine()
+
+    def parse(self, html):
+        import lxml.html
+        from lxml import etree
+
+        try:
+            encoding = getattr(html, "encoding", None)
+            if encoding is not None:
+                # decoding.Body: libxml2 декодира байтовете сам, без str в Python
+                return lxml.html.document_fromstring(html, parser=_html_parser(encoding))
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode низ с XML декларация за кодиране
+            if isinstance(html, str):
+                return lxml.html.document_fromstring(html.encode("utf-8"))
+            raise
+        except etree.ParserError:
+            return None
+
+    def extract(self, html, selectors, timings: dict = None) -> dict:
+        start = time.perf_counter()
+        root = self.parse(html)
+        if timings is not None:
+            timings["parse"] = time.perf_counter() - start
+        return self.select(root, selectors, timings, html)
+
+    def select(self, root, selectors, timings: dict = None, html=None) -> dict:
+        """Match `selectors` against a parsed document; bs4 fallback selectors reparse `html` (or the tree)."""
+        result = {}
+        soup = None
+        for selector in selectors:
+            start = time.perf_counter()
+            xpath = compile_selector(selector)
+            if xpath is not None:
+                result[selector] = [element_text(el) for el in xpath(root)] if root is not None else []
+            else:
+                # Селектор, който cssselect не поддържа (напр. :-soup-contains) -> bs4
+                if soup is None:
+                    if html is None:
+                        from lxml import etree
+
+                        html = etree.tostring(root, encoding="unicode", method="html") if root is not None else ""
+                    soup = self.fallback.parse(html)
+                result[selector] = self.fallback.select_text(soup, selector)
+            if timings is not None:
+                timings[selector] = time.perf_counter() - start
+        return result
+
+
+def _complete(element) -> bool:
+    # Парсерът е стигнал след елемента, ако той или някой негов родител вече има следващ брат
+    return element.getnext() is not None or any(parent.getnext() is not None for parent in element.iterancestors())
+
+
+class StreamParser:
+    """lxml's incremental HTML parser, fed with body chunks while they download.
+
+    matched() tells whether every selector already has a fully parsed match, so a caller that only
+    needs the first matches can stop reading; close() finishes the tree and returns the root.
+    """
+
+    def __init__(self, selectors, encoding: str = "utf-8"):
+        from lxml import etree
+
+        self._parser = etree.HTMLPullParser(events=("start",), tag="html", encoding=encoding)
+        self.root = None
+        self.size = 0
+        # Селектори за bs4 не могат да се проверят върху недовършено дърво
+        compiled = [compile_selector(selector) for selector in selectors]
+        self._pending = None if None in compiled else compiled
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        self._parser.feed(chunk)
+        if self.root is None:
+            for _, element in self._parser.read_events():
+                self.root = element
+
+    def matched(self) -> bool:
+        if self.root is None or self._pending is None:
+            return False
+        self._pending = [xpath for xpath in self._pending if not any(_complete(el) for el in xpath(self.root))]
+        return not self._pending
+
+    def close(self):
+        from lxml import etree
+
+        try:
+            self.root = self._parser.close()
+        except etree.XMLSyntaxError:  # празно тяло
+            self.root = None
+        return self.root
+
+
+ENGINES = {
+    LxmlEngine.name: LxmlEngine,
+    SoupEngine.name: SoupEngine,
+}
+
+
+def get_engine(name: str = "lxml"):
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extraction engine: {name!r}") from None
+
+
+_process_engines = {}
+
+
+def extract_page(engine_name: str, html, selectors, timed: bool = False):
+    """Picklable entry point for parse workers; each process keeps its own engine and selector cache.
+
+    With timed=True returns (result, timings) - see extract().
+    """
+    engine = _process_engines.get(engine_name)
+    if engine is None:
+        engine = _process_engines[engine_name] = get_engine(engine_name)
+    if not timed:
+        return engine.extract(html, selectors)
+    timings = {}
+    return engine.extract(html, selectors, timings), timings
@@ -0,0 +1,178 @@
+import contextlib
+import csv
+import gzip
+import json
+import sys
+
+CSV_HEADER = ["timestamp", "url", "selector", "text"]
+CSV_CHUNK_ROWS = 10_000
+JSON_READ_CHUNK = 1 << 20
+
+
+def snapshots(data):
+    """(timestamp, snapshot) pairs from a dict, a SnapshotStore or an iterable of pairs."""
+    return data.items() if hasattr(data, "items") else data
+
+
+def open_text(filename: str, mode: str = "r", compress: bool = None):
+    """Open a UTF-8 text file, gzip-compressed when `compress` is set or the name ends with .gz; "-" is stdin/stdout."""
+    if filename == "-":
+        return contextlib.nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    if compress is None:
+        compress = str(filename).endswith(".gz")
+    if compress:
+        return gzip.open(filename, mode + "t", encoding="utf-8", newline="", compresslevel=6)
+    return open(filename, mode, encoding="utf-8", newline="")
+
+
+# --- JSON Lines: един ред на (timestamp, url) ---
+
+def write_jsonl(data, filename: str, compress: bool = None, mode: str = "w") -> int:
+    lines = 0
+    with open_text(filename, mode, compress) as f:
+        for timestamp, snapshot in snapshots(data):
+            for url, result in snapshot.items():
+                record = {"timestamp": timestamp, "url": url, "result": result}
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                lines += 1
+    return lines
+
+
+def read_jsonl(filename: str, compress: bool = None):
+    """Yield (timestamp, snapshot), grouping consecutive lines with the same timestamp."""
+    current, snapshot = None, None
+    with open_text(filename, "r", compress) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["timestamp"] != current:
+                if current is not None:
+                    yield current, snapshot
+                current, snapshot = record["timestamp"], {}
+            snapshot[record["url"]] = record["result"]
+    if current is not None:
+        yield current, snapshot
+
+
+# --- CSV ---
+
+def csv_rows(data):
+    for timestamp, urls in snapshots(data):
+        for url, selectors in urls.items():
+            if selectors:
+                for selector, texts in selectors.items():
+                    for text in texts:
+                        yield timestamp, url, selector, text
+
+
+def write_csv(data, filename: str, compress: bool = None, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    rows = 0
+    with open_text(filename, "w", compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        chunk = []
+        for row in csv_rows(data):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                writer.writerows(chunk)
+                rows += len(chunk)
+                chunk.clear()
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def read_csv(filename: str, compress: bool = None):
+    """Yield (timestamp, snapshot) from a CSV export; URLs without matches are not in the CSV."""
+    current, snapshot = None, None
+    with open_text(filename, "r", compress) as f:
+        reader = csv.reader(f)
+        if next(reader, None) != CSV_HEADER:
+            raise ValueError(f"{filename}: not a tracker CSV export")
+        for timestamp, url, selector, text in reader:
+            if timestamp != current:
+                if current is not None:
+                    yield current, snapshot
+                current, snapshot = timestamp, {}
+            snapshot.setdefault(url, {}).setdefault(selector, []).append(text)
+    if current is not None:
+        yield current, snapshot
+
+
+# --- JSON (формат на save_to_json) ---
+
+def write_json(data, filename: str, compress: bool = None):
+    # Снимка по снимка, със същия резултат като json.dump(data, indent=4)
+    with open_text(filename, "w", compress) as f:
+        f.write("{")
+        empty = True
+        for timestamp, snapshot in snapshots(data):
+            body = json.dumps(snapshot, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+            f.write(("\n    " if empty else ",\n    ") + json.dumps(timestamp, ensure_ascii=False) + ": " + body)
+            empty = False
+        f.write("}" if empty else "\n}")
+
+
+def read_json(filename: str, compress: bool = None, chunk_size: int = JSON_READ_CHUNK):
+    """Yield (key, value) pairs of a top-level JSON object without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open_text(filename, "r", compress) as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        def expect(char: str):
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buffer) or buffer[pos] != char:
+                raise ValueError(f"{filename}: expected {char!r} at offset {pos}")
+            pos += 1
+
+        def value():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    result, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                # Число в края на буфера може да е отрязано - дочитаме преди да го приемем
+                if end == len(buffer) and not eof:
+                    fill()
+                    continue
+                pos = end
+                return result
+
+        fill()
+        expect("{")
+        skip_ws()
+        if pos < len(buffer) and buffer[pos] == "}":
+            return
+        while True:
+            key = value()
+            expect(":")
+            yield key, value()
+            skip_ws()
+            if pos < len(buffer) and buffer[pos] == ",":
+                pos += 1
+                continue
+            expect("}")
+            return
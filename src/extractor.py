@@ -0,0 +1,198 @@
+import csv
+import datetime
+import re
+from urllib.parse import urlsplit
+
+from engine import LxmlEngine
+from export import open_text
+from seen import SEEN
+
+CARD_CLASS = "css-1sw7q4x"
+PRICE_SELECTOR = 'p[data-testid="ad-price"]'
+MISSING = "N/A"
+
+# Обява: /d/ad/<slug>-ID<id>.html; по-стари/други раздели: /d/<път>-ID<id>.html
+AD_URL_RE = re.compile(r"^(?:https?://(?:www\.)?olx\.bg)?(/d/ad/[\w.-]+-ID\w+\.html)")
+AD_URL_FALLBACK_RE = re.compile(r"^(?:https?://(?:www\.)?olx\.bg)?(/d/[\w./-]*-ID\w+\.html)")
+AD_ID_RE = re.compile(r"-ID(\w+)\.html")
+PAGE_RE = re.compile(r"[?&]page=(\d+)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Колоните на CSV-то -> полетата на Ad
+FIELDS = {
+    "Price": "price",
+    "Product/Title": "title",
+    "Ad_URL": "ad_url",
+    "Source_URL": "source_url",
+    "Extracted_At": "extracted_at",
+}
+
+
+def clean(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def price_text(own, full) -> str:
+    """Price from the element's own text pieces ("15 900 лв.", without a nested "Договаряне").
+
+    `own` are the text nodes directly inside the element; `full()` gives all of its text, used when
+    it has no own text. Shared by Ad cards (BeautifulSoup) and the bulk lxml path.
+    """
+    text = "".join(piece for piece in own if piece)
+    return clean(text if text.strip() else full()) or MISSING
+
+
+def match_ad_path(hrefs) -> str:
+    """Path of the first ad link among `hrefs` (primary pattern first, then the fallback); None if none."""
+    hrefs = [href for href in hrefs if href]
+    for pattern in (AD_URL_RE, AD_URL_FALLBACK_RE):
+        for href in hrefs:
+            match = pattern.match(href)
+            if match:
+                return match.group(1)
+    return None
+
+
+def last_page(root) -> int:
+    """Highest `?page=N` linked from the page (the pagination bar); 1 if there is none."""
+    pages = [int(match.group(1)) for match in map(PAGE_RE.search, (a.get("href") or "" for a in root.iter("a")))
+             if match]
+    return max(pages, default=1)
+
+
+class Ad:
+    """One ad card; indexable by the CSV column names ("Price", "Product/Title", ...)."""
+
+    __slots__ = ("price", "title", "ad_url", "source_url", "extracted_at")
+
+    def __init__(self, price: str, title: str, ad_url: str, source_url: str, extracted_at: str):
+        self.price = price
+        self.title = title
+        self.ad_url = ad_url
+        self.source_url = source_url
+        self.extracted_at = extracted_at
+
+    @property
+    def ad_id(self) -> str:
+        """Stable OLX ad ID from the ad URL (`...-IDabc123.html` -> "abc123"); None if there is none."""
+        match = AD_ID_RE.search(self.ad_url)
+        return match.group(1) if match else None
+
+    def __getitem__(self, column: str) -> str:
+        return getattr(self, FIELDS[column])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Ad) and all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Ad({self.price!r}, {self.title!r}, {self.ad_url!r})"
+
+    def to_dict(self) -> dict:
+        return {column: getattr(self, field) for column, field in FIELDS.items()}
+
+
+class Extractor:
+    """Structured extraction of OLX search result cards (price, title, ad URL).
+
+    get_price/get_product/get_ad_url work on a single BeautifulSoup card; extract_information_from_page
+    parses the whole page once with lxml and processes all cards in bulk.
+    """
+
+    def __init__(self, base_url: str, index=None):
+        self.base_url = base_url
+        self.index = index  # SeenIndex: вече видени обяви без промяна не влизат в data
+        parts = urlsplit(base_url)
+        self.origin = f"{parts.scheme}://{parts.netloc}" if parts.netloc else "https://www.olx.bg"
+        self.engine = LxmlEngine()
+        self.data = []  # list[Ad]
+
+    # --- Една карта (BeautifulSoup) ---
+
+    def get_price(self, card) -> str:
+        price = card.select_one(PRICE_SELECTOR)
+        if price is None:
+            return MISSING
+        from bs4 import Comment
+
+        own = (text for text in price.find_all(string=True, recursive=False) if not isinstance(text, Comment))
+        return price_text(own, price.get_text)
+
+    def get_product(self, card) -> str:
+        title = card.find("h6")
+        if title is None:
+            return MISSING
+        return clean(title.get_text()) or MISSING
+
+    def get_ad_url(self, card) -> str:
+        path = match_ad_path(a.get("href") for a in card.find_all("a"))
+        return self.origin + path if path else MISSING
+
+    # --- Цяла страница (lxml) ---
+
+    def parse_cards(self, html, extracted_at: str = None) -> list:
+        """All cards with a price on one page as Ad records."""
+        root = self.engine.parse(html)
+        return self._cards(root, extracted_at) if root is not None else []
+
+    def parse_listing(self, html, extracted_at: str = None) -> tuple:
+        """(ads, last_page) of a search results page, from a single parse."""
+        root = self.engine.parse(html)
+        if root is None:
+            return [], 1
+        return self._cards(root, extracted_at), last_page(root)
+
+    def _cards(self, root, extracted_at: str = None) -> list:
+        if extracted_at is None:
+            extracted_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        source_url, origin = self.base_url, self.origin
+
+        ads = []
+        for card in root.iter("div"):
+            classes = card.get("class")
+            if not classes or CARD_CLASS not in classes.split():
+                continue
+            # Едно обхождане на картата вместо отделен XPath за всяко поле
+            price = title = None
+            hrefs = []
+            for element in card.iter("p", "h6", "a"):
+                tag = element.tag
+                if tag == "a":
+                    hrefs.append(element.get("href"))
+                elif tag == "h6":
+                    if title is None:
+                        title = element
+                elif price is None and element.get("data-testid") == "ad-price":
+                    price = element
+            if price is None:
+                continue
+            own = [price.text]
+            own.extend(child.tail for child in price)
+            path = match_ad_path(hrefs)
+            ads.append(Ad(
+                price_text(own, lambda: "".join(price.itertext())),
+                clean("".join(title.itertext())) or MISSING if title is not None else MISSING,
+                origin + path if path else MISSING,
+                source_url,
+                extracted_at,
+            ))
+        return ads
+
+    def extract_information_from_page(self, html) -> list:
+        """Append the page's ads (cards without a price are skipped) to `data` and return them."""
+        ads = self.parse_cards(html)
+        if self.index is not None:
+            ads = [ad for ad, status in zip(ads, self.index.observe(ads)) if status != SEEN]
+        self.data.extend(ads)
+        return ads
+
+    def save_to_csv(self, filename: str = "olx_ads.csv") -> int:
+        with open_text(filename, "w") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows([ad[column] for column in FIELDS] for ad in self.data)
+        return len(self.data)
+
+
+def parse_listing(source_url: str, html, extracted_at: str = None) -> tuple:
+    """Picklable entry point for parse workers: (ads, last_page) of one search results page."""
+    return Extractor(source_url).parse_listing(html, extracted_at)
@@ -1,6 +1,7 @@
+import bootstrap  # noqa: F401 - пакетът exceptions е в корена на репото
 from app import App
 
 
 if __name__ == "__main__":
     app = App()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
@@ -0,0 +1,349 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# Фазите на една заявка; ttfb се мери от началото на заявката (с DNS и свързването) до заглавките
+PHASES = ("dns", "connect", "ttfb", "download", "decode", "parse")
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus sense."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # последният е +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest bucket for the overflow)."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+
+class UrlStats:
+    __slots__ = ("fetches", "bytes", "statuses", "last")
+
+    def __init__(self):
+        self.fetches = 0
+        self.bytes = 0
+        self.statuses = Counter()
+        self.last = {}  # фаза или селектор -> секунди при последното извличане
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Counters and latency histograms for the fetch/parse hot path of a ClassTracker.
+
+    Network phases come from aiohttp trace hooks (trace_config()), download/decode/parse/selector
+    timers from the tracker itself. Read them with snapshot(), to_prometheus() or summary().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.selectors = {}  # dict[str, Histogram]
+        self.urls = {}  # dict[str, UrlStats]
+        self.statuses = Counter()
+        self.errors = Counter()  # име на изключението -> брой
+        self.coalesced = Counter()  # "inflight" / "fresh" -> извличания, обслужени без собствена заявка
+        self.proxy_requests = Counter()  # (прокси, "ok" / "failed") -> заявки
+        self.proxy_ejections = Counter()  # прокси -> изхвърляния
+        self.bytes = 0
+        self.responses = 0
+        # Декодиране: байтове по мрежата (компресирани), тела по Content-Encoding и по източник на charset-а,
+        # байтове, декодирани в Python, и байтове, подадени направо на парсера
+        self.wire_bytes = 0
+        self.content_encodings = Counter()
+        self.charsets = Counter()
+        self.decoded_bytes = 0
+        self.native_bytes = 0
+        self.cycles = 0
+        self.last_cycle = None  # (секунди, брой URL-и) на последния extract_all
+
+    def _url(self, url: str) -> UrlStats:
+        stats = self.urls.get(url)
+        if stats is None:
+            stats = self.urls[url] = UrlStats()
+        return stats
+
+    # --- Запис ---
+
+    def observe(self, url: str, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase].observe(seconds)
+            self._url(url).last[phase] = seconds
+
+    def observe_timings(self, url: str, timings: dict):
+        """Parse timings from engine.extract(): "parse" plus one entry per selector."""
+        with self._lock:
+            stats = self._url(url)
+            for name, seconds in timings.items():
+                histogram = self.phases["parse"] if name == "parse" else self.selectors.get(name)
+                if histogram is None:
+                    histogram = self.selectors[name] = Histogram()
+                histogram.observe(seconds)
+                stats.last[name] = seconds
+
+    def observe_response(self, url: str, status: int, size: int):
+        with self._lock:
+            self.statuses[status] += 1
+            self.bytes += size
+            self.responses += 1
+            stats = self._url(url)
+            stats.fetches += 1
+            stats.bytes += size
+            stats.statuses[status] += 1
+
+    def observe_body(self, content_encoding: str, wire: int, charset_source: str):
+        with self._lock:
+            self.wire_bytes += wire
+            self.content_encodings[content_encoding] += 1
+            self.charsets[charset_source] += 1
+
+    def observe_decoded(self, size: int, native: bool):
+        """`size` bytes were decoded to str in Python (native=False) or handed to the parser undecoded."""
+        with self._lock:
+            if native:
+                self.native_bytes += size
+            else:
+                self.decoded_bytes += size
+
+    def observe_error(self, url: str, error: Exception):
+        with self._lock:
+            self.errors[type(error).__name__] += 1
+
+    def observe_coalesced(self, kind: str):
+        with self._lock:
+            self.coalesced[kind] += 1
+
+    def observe_proxy(self, proxy: str, ok: bool, ejected: bool = False):
+        with self._lock:
+            self.proxy_requests[proxy, "ok" if ok else "failed"] += 1
+            if ejected:
+                self.proxy_ejections[proxy] += 1
+
+    def observe_cycle(self, seconds: float, urls: int):
+        with self._lock:
+            self.cycles += 1
+            self.last_cycle = (seconds, urls)
+
+    def forget(self, url: str):
+        with self._lock:
+            self.urls.pop(url, None)
+
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        """aiohttp hooks that time DNS resolution, connection setup and time to first byte."""
+        import aiohttp
+
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            ctx.url = str(params.url)
+            ctx.start = time.perf_counter()
+
+        async def on_dns_resolvehost_start(session, ctx: SimpleNamespace, params):
+            ctx.dns = time.perf_counter()
+
+        async def on_dns_resolvehost_end(session, ctx: SimpleNamespace, params):
+            self.observe(ctx.url, "dns", time.perf_counter() - ctx.dns)
+
+        async def on_connection_create_start(session, ctx: SimpleNamespace, params):
+            ctx.connect = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx: SimpleNamespace, params):
+            self.observe(ctx.url, "connect", time.perf_counter() - ctx.connect)
+
+        async def on_request_end(session, ctx: SimpleNamespace, params):
+            # Извиква се, щом пристигнат заглавките на отговора - тялото още не е изтеглено
+            self.observe(ctx.url, "ttfb", time.perf_counter() - ctx.start)
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(on_request_start)
+        config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        config.on_connection_create_start.append(on_connection_create_start)
+        config.on_connection_create_end.append(on_connection_create_end)
+        config.on_request_end.append(on_request_end)
+        return config
+
+    # --- Четене ---
+
+    def snapshot(self) -> dict:
+        def histogram(h: Histogram) -> dict:
+            return {"count": h.count, "sum": h.sum, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "bytes": self.bytes,
+                "statuses": dict(self.statuses),
+                "errors": dict(self.errors),
+                "wire_bytes": self.wire_bytes,
+                "content_encodings": dict(self.content_encodings),
+                "charsets": dict(self.charsets),
+                "decoded_bytes": self.decoded_bytes,
+                "native_bytes": self.native_bytes,
+                "coalesced": dict(self.coalesced),
+                "proxies": {
+                    proxy: {"ok": self.proxy_requests[proxy, "ok"], "failed": self.proxy_requests[proxy, "failed"],
+                            "ejections": self.proxy_ejections[proxy]}
+                    for proxy in sorted({proxy for proxy, _ in self.proxy_requests})
+                },
+                "cycles": self.cycles,
+                "last_cycle_seconds": self.last_cycle[0] if self.last_cycle else None,
+                "phases": {phase: histogram(h) for phase, h in self.phases.items()},
+                "selectors": {selector: histogram(h) for selector, h in self.selectors.items()},
+                "urls": {
+                    url: {"fetches": s.fetches, "bytes": s.bytes, "statuses": dict(s.statuses), "last": dict(s.last)}
+                    for url, s in self.urls.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (for a textfile collector or the /metrics endpoint)."""
+        lines = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, h: Histogram):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            header("tracker_responses_total", "counter", "HTTP responses by status code.")
+            for status, count in sorted(self.statuses.items()):
+                lines.append(f'tracker_responses_total{{status="{status}"}} {count}')
+            header("tracker_response_bytes_total", "counter", "Response body bytes downloaded.")
+            lines.append(f"tracker_response_bytes_total {self.bytes}")
+            header("tracker_wire_bytes_total", "counter", "Response body bytes as received, before decompression.")
+            lines.append(f"tracker_wire_bytes_total {self.wire_bytes}")
+            header("tracker_content_encoding_total", "counter", "Response bodies by Content-Encoding.")
+            for name, count in sorted(self.content_encodings.items()):
+                lines.append(f'tracker_content_encoding_total{{encoding="{_escape(name)}"}} {count}')
+            header("tracker_charset_total", "counter", "Response bodies by where their character encoding came from.")
+            for source, count in sorted(self.charsets.items()):
+                lines.append(f'tracker_charset_total{{source="{source}"}} {count}')
+            header("tracker_decoded_bytes_total", "counter",
+                   "Body bytes decoded to text in Python (by=python) or by the parser itself (by=parser).")
+            lines.append(f'tracker_decoded_bytes_total{{by="python"}} {self.decoded_bytes}')
+            lines.append(f'tracker_decoded_bytes_total{{by="parser"}} {self.native_bytes}')
+            header("tracker_errors_total", "counter", "Failed extractions by exception type.")
+            for name, count in sorted(self.errors.items()):
+                lines.append(f'tracker_errors_total{{type="{name}"}} {count}')
+            header("tracker_coalesced_total", "counter",
+                   "Extractions answered by a shared in-flight fetch or a fresh result, by kind.")
+            for kind, count in sorted(self.coalesced.items()):
+                lines.append(f'tracker_coalesced_total{{kind="{kind}"}} {count}')
+            if self.proxy_requests:
+                header("tracker_proxy_requests_total", "counter", "Requests through each egress proxy by outcome.")
+                for (proxy, outcome), count in sorted(self.proxy_requests.items()):
+                    lines.append(f'tracker_proxy_requests_total{{proxy="{_escape(proxy)}",outcome="{outcome}"}} {count}')
+                header("tracker_proxy_ejections_total", "counter", "Times each egress proxy was ejected as unhealthy.")
+                for proxy, count in sorted(self.proxy_ejections.items()):
+                    lines.append(f'tracker_proxy_ejections_total{{proxy="{_escape(proxy)}"}} {count}')
+            header("tracker_cycles_total", "counter", "Completed extract_all cycles.")
+            lines.append(f"tracker_cycles_total {self.cycles}")
+            if self.last_cycle is not None:
+                header("tracker_last_cycle_seconds", "gauge", "Duration of the last extract_all cycle.")
+                lines.append(f"tracker_last_cycle_seconds {self.last_cycle[0]}")
+            header("tracker_phase_seconds", "histogram", "Time per request phase.")
+            for phase, h in self.phases.items():
+                histogram("tracker_phase_seconds", f'phase="{phase}"', h)
+            header("tracker_selector_seconds", "histogram", "Time spent matching each CSS selector.")
+            for selector, h in sorted(self.selectors.items()):
+                histogram("tracker_selector_seconds", f'selector="{_escape(selector)}"', h)
+            header("tracker_url_last_seconds", "gauge", "Phase and selector timings of the last fetch of each URL.")
+            for url, stats in sorted(self.urls.items()):
+                for name, seconds in stats.last.items():
+                    key = "phase" if name in self.phases else "selector"
+                    lines.append(f'tracker_url_last_seconds{{url="{_escape(url)}",{key}="{_escape(name)}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # Записваме във временен файл и го преименуваме, за да не се прочете наполовина записан
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1"):
+        """Serve to_prometheus() on http://host:port/metrics from a daemon thread; returns the server."""
+        import http.server
+
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="tracker-metrics").start()
+        return server
+
+    def summary(self) -> str:
+        """A few lines for the Лог tab: cycle totals, phase medians and the slowest selectors."""
+        with self._lock:
+            parts = []
+            if self.last_cycle is not None:
+                seconds, urls = self.last_cycle
+                parts.append(f"Последен цикъл: {urls} URL-а за {seconds:.2f} s")
+            parts.append(f"Отговори: {self.responses} ({self.bytes / 2 ** 20:.1f} MB), статуси: "
+                         + ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items())))
+            if self.wire_bytes:
+                parts.append(f"По мрежата: {self.wire_bytes / 2 ** 20:.1f} MB ("
+                             + ", ".join(f"{name}: {count}" for name, count in sorted(self.content_encodings.items()))
+                             + f"); декодирани в Python {self.decoded_bytes / 2 ** 20:.1f} MB, "
+                             f"направо в парсера {self.native_bytes / 2 ** 20:.1f} MB")
+            if self.coalesced:
+                parts.append("Без нова заявка: " + ", ".join(
+                    f"{kind}: {count}" for kind, count in sorted(self.coalesced.items())))
+            if self.proxy_requests:
+                parts.append("Проксита: " + ", ".join(
+                    f"{proxy} {self.proxy_requests[proxy, 'ok']}/{self.proxy_requests[proxy, 'failed']}"
+                    + (f" (изхвърлено {self.proxy_ejections[proxy]}x)" if self.proxy_ejections[proxy] else "")
+                    for proxy in sorted({proxy for proxy, _ in self.proxy_requests})))
+            if self.errors:
+                parts.append("Грешки: " + ", ".join(f"{name}: {count}" for name, count in self.errors.most_common()))
+            phases = [f"{phase} {h.sum / h.count * 1000:.0f} ms" for phase, h in self.phases.items() if h.count]
+            if phases:
+                parts.append("Средно по фази: " + ", ".join(phases))
+            slowest = sorted(self.selectors.items(), key=lambda item: item[1].sum, reverse=True)[:3]
+            if slowest:
+                parts.append("Най-бавни селектори: " + ", ".join(
+                    f"'{selector}' {h.sum / h.count * 1000:.1f} ms" for selector, h in slowest))
+            return "\n".join(parts)
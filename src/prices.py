@@ -0,0 +1,286 @@
+import bisect
+import datetime
+import json
+import os
+import re
+import statistics
+import struct
+from array import array
+
+# Левът е фиксиран към еврото; други валути нямат постоянен курс и не влизат в историята
+RATES = {"BGN": 1.0, "EUR": 1.95583}
+
+CURRENCIES = {
+    "лв": "BGN", "лв.": "BGN", "bgn": "BGN",
+    "€": "EUR", "eur": "EUR", "евро": "EUR",
+    "$": "USD", "usd": "USD",
+}
+FREE = ("безплатно", "подарявам")
+
+PRICE_RE = re.compile(
+    r"(?P<before>€|\$|EUR|USD|BGN)?\s*"
+    r"(?P<number>\d[\d\s.,]*)"
+    r"\s*(?P<after>лв\.?|BGN|€|EUR|евро|\$|USD)?",
+    re.IGNORECASE,
+)
+THOUSANDS_RE = re.compile(r"^\d{1,3}(\.\d{3})+$")
+COMMA_THOUSANDS_RE = re.compile(r"^\d{1,3}(,\d{3})+$")
+
+MAGIC = b"PRICES1\n"
+
+
+def parse_number(number: str) -> float:
+    number = re.sub(r"\s", "", number).rstrip(".,")
+    if "," in number and "." in number and number.rindex(".") > number.rindex(","):
+        # "1,200.50" - точката е десетична, запетаите делят хилядите
+        return float(number.replace(",", ""))
+    if COMMA_THOUSANDS_RE.match(number):
+        # "1,200" - запетая с точно три цифри след нея и без друг разделител: хиляди
+        return float(number.replace(",", ""))
+    if "," in number:
+        # "1.200,50", "1200,5" - запетаята е десетична, точките делят хилядите
+        return float(number.replace(".", "").replace(",", "."))
+    if THOUSANDS_RE.match(number):
+        return float(number.replace(".", ""))
+    return float(number)
+
+
+def parse_price(text: str) -> tuple:
+    """("15 900 лв.") -> (15900.0, "BGN"); (None, None) for "Размяна", "N/A" and other non-prices."""
+    lowered = text.strip().lower()
+    if lowered.startswith(FREE):
+        return 0.0, None
+    match = PRICE_RE.search(text)
+    if match is None:
+        return None, None
+    symbol = match.group("after") or match.group("before")
+    try:
+        amount = parse_number(match.group("number"))
+    except ValueError:
+        return None, None
+    return amount, CURRENCIES.get(symbol.lower()) if symbol else None
+
+
+def parse_prices(texts) -> list:
+    """parse_price() for a whole batch; repeated strings (the same price on every tick) are parsed once."""
+    parsed = {}
+    result = []
+    for text in texts:
+        price = parsed.get(text)
+        if price is None:
+            price = parsed[text] = parse_price(text)
+        result.append(price)
+    return result
+
+
+def to_epoch(timestamp) -> float:
+    if isinstance(timestamp, str):
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    return float(timestamp)
+
+
+class Series:
+    """Time-ordered observations of one ad or category: two parallel array columns."""
+
+    __slots__ = ("times", "amounts")
+
+    def __init__(self, times: array = None, amounts: array = None):
+        self.times = times if times is not None else array("d")
+        self.amounts = amounts if amounts is not None else array("d")
+
+    def add(self, time: float, amount: float):
+        if not self.times or time >= self.times[-1]:
+            self.times.append(time)
+            self.amounts.append(amount)
+        else:  # по-старо наблюдение (напр. от backfill) - вмъкваме го на мястото му
+            position = bisect.bisect_right(self.times, time)
+            self.times.insert(position, time)
+            self.amounts.insert(position, amount)
+
+    def window(self, start: float = None, end: float = None) -> array:
+        """Amounts observed in [start, end) - a slice, not a Python-level loop."""
+        low = 0 if start is None else bisect.bisect_left(self.times, start)
+        high = len(self.times) if end is None else bisect.bisect_left(self.times, end)
+        return self.amounts[low:high]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def describe(amounts) -> dict:
+    return {"count": len(amounts), "min": min(amounts), "max": max(amounts),
+            "median": statistics.median(amounts), "mean": sum(amounts) / len(amounts)}
+
+
+class PriceHistory:
+    """Compact per-ad price time series, normalized to one currency, with fast queries.
+
+    Observations live in array.array columns (16 bytes each), once per ad and once per category
+    (by default the search URL the ad was found on), both kept in time order. Queries slice those
+    columns with bisect and reduce them with builtins, so they never walk the observations in Python.
+    """
+
+    def __init__(self, currency: str = "BGN"):
+        if currency not in RATES:
+            raise ValueError(f"Unsupported currency: {currency!r}")
+        self.currency = currency
+        self.ads = {}  # dict[str, Series]
+        self.categories = {}  # dict[str, Series]
+        self.ad_category = {}  # dict[str, str]
+        self.skipped = 0  # цени без сума или с валута без фиксиран курс
+
+    def __len__(self) -> int:
+        return sum(len(series) for series in self.ads.values())
+
+    def convert(self, amount: float, currency: str) -> float:
+        return amount * RATES[currency] / RATES[self.currency]
+
+    # --- Запис ---
+
+    def add(self, ad_id: str, timestamp, amount: float, currency: str = None, category: str = None) -> bool:
+        """Record one observation; `currency` defaults to the history's own. False if it cannot be converted."""
+        currency = currency or self.currency
+        if amount is None or currency not in RATES:
+            self.skipped += 1
+            return False
+        amount = self.convert(amount, currency)
+        time = to_epoch(timestamp)
+        series = self.ads.get(ad_id)
+        if series is None:
+            series = self.ads[ad_id] = Series()
+            self.ad_category[ad_id] = category
+        series.add(time, amount)
+        category = self.ad_category[ad_id]
+        if category is not None:
+            if category not in self.categories:
+                self.categories[category] = Series()
+            self.categories[category].add(time, amount)
+        return True
+
+    def add_prices(self, ad_ids, timestamp, prices, category: str = None) -> int:
+        """Normalize and record a batch of raw price strings observed at one `timestamp`."""
+        time = to_epoch(timestamp)
+        added = 0
+        for ad_id, (amount, currency) in zip(ad_ids, parse_prices(prices)):
+            added += self.add(ad_id, time, amount, currency, category)
+        return added
+
+    def add_ads(self, ads) -> int:
+        """Record extractor.Ad records (ads without an OLX ID are skipped); the category is the search URL."""
+        epochs = {}
+        added = 0
+        for ad, (amount, currency) in zip(ads, parse_prices([ad.price for ad in ads])):
+            ad_id = ad.ad_id
+            if ad_id is None:
+                self.skipped += 1
+                continue
+            time = epochs.get(ad.extracted_at)
+            if time is None:
+                time = epochs[ad.extracted_at] = to_epoch(ad.extracted_at)
+            added += self.add(ad_id, time, amount, currency, ad.source_url)
+        return added
+
+    # --- Заявки ---
+
+    def series(self, ad_id: str) -> Series:
+        return self.ads[ad_id]
+
+    def stats(self, ad_id: str, start=None, end=None) -> dict:
+        """count / min / max / median / mean of one ad's prices in [start, end); None without observations."""
+        amounts = self.ads[ad_id].window(None if start is None else to_epoch(start),
+                                         None if end is None else to_epoch(end))
+        return describe(amounts) if amounts else None
+
+    def summary(self):
+        """Yield (ad_id, stats) for every ad."""
+        for ad_id, series in self.ads.items():
+            yield ad_id, describe(series.amounts)
+
+    def drops(self, threshold: float = 0.1, since=None) -> list:
+        """Ads whose latest price is at least `threshold` (a fraction) below their highest earlier price.
+
+        Only observations from `since` on count. Returns (ad_id, peak, last, change) sorted by the
+        largest drop first; change is negative (-0.15 = 15% cheaper).
+        """
+        since = None if since is None else to_epoch(since)
+        found = []
+        for ad_id, series in self.ads.items():
+            amounts = series.window(since) if since is not None else series.amounts
+            if len(amounts) < 2:
+                continue
+            peak, last = max(amounts[:-1]), amounts[-1]
+            if peak > 0 and (peak - last) / peak >= threshold:
+                found.append((ad_id, peak, last, last / peak - 1))
+        found.sort(key=lambda drop: drop[3])
+        return found
+
+    def aggregate(self, category: str = None, window: float = 86400, start=None, end=None) -> list:
+        """Statistics per time window of `window` seconds for one category (default: all of them).
+
+        Returns one dict per non-empty window: start (ISO time), count, min, max, median, mean.
+        """
+        columns = [self.categories[category]] if category is not None else list(self.categories.values())
+        columns = [series for series in columns if series]
+        if not columns:
+            return []
+        first = to_epoch(start) if start is not None else min(series.times[0] for series in columns)
+        last = to_epoch(end) if end is not None else max(series.times[-1] for series in columns) + 1e-6
+        result = []
+        low = first
+        while low < last:
+            high = min(low + window, last)
+            amounts = array("d")
+            for series in columns:
+                amounts.extend(series.window(low, high))
+            if amounts:
+                stats = describe(amounts)
+                stats["start"] = datetime.datetime.fromtimestamp(low).isoformat(sep=" ")
+                result.append(stats)
+            low = high
+        return result
+
+    # --- Файл ---
+
+    def save(self, path: str):
+        """One binary file: a JSON header (ads, categories, lengths) followed by the raw columns."""
+        ads = list(self.ads.items())
+        categories = list(self.categories.items())
+        header = json.dumps({
+            "currency": self.currency,
+            "skipped": self.skipped,
+            "ads": [[ad_id, self.ad_category[ad_id], len(series)] for ad_id, series in ads],
+            "categories": [[name, len(series)] for name, series in categories],
+        }, ensure_ascii=False).encode("utf-8")
+        # Временен файл + os.replace: прекъснат запис не поврежда предишната история
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for _, series in ads + categories:
+                series.times.tofile(f)
+            for _, series in ads + categories:
+                series.amounts.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PriceHistory":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: not a PriceHistory file")
+            (size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size).decode("utf-8"))
+            lengths = [count for _, _, count in header["ads"]] + [count for _, count in header["categories"]]
+            times, amounts = array("d"), array("d")
+            times.fromfile(f, sum(lengths))
+            amounts.fromfile(f, sum(lengths))
+        history = cls(header["currency"])
+        history.skipped = header["skipped"]
+        series, offset = [], 0
+        for count in lengths:
+            series.append(Series(times[offset:offset + count], amounts[offset:offset + count]))
+            offset += count
+        for (ad_id, category, _), ad_series in zip(header["ads"], series):
+            history.ads[ad_id] = ad_series
+            history.ad_category[ad_id] = category
+        for (name, _), category_series in zip(header["categories"], series[len(header["ads"]):]):
+            history.categories[name] = category_series
+        return history
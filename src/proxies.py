@@ -0,0 +1,183 @@
+"""Egress proxy pool: each proxy has its own connection pool, rate budget and health score.
+
+Requests go to the least-loaded proxy (in-flight requests per unit of weight, then the shortest wait
+for a token) or by smooth weighted round-robin. A proxy whose health drops below `eject_below`
+is ejected for a cooldown that doubles on every ejection in a row; after it, the proxy gets one
+probe request at a time until a request through it succeeds.
+"""
+import asyncio
+import contextlib
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from ratelimit import HostLimiter
+from exceptions import AutoException, AutoNetworkError
+
+if TYPE_CHECKING:
+    import aiohttp
+
+STRATEGIES = ("least-loaded", "round-robin")
+
+# Тегло на последния изход в здравето (експоненциално пълзяща средна): 1.0 - само успехи, 0.0 - само грешки
+HEALTH_ALPHA = 0.3
+# 407 е отговор на самото прокси; 5xx може да идва и от сайта, затова не се брои срещу проксито
+PROXY_STATUSES = (407,)
+
+
+def proxy_name(url: str) -> str:
+    """host:port of a proxy URL, without credentials (for logs and metric labels)."""
+    parts = urlsplit(url)
+    return parts.netloc.rpartition("@")[2] or url
+
+
+def is_proxy_failure(error: AutoException) -> bool:
+    return isinstance(error, AutoNetworkError) or error.status in PROXY_STATUSES
+
+
+class Proxy:
+    """One egress proxy: its sessions (one per event loop), token buckets and health."""
+
+    __slots__ = ("url", "name", "weight", "limiter", "sessions", "inflight", "health", "ejected_until",
+                 "ejections", "probing", "current", "requests", "failures")
+
+    def __init__(self, url: str, weight: float = 1.0, rate: float = 5.0, burst: float = 10.0):
+        if weight <= 0:
+            raise ValueError(f"Proxy weight must be positive: {url} ({weight})")
+        self.url = url
+        self.name = proxy_name(url)
+        self.weight = weight
+        self.limiter = HostLimiter(rate, burst)  # собствен бюджет към всеки хост, отделно от другите проксита
+        self.sessions = {}  # dict[asyncio.AbstractEventLoop, aiohttp.ClientSession]
+        self.inflight = 0
+        self.health = 1.0
+        self.ejected_until = 0.0
+        self.ejections = 0  # изхвърляния подред, без успешна заявка между тях
+        self.probing = False
+        self.current = 0.0  # за smooth weighted round-robin
+        self.requests = 0
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        # След изтичане на cooldown-а проксито получава по една пробна заявка
+        return now >= self.ejected_until and not (self.probing and self.inflight)
+
+    def stats(self, now: float) -> dict:
+        return {"proxy": self.name, "weight": self.weight, "inflight": self.inflight, "health": self.health,
+                "requests": self.requests, "failures": self.failures, "ejections": self.ejections,
+                "ejected_for": max(0.0, self.ejected_until - now)}
+
+
+class ProxyPool:
+    """Picks a proxy for each request and tracks the proxies' load and health.
+
+    `proxies` is a list of proxy URLs (http://[user:password@]host:port), of (url, weight) pairs,
+    or a {url: weight} mapping. `rate` / `burst` are each proxy's budget per target host.
+    """
+
+    def __init__(self, proxies, strategy: str = "least-loaded", rate: float = 5.0, burst: float = 10.0,
+                 eject_below: float = 0.5, cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 clock=time.monotonic):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown proxy strategy: {strategy!r}")
+        if isinstance(proxies, dict):
+            proxies = proxies.items()
+        self.proxies = [Proxy(*((entry,) if isinstance(entry, str) else entry), rate=rate, burst=burst)
+                        for entry in proxies]
+        if not self.proxies:
+            raise ValueError("A proxy pool needs at least one proxy")
+        self.strategy = strategy
+        self.eject_below = eject_below
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.observer = None  # observer(name, ok, ejected) след всяка заявка, напр. Metrics.observe_proxy
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    def pick(self, url: str) -> Proxy:
+        """The proxy for the next request to `url`; AutoNetworkError (retryable) if every proxy is ejected."""
+        now = self.clock()
+        candidates = [proxy for proxy in self.proxies if proxy.available(now)]
+        if not candidates:
+            raise AutoNetworkError(url, f"no healthy proxy (all {len(self.proxies)} ejected)")
+        if self.strategy == "round-robin":
+            total = sum(proxy.weight for proxy in candidates)
+            for proxy in candidates:
+                proxy.current += proxy.weight
+            chosen = max(candidates, key=lambda proxy: proxy.current)
+            chosen.current -= total
+            return chosen
+        return min(candidates, key=lambda proxy: (proxy.inflight / proxy.weight,
+                                                  proxy.limiter.bucket(url).wait_time(), -proxy.health))
+
+    # --- Здраве ---
+
+    def succeeded(self, proxy: Proxy):
+        proxy.requests += 1
+        proxy.health = proxy.health * (1 - HEALTH_ALPHA) + HEALTH_ALPHA
+        proxy.ejections = 0
+        proxy.probing = False
+
+    def failed(self, proxy: Proxy) -> bool:
+        """Count a failure against `proxy`; True if it got ejected by it."""
+        proxy.requests += 1
+        proxy.failures += 1
+        now = self.clock()
+        if now < proxy.ejected_until:  # заявки, тръгнали преди изхвърлянето
+            return False
+        proxy.health *= 1 - HEALTH_ALPHA
+        if proxy.health >= self.eject_below and not proxy.probing:
+            return False
+        proxy.ejected_until = now + min(self.max_cooldown, self.cooldown * 2 ** proxy.ejections)
+        proxy.ejections += 1
+        # След cooldown-а: една грешка го изхвърля отново, един успех го връща над прага
+        proxy.health = self.eject_below
+        proxy.probing = True
+        return True
+
+    @contextlib.contextmanager
+    def using(self, proxy: Proxy):
+        """Count a request through `proxy` as in flight, and its outcome towards the proxy's health.
+
+        Network errors and 407 count as failures; any other HTTP response means the proxy worked.
+        """
+        proxy.inflight += 1
+        ok = None  # прекъсната заявка (CancelledError) не казва нищо за проксито
+        try:
+            yield proxy
+            ok = True
+        except AutoException as e:
+            ok = not is_proxy_failure(e)
+            raise
+        finally:
+            proxy.inflight -= 1
+            if ok is not None:
+                ejected = False if ok else self.failed(proxy)
+                if ok:
+                    self.succeeded(proxy)
+                if self.observer is not None:
+                    self.observer(proxy.name, ok, ejected)
+
+    # --- Сесии ---
+
+    def session(self, proxy: Proxy, factory) -> "aiohttp.ClientSession":
+        """The proxy's session on the running loop, made by factory(proxy.url) on first use."""
+        loop = asyncio.get_running_loop()
+        session = proxy.sessions.get(loop)
+        if session is None or session.closed:
+            session = proxy.sessions[loop] = factory(proxy.url)
+        return session
+
+    async def close(self):
+        """Close the proxies' sessions on the running loop."""
+        loop = asyncio.get_running_loop()
+        for proxy in self.proxies:
+            session = proxy.sessions.pop(loop, None)
+            if session is not None:
+                await session.close()
+
+    def stats(self) -> list:
+        now = self.clock()
+        return [proxy.stats(now) for proxy in self.proxies]
@@ -0,0 +1,124 @@
+import asyncio
+import email.utils
+import random
+import time
+from urllib.parse import urlsplit
+
+from exceptions import (
+    AutoAuthenticationError,
+    AutoException,
+    AutoNetworkError,
+    AutoNotFoundError,
+    AutoRateLimitError,
+    AutoServerError,
+)
+
+
+def parse_retry_after(value: str) -> float:
+    """Retry-After as seconds (delta-seconds or HTTP-date); None if missing or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def error_for_status(url: str, status: int, headers=None) -> AutoException:
+    """Map an HTTP error status onto the exceptions package; None for non-error statuses."""
+    if status < 400:
+        return None
+    if status == 429:
+        return AutoRateLimitError(url, retry_after=parse_retry_after((headers or {}).get("Retry-After")))
+    if status in (401, 403):
+        return AutoAuthenticationError(url, status=status)
+    if status in (404, 410):
+        return AutoNotFoundError(url, status=status)
+    if status >= 500:
+        return AutoServerError(url, status=status)
+    return AutoException(url, status=status)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        # След pause() updated е в бъдещето: докато пауза тече, токени не се трупат
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one can be taken now)."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        # Retry-After важи за целия хост, не само за заявката, която го е получила
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.updated = max(self.updated, self.blocked_until)
+
+
+class HostLimiter:
+    """One token bucket per host, created on first use."""
+
+    def __init__(self, rate: float = 5.0, burst: float = 10.0, overrides: dict = None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}  # dict[str, tuple[rate, burst]]
+        self.buckets = {}  # dict[str, TokenBucket]
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate, burst = self.overrides.get(host, (self.rate, self.burst))
+            bucket = self.buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
+
+
+class RetryPolicy:
+    RETRYABLE = (AutoRateLimitError, AutoServerError, AutoNetworkError)
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 60.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error: AutoException, attempt: int) -> bool:
+        if isinstance(error, AutoRateLimitError) and error.retry_after is not None and \
+                error.retry_after > self.max_delay:
+            # Сървърът не позволява нова заявка в рамките на бюджета - отказваме се, вместо да питаме по-рано
+            return False
+        return attempt + 1 < self.attempts and isinstance(error, self.RETRYABLE)
+
+    def delay(self, error: AutoException, attempt: int) -> float:
+        if isinstance(error, AutoRateLimitError) and error.retry_after is not None:
+            return error.retry_after
+        # Експоненциално забавяне с "equal jitter", за да не се синхронизират повторните опити
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
@@ -0,0 +1,290 @@
+"""Compact in-memory extraction results: interned strings and integer-ID records.
+
+A snapshot in the usual shape, {timestamp: {url: {selector: [texts]} | None}}, repeats every URL
+and selector as dict keys and every unchanged text as a new str. ResultTable keeps each distinct
+URL, selector and text once, in shared tables, and each distinct result once, as an array of IDs;
+a snapshot is then an array of result IDs, so an unchanged page costs 4 bytes per snapshot.
+
+App(store_path=None) keeps the GUI's data here instead of in snapshots.db.
+"""
+import threading
+from array import array
+
+
+class Interner:
+    """A table of distinct strings, each referenced by its position."""
+
+    __slots__ = ("ids", "strings")
+
+    def __init__(self):
+        self.ids = {}  # dict[str, int]
+        self.strings = []  # list[str]
+
+    def intern(self, string: str) -> int:
+        id_ = self.ids.get(string)
+        if id_ is None:
+            id_ = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return id_
+
+    def __getitem__(self, id_: int) -> str:
+        return self.strings[id_]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class Result:
+    """One URL's result as IDs: data is [selector count, (selector ID, text count)..., text IDs...].
+
+    data is None for a failed extraction (None in the dict shape). Equal results hash equal, so the
+    table stores each distinct one once.
+    """
+
+    __slots__ = ("url", "data", "hash")
+
+    def __init__(self, url: int, data: array = None):
+        self.url = url
+        self.data = data
+        self.hash = hash((url, None if data is None else data.tobytes()))
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Result):
+            return NotImplemented
+        return self.url == other.url and self.data == other.data
+
+
+class ResultTable:
+    """In-memory SnapshotStore counterpart: the same writes and reads, far smaller than nested dicts.
+
+    Results are stored as given, each flagged as a keyframe or a ChangeDetector delta: items() / get()
+    / to_dict() rebuild exactly the dicts that were added, state_at() / states() apply the deltas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.urls = Interner()
+        self.selectors = Interner()
+        self.texts = Interner()
+        self.results = []  # list[Result] - ID на резултата -> резултат
+        self._result_ids = {}  # dict[Result, int]
+        # timestamp -> записи: ID на резултата << 1, младшият бит е 1 за делта
+        self.snapshots = {}  # dict[str, array]
+
+    def close(self):
+        pass
+
+    # --- Кодиране ---
+
+    def _encode(self, url: str, result: dict) -> int:
+        if result is None:
+            data = None
+        else:
+            data = array("I", [len(result)])
+            texts = array("I")
+            for selector, values in result.items():
+                data.append(self.selectors.intern(selector))
+                data.append(len(values))
+                texts.extend(self.texts.intern(text) for text in values)
+            data.extend(texts)
+        record = Result(self.urls.intern(url), data)
+        id_ = self._result_ids.get(record)
+        if id_ is None:
+            id_ = self._result_ids[record] = len(self.results)
+            self.results.append(record)
+        return id_
+
+    def _decode(self, record: Result, selector: str = None):
+        data = record.data
+        if data is None:
+            return None
+        selectors, texts = self.selectors.strings, self.texts.strings
+        count = data[0]
+        position = 1 + 2 * count
+        result = {}
+        for i in range(1, position, 2):
+            name, length = selectors[data[i]], data[i + 1]
+            if selector is None or name == selector:
+                result[name] = [texts[id_] for id_ in data[position:position + length]]
+            position += length
+        return result
+
+    def _entry(self, url: str, result: dict, keyframe: bool) -> int:
+        return self._encode(url, result) << 1 | (not keyframe)
+
+    def _snapshot(self, ids: array, url: str = None, selector: str = None) -> dict:
+        snapshot = {}
+        url_id = None if url is None else self.urls.ids.get(url, -1)
+        for entry in ids:
+            record = self.results[entry >> 1]
+            if url_id is not None and record.url != url_id:
+                continue
+            result = self._decode(record, selector)
+            if selector is not None and not result:  # неуспешно извличане или без този селектор
+                continue
+            snapshot[self.urls[record.url]] = result
+        return snapshot
+
+    # --- Запис ---
+
+    def add_result(self, timestamp: str, url: str, result: dict, keyframe: bool = True):
+        """Append one URL's result to the snapshot at `timestamp`; keyframe=False marks a delta."""
+        with self._lock:
+            entry = self._entry(url, result, keyframe)
+            ids = self.snapshots.get(timestamp)
+            if ids is None:
+                ids = self.snapshots[timestamp] = array("I")
+            ids.append(entry)
+
+    def add_results(self, results, keyframe: bool = True):
+        """Append many (timestamp, url, result) triples."""
+        for timestamp, url, result in results:
+            self.add_result(timestamp, url, result, keyframe)
+
+    def add(self, timestamp: str, snapshot: dict, keyframe: bool = True):
+        """Store a whole snapshot, replacing any earlier one with the same timestamp."""
+        with self._lock:
+            self.snapshots[timestamp] = array("I", [self._entry(url, result, keyframe)
+                                                    for url, result in snapshot.items()])
+
+    def update(self, data, keyframe: bool = True):
+        """Add snapshots from a dict or any iterable of (timestamp, snapshot) pairs."""
+        for timestamp, snapshot in (data.items() if hasattr(data, "items") else data):
+            self.add(timestamp, snapshot, keyframe)
+
+    # --- Четене ---
+
+    def timestamps(self, start: str = None, end: str = None) -> list:
+        with self._lock:
+            timestamps = sorted(self.snapshots)
+        return [t for t in timestamps if (start is None or t >= start) and (end is None or t < end)]
+
+    def items(self, start: str = None, end: str = None, url: str = None, selector: str = None):
+        """Yield (timestamp, snapshot) pairs in [start, end), oldest first, rebuilt one at a time."""
+        for timestamp in self.timestamps(start, end):
+            with self._lock:
+                ids = self.snapshots.get(timestamp)
+                snapshot = self._snapshot(ids, url, selector) if ids is not None else {}
+            if snapshot:
+                yield timestamp, snapshot
+
+    def get(self, timestamp: str) -> dict:
+        with self._lock:
+            ids = self.snapshots.get(timestamp)
+            return self._snapshot(ids) if ids is not None else None
+
+    def latest(self, count: int) -> list:
+        """The newest `count` snapshots as (timestamp, snapshot) pairs, oldest first."""
+        newest = self.timestamps()[-count:] if count > 0 else []
+        return list(self.items(start=newest[0])) if newest else []
+
+    def _states(self, end: str = None):
+        # (timestamp, snapshot) с приложени делти; state пази пълния резултат на всеки URL
+        state = {}
+        for timestamp in self.timestamps(end=end):
+            with self._lock:
+                ids = self.snapshots.get(timestamp)
+                entries = [(self.results[entry >> 1], not entry & 1) for entry in ids] if ids is not None else []
+                snapshot = {}
+                for record, keyframe in entries:
+                    url, result = self.urls[record.url], self._decode(record)
+                    if result is not None:
+                        # Делтата носи пълните нови списъци само на променените селектори
+                        if not keyframe and state.get(url) is not None:
+                            result = {**state[url], **result}
+                        state[url] = result
+                    snapshot[url] = result
+            yield timestamp, snapshot
+
+    def state_at(self, url: str, timestamp: str = None) -> dict:
+        """Full result of `url` as of `timestamp` (default: latest): last keyframe plus later deltas."""
+        end = None if timestamp is None else timestamp + "\0"
+        state = None
+        for _, snapshot in self._states(end):
+            result = snapshot.get(url)
+            if result is not None:
+                state = result
+        return state
+
+    def states(self, start: str = None, end: str = None):
+        """Yield (timestamp, snapshot) pairs in [start, end) with deltas applied: every result is full."""
+        for timestamp, snapshot in self._states(end):
+            if (start is None or timestamp >= start) and snapshot:
+                yield timestamp, snapshot
+
+    def history(self, url: str, selector: str, start: str = None, end: str = None):
+        """Yield (timestamp, texts) each time the texts of (url, selector) were stored."""
+        for timestamp, snapshot in self.items(start, end, url, selector):
+            yield timestamp, snapshot[url][selector]
+
+    def to_dict(self, start: str = None, end: str = None) -> dict:
+        return dict(self.items(start, end))
+
+    def __len__(self) -> int:
+        return len(self.snapshots)
+
+    def __bool__(self) -> bool:
+        return bool(self.snapshots)
+
+    def __contains__(self, timestamp: str) -> bool:
+        return timestamp in self.snapshots
+
+    # --- Съхранение ---
+
+    def prune(self, before: str = None, keep_last: int = None) -> int:
+        """Drop snapshots older than `before` and/or all but the newest `keep_last`; returns results removed.
+
+        As in SnapshotStore, a URL whose first kept result is a delta gets its rebuilt state there as a keyframe.
+        """
+        timestamps = self.timestamps()
+        stale = {t for t in timestamps if before is not None and t < before}
+        if keep_last is not None:
+            stale.update(timestamps[:max(0, len(timestamps) - keep_last)])
+        if not stale:
+            return 0
+        with self._lock:
+            pending = {self.results[entry >> 1].url for t in stale for entry in self.snapshots[t]}
+        rewrites = []  # (timestamp, позиция, url, пълен резултат)
+        for timestamp, snapshot in self._states():
+            if timestamp in stale:
+                continue
+            if not pending:
+                break
+            with self._lock:
+                ids = list(self.snapshots[timestamp])
+            for position, entry in enumerate(ids):
+                record = self.results[entry >> 1]
+                if record.url in pending and record.data is not None:
+                    pending.discard(record.url)
+                    if entry & 1:
+                        url = self.urls[record.url]
+                        rewrites.append((timestamp, position, url, snapshot[url]))
+        with self._lock:
+            for timestamp, position, url, result in rewrites:
+                self.snapshots[timestamp][position] = self._entry(url, result, True)
+            return sum(len(self.snapshots.pop(timestamp)) for timestamp in stale if timestamp in self.snapshots)
+
+    def compact(self):
+        """Rebuild the tables from the remaining snapshots, dropping strings and results left by prune()."""
+        with self._lock:
+            snapshots = {
+                timestamp: [(self.urls[self.results[entry >> 1].url], self._decode(self.results[entry >> 1]),
+                             not entry & 1) for entry in ids]
+                for timestamp, ids in self.snapshots.items()
+            }
+            self.urls, self.selectors, self.texts = Interner(), Interner(), Interner()
+            self.results, self._result_ids = [], {}
+            self.snapshots = {
+                timestamp: array("I", [self._entry(url, result, keyframe) for url, result, keyframe in entries])
+                for timestamp, entries in snapshots.items()
+            }
+
+    def stats(self) -> dict:
+        """Snapshot, stored result and distinct string counts."""
+        with self._lock:
+            return {"snapshots": len(self.snapshots), "entries": sum(len(ids) for ids in self.snapshots.values()),
+                    "results": len(self.results), "urls": len(self.urls), "selectors": len(self.selectors),
+                    "texts": len(self.texts)}
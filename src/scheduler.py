@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import math
+import random
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """Per-URL periodic extraction on the tracker loop.
+
+    Deadlines are aligned to the wall clock (offset + k * interval) instead of "sleep after work",
+    so runs do not drift by the extraction time. Each URL gets a stable offset inside its interval,
+    which spreads URLs with the same interval evenly instead of fetching them all at once.
+    """
+
+    def __init__(self, tracker, on_result, interval: float = 300, jitter: float = 0.0, timeout: int = 10,
+                 clock=time.time):
+        self.tracker = tracker
+        self.on_result = on_result  # on_result(timestamp, url, result)
+        self.interval = interval
+        self.jitter = jitter  # част от интервала, с която всяко изпълнение може да закъснее
+        self.timeout = timeout
+        self.clock = clock
+
+        self._heap = []  # (run_at, deadline, url)
+        self._deadlines = {}  # url -> deadline на актуалния запис в heap-а
+        self._inflight = {}  # url -> asyncio.Task
+        self._wakeup = None
+        self._runner = None
+        self._loop = None  # цикълът на tracker-а, докато планировчикът работи
+        self._lock = threading.Lock()  # пази _loop от stop() в друга нишка
+
+    # --- Изчисляване на сроковете ---
+
+    def interval_for(self, url: str) -> float:
+        return self.tracker.intervals.get(url, self.interval)
+
+    @staticmethod
+    def offset(url: str, interval: float) -> float:
+        return zlib.crc32(url.encode("utf-8")) / 2 ** 32 * interval
+
+    def next_deadline(self, url: str, after: float) -> float:
+        """First deadline of `url` strictly after `after`; missed deadlines are skipped, not replayed."""
+        interval = self.interval_for(url)
+        offset = self.offset(url, interval)
+        return offset + (math.floor((after - offset) / interval) + 1) * interval
+
+    def _push(self, url: str, after: float):
+        deadline = self.next_deadline(url, after)
+        run_at = deadline + random.uniform(0, self.jitter * self.interval_for(url))
+        self._deadlines[url] = deadline
+        heapq.heappush(self._heap, (run_at, deadline, url))
+
+    def _sync(self, now: float):
+        tracked = list(self.tracker.tracked)
+        for url in tracked:
+            if url not in self._deadlines:
+                self._push(url, now)
+        for url in set(self._deadlines).difference(tracked):
+            # Записът остава в heap-а, но се пропуска като остарял
+            del self._deadlines[url]
+
+    # --- Управление ---
+
+    def _call_soon(self, callback, *args):
+        # Heap-ът и сроковете се пипат само от нишката на цикъла
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(callback, *args)
+
+    def wake(self):
+        """Re-read tracked URLs and intervals; safe to call from any thread."""
+        self._call_soon(self._wake)
+
+    def reschedule(self, url: str):
+        """Recompute the deadline of `url` (e.g. after its interval changed); safe to call from any thread."""
+        self._call_soon(self._reschedule, url)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _reschedule(self, url: str):
+        self._deadlines.pop(url, None)
+        self._wake()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        self._runner = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        with self._lock:
+            self._loop = None
+        tasks = list(self._inflight.values())
+        if self._runner is not None:
+            tasks.append(self._runner)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = self._wakeup = None
+        self._heap.clear()
+        self._deadlines.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None and not self._runner.done()
+
+    # --- Изпълнение ---
+
+    async def _run(self):
+        # wait_for() може да погълне cancel(), ако събуждането дойде в същия момент - затова и проверката
+        while self._loop is not None:
+            self._wakeup.clear()
+            now = self.clock()
+            self._sync(now)
+            while self._heap and self._heap[0][0] <= now:
+                run_at, deadline, url = heapq.heappop(self._heap)
+                if self._deadlines.get(url) != deadline:
+                    continue
+                # Ако предишното извличане още не е свършило, този срок се пропуска
+                if url not in self._inflight:
+                    self._launch(url, run_at)
+                self._push(url, max(now, deadline))
+
+            delay = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _launch(self, url: str, run_at: float):
+        task = asyncio.ensure_future(self._extract(url, run_at))
+        self._inflight[url] = task
+        task.add_done_callback(lambda _: self._inflight.pop(url, None))
+
+    async def _extract(self, url: str, run_at: float):
+        if url not in self.tracker.tracked:
+            return
+        timestamp = datetime.datetime.fromtimestamp(run_at).isoformat()
+        self.tracker.last_errors.pop(url, None)
+        try:
+            async with self.tracker.session_scope() as session:
+                result = await self.tracker.extract_url_async(session, url, self.timeout)
+        except Exception as e:
+            # Неочаквана грешка (не AutoException): отчита се като неуспех, следващият срок остава
+            logger.exception("Extraction of %s failed", url)
+            self.tracker.last_errors[url] = e
+            result = None
+        try:
+            self.on_result(timestamp, url, result)
+        except Exception:
+            logger.exception("on_result failed for %s", url)
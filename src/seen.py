@@ -0,0 +1,157 @@
+import datetime
+import hashlib
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_ads (
+    ad_id      TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    digest     BLOB          -- blake2b на цена + заглавие: промяна -> обявата е "обновена"
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_ads_last_seen ON seen_ads (last_seen);
+"""
+
+NEW = "new"
+UPDATED = "updated"
+SEEN = "seen"
+
+# SQLite позволява ограничен брой параметри в една заявка
+QUERY_BATCH = 500
+
+
+class BloomFilter:
+    """Fixed-size bit array: `in` is always true for added keys and false positive ~1% of the time for others."""
+
+    def __init__(self, capacity: int, hashes: int = 7, bits_per_key: int = 10):
+        self.capacity = capacity
+        self.hashes = hashes
+        self.size = max(64, capacity * bits_per_key)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        # Двойно хеширане: k позиции от два 64-битови хеша
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def ad_digest(ad) -> bytes:
+    return hashlib.blake2b(f"{ad.price}\0{ad.title}".encode("utf-8"), digest_size=8).digest()
+
+
+class SeenIndex:
+    """Persistent SQLite index of OLX ad IDs with first/last seen time, shared across runs.
+
+    A Bloom filter in front answers "never seen" without touching the database, which is the common
+    case for fresh ads; memory stays at ~10 bits per ad however large the index grows.
+    """
+
+    def __init__(self, path: str = "seen.db", bloom: bool = True, capacity: int = 1_000_000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.bloom = None
+        if bloom:
+            self._build_bloom(capacity)
+
+    def _build_bloom(self, capacity: int):
+        count = len(self)
+        # Филтърът не се разширява: при пълен се построява наново двойно по-голям
+        while count > capacity // 2:
+            capacity *= 2
+        self.bloom = BloomFilter(capacity)
+        with self._lock:
+            for (ad_id,) in self._conn.execute("SELECT ad_id FROM seen_ads"):
+                self.bloom.add(ad_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_ads").fetchone()[0]
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT EXISTS (SELECT 1 FROM seen_ads)").fetchone()[0] == 1
+
+    def __contains__(self, ad_id: str) -> bool:
+        if self.bloom is not None and ad_id not in self.bloom:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen_ads WHERE ad_id = ?", (ad_id,)).fetchone()
+        return row is not None
+
+    def get(self, ad_id: str) -> tuple:
+        """(first_seen, last_seen) of `ad_id`; None if it was never seen."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT first_seen, last_seen FROM seen_ads WHERE ad_id = ?", (ad_id,)
+            ).fetchone()
+
+    def _digests(self, ad_ids: list) -> dict:
+        if self.bloom is not None:
+            ad_ids = [ad_id for ad_id in ad_ids if ad_id in self.bloom]
+        digests = {}
+        for i in range(0, len(ad_ids), QUERY_BATCH):
+            batch = ad_ids[i:i + QUERY_BATCH]
+            sql = f"SELECT ad_id, digest FROM seen_ads WHERE ad_id IN ({','.join('?' * len(batch))})"
+            digests.update(self._conn.execute(sql, batch))
+        return digests
+
+    def observe(self, ads: list, timestamp: str = None) -> list:
+        """Record a batch of ads (e.g. one page) and return NEW / UPDATED / SEEN for each of them.
+
+        Ads without an OLX ID are always NEW. UPDATED means the price or title changed since last time.
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        keyed = [(ad.ad_id, ad_digest(ad)) for ad in ads]
+        statuses, rows = [], []
+        with self._lock, self._conn:
+            known = self._digests([ad_id for ad_id, _ in keyed if ad_id])
+            for ad_id, digest in keyed:
+                if ad_id is None:
+                    statuses.append(NEW)
+                    continue
+                if ad_id not in known:
+                    statuses.append(NEW)
+                else:
+                    statuses.append(SEEN if known[ad_id] == digest else UPDATED)
+                known[ad_id] = digest
+                rows.append((ad_id, timestamp, timestamp, digest))
+            self._conn.executemany(
+                "INSERT INTO seen_ads VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ad_id) DO UPDATE SET last_seen = excluded.last_seen, digest = excluded.digest",
+                rows,
+            )
+        if self.bloom is not None:
+            for ad_id, _ in keyed:
+                if ad_id and ad_id not in self.bloom:
+                    self.bloom.add(ad_id)
+            if self.bloom.count > self.bloom.capacity:
+                self._build_bloom(self.bloom.capacity)
+        return statuses
+
+    def prune(self, before: str) -> int:
+        """Forget ads not seen since `before`; returns how many were removed."""
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM seen_ads WHERE last_seen < ?", (before,)).rowcount
+        # Изтритите ID-та остават във филтъра като фалшиви положителни, докато не се построи наново
+        return removed
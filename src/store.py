@@ -0,0 +1,279 @@
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    timestamp TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    selector  TEXT,     -- NULL: неуспешно извличане на URL-а (None в речника)
+    position  INTEGER,
+    text      TEXT,     -- NULL: селектор без съвпадения ([] в речника)
+    keyframe  INTEGER NOT NULL DEFAULT 1  -- 0: делта, само селекторите с промяна (виж diff.py)
+);
+CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_url_selector ON results (url, selector, timestamp);
+"""
+
+
+class SnapshotStore:
+    """Append-only SQLite (WAL) store of extraction results, indexed by timestamp, URL and selector.
+
+    Snapshots keep the shape used everywhere else: {timestamp: {url: {selector: [texts]} | None}}.
+    """
+
+    def __init__(self, path: str = "snapshots.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "keyframe" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN keyframe INTEGER NOT NULL DEFAULT 1")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Запис ---
+
+    @staticmethod
+    def _rows(timestamp: str, url: str, result: dict, keyframe: bool = True):
+        keyframe = int(keyframe)
+        if result is None:
+            yield timestamp, url, None, None, None, keyframe
+            return
+        for selector, texts in result.items():
+            if not texts:
+                yield timestamp, url, selector, None, None, keyframe
+            for position, text in enumerate(texts):
+                yield timestamp, url, selector, position, text, keyframe
+
+    def add_result(self, timestamp: str, url: str, result: dict, keyframe: bool = True):
+        """Append one URL's result as soon as it is extracted; keyframe=False marks a delta."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", self._rows(timestamp, url, result, keyframe)
+            )
+
+    def add_results(self, results, keyframe: bool = True):
+        """Append many (timestamp, url, result) triples in one transaction."""
+        with self._lock, self._conn:
+            for timestamp, url, result in results:
+                self._conn.executemany(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", self._rows(timestamp, url, result, keyframe)
+                )
+
+    def add(self, timestamp: str, snapshot: dict, keyframe: bool = True):
+        """Store a snapshot, replacing any earlier one with the same timestamp; keyframe=False marks deltas."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE timestamp = ?", (timestamp,))
+            for url, result in snapshot.items():
+                self._conn.executemany(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", self._rows(timestamp, url, result, keyframe)
+                )
+
+    def update(self, data, keyframe: bool = True):
+        """Add snapshots from a dict or any iterable of (timestamp, snapshot) pairs.
+
+        Exports from states() hold full results and are stored as keyframes; pass keyframe=False
+        only for snapshots that really are deltas.
+        """
+        for timestamp, snapshot in (data.items() if hasattr(data, "items") else data):
+            self.add(timestamp, snapshot, keyframe)
+
+    # --- Четене ---
+
+    @staticmethod
+    def _where(start: str = None, end: str = None, url: str = None, selector: str = None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if url is not None:
+            clauses.append("url = ?")
+            params.append(url)
+        if selector is not None:
+            clauses.append("selector = ?")
+            params.append(selector)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _select(self, sql: str, params):
+        # Отделна връзка за четене: WAL позволява четене, докато извличането пише
+        conn = self._connect()
+        try:
+            yield from conn.execute(sql, params)
+        finally:
+            conn.close()
+
+    def _scalar(self, sql: str, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def query(self, start: str = None, end: str = None, url: str = None, selector: str = None):
+        """Yield (timestamp, url, selector, text) rows in [start, end), oldest first."""
+        where, params = self._where(start, end, url, selector)
+        sql = f"SELECT timestamp, url, selector, text FROM results{where} ORDER BY timestamp, rowid"
+        yield from self._select(sql, params)
+
+    def items(self, start: str = None, end: str = None, url: str = None, selector: str = None):
+        """Stream (timestamp, snapshot) pairs in [start, end), one snapshot in memory at a time."""
+        current, snapshot = None, None
+        for timestamp, row_url, row_selector, text in self.query(start, end, url, selector):
+            if timestamp != current:
+                if current is not None:
+                    yield current, snapshot
+                current, snapshot = timestamp, {}
+            if row_selector is None:
+                snapshot[row_url] = None
+                continue
+            texts = snapshot.setdefault(row_url, {}).setdefault(row_selector, [])
+            if text is not None:
+                texts.append(text)
+        if current is not None:
+            yield current, snapshot
+
+    def get(self, timestamp: str) -> dict:
+        for _, snapshot in self.items(timestamp, timestamp + "\0"):
+            return snapshot
+        return None
+
+    def timestamps(self, start: str = None, end: str = None) -> list:
+        where, params = self._where(start, end)
+        sql = f"SELECT DISTINCT timestamp FROM results{where} ORDER BY timestamp"
+        return [row[0] for row in self._select(sql, params)]
+
+    def keys(self, start: str = None, end: str = None, url: str = None):
+        """Yield the stored (timestamp, url) pairs in [start, end)."""
+        where, params = self._where(start, end, url)
+        yield from self._select(f"SELECT DISTINCT timestamp, url FROM results{where}", params)
+
+    def latest(self, count: int) -> list:
+        """The newest `count` snapshots as (timestamp, snapshot) pairs, oldest first."""
+        sql = "SELECT DISTINCT timestamp FROM results ORDER BY timestamp DESC LIMIT ?"
+        newest = [row[0] for row in self._select(sql, (count,))]
+        return list(self.items(start=newest[-1])) if newest else []
+
+    def state_at(self, url: str, timestamp: str = None) -> dict:
+        """Full result of `url` as of `timestamp` (default: latest): last keyframe plus later deltas."""
+        end = "\uffff" if timestamp is None else timestamp
+        keyframe = self._scalar(
+            "SELECT MAX(timestamp) FROM results WHERE url = ? AND keyframe = 1 AND selector IS NOT NULL "
+            "AND timestamp <= ?",
+            (url, end),
+        )
+        if keyframe is None:
+            return None
+        sql = ("SELECT timestamp, selector, text FROM results WHERE url = ? AND selector IS NOT NULL "
+               "AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp, rowid")
+        state, current = {}, None
+        for row_timestamp, selector, text in self._select(sql, (url, keyframe, end)):
+            # Всяка делта носи пълния нов списък на променения селектор
+            if (row_timestamp, selector) != current:
+                current = row_timestamp, selector
+                state[selector] = []
+            if text is not None:
+                state[selector].append(text)
+        return state
+
+    def states(self, start: str = None, end: str = None):
+        """Stream (timestamp, snapshot) pairs in [start, end) with deltas applied: every result is full.
+
+        items() returns the rows as stored, so a delta holds only its changed selectors; exports go
+        through states() so that a re-imported file still rebuilds the same state_at().
+        """
+        where, params = self._where(None, end)
+        sql = f"SELECT timestamp, url, selector, text, keyframe FROM results{where} ORDER BY timestamp, rowid"
+        state = {}  # url -> пълният резултат към текущата снимка
+        current, snapshot, started = None, None, set()
+        for timestamp, url, selector, text, keyframe in self._select(sql, params):
+            if timestamp != current:
+                if current is not None and (start is None or current >= start):
+                    yield current, snapshot
+                current, snapshot, started = timestamp, {}, set()
+            if selector is None:
+                # Неуспешно извличане: състоянието остава за следващите делти
+                snapshot[url] = None
+                continue
+            if url not in started:
+                started.add(url)
+                previous = {} if keyframe else state.get(url) or {}
+                state[url] = snapshot[url] = {name: list(texts) for name, texts in previous.items()}
+            if (url, selector) not in started:
+                # Всяка делта носи пълния нов списък на променения селектор
+                started.add((url, selector))
+                state[url][selector] = []
+            if text is not None:
+                state[url][selector].append(text)
+        if current is not None and (start is None or current >= start):
+            yield current, snapshot
+
+    def history(self, url: str, selector: str, start: str = None, end: str = None):
+        """Yield (timestamp, texts) each time the texts of (url, selector) were stored."""
+        for timestamp, snapshot in self.items(start, end, url, selector):
+            yield timestamp, snapshot[url][selector]
+
+    def to_dict(self, start: str = None, end: str = None) -> dict:
+        return dict(self.items(start, end))
+
+    def __len__(self) -> int:
+        return self._scalar("SELECT COUNT(DISTINCT timestamp) FROM results")
+
+    def __bool__(self) -> bool:
+        return self._scalar("SELECT EXISTS (SELECT 1 FROM results)") == 1
+
+    def __contains__(self, timestamp: str) -> bool:
+        sql = "SELECT EXISTS (SELECT 1 FROM results WHERE timestamp = ?)"
+        return self._scalar(sql, (timestamp,)) == 1
+
+    # --- Съхранение ---
+
+    def prune(self, before: str = None, keep_last: int = None) -> int:
+        """Delete snapshots older than `before` and/or all but the newest `keep_last`; returns rows removed.
+
+        A URL whose first kept result is a delta gets its rebuilt state stored there as a keyframe,
+        so state_at() / states() after the cutoff do not depend on the deleted rows.
+        """
+        cutoff = before
+        if keep_last is not None:
+            newest = self.timestamps()[-keep_last:] if keep_last > 0 else []
+            kept_from = newest[0] if newest else "\uffff"
+            cutoff = kept_from if cutoff is None else max(cutoff, kept_from)
+        if cutoff is None:
+            return 0
+
+        # Първият запазен резултат на всеки URL с изтрита история
+        sql = ("SELECT url, MIN(timestamp) FROM results AS r WHERE timestamp >= ? "
+               "AND selector IS NOT NULL AND EXISTS (SELECT 1 FROM results WHERE url = r.url AND timestamp < ?) "
+               "GROUP BY url")
+        rebuilt = []
+        for url, first in self._select(sql, (cutoff, cutoff)):
+            is_keyframe = self._scalar(
+                "SELECT EXISTS (SELECT 1 FROM results WHERE url = ? AND timestamp = ? AND keyframe = 1 "
+                "AND selector IS NOT NULL)", (url, first),
+            )
+            state = None if is_keyframe else self.state_at(url, first)
+            if state is not None:
+                rebuilt.append((first, url, state))
+
+        with self._lock, self._conn:
+            for first, url, state in rebuilt:
+                self._conn.execute("DELETE FROM results WHERE url = ? AND timestamp = ?", (url, first))
+                self._conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", self._rows(first, url, state))
+            return self._conn.execute("DELETE FROM results WHERE timestamp < ?", (cutoff,)).rowcount
+
+    def compact(self):
+        """Reclaim space left by prune() and truncate the WAL file."""
+        with self._lock:
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+
+from archive import HtmlArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = HtmlArchive(str(tmp_path / "archive"))
+    yield archive
+    archive.close()
+
+
+def test_add_and_get(archive):
+    archive.add("https://example.com/a", "<html>първа</html>", "2026-01-01T00:00:00")
+    archive.add("https://example.com/a", "<html>втора</html>", "2026-01-01T00:05:00")
+    archive.flush()
+    assert archive.get("https://example.com/a") == "<html>втора</html>"
+    assert archive.get("https://example.com/a", "2026-01-01T00:04:59") == "<html>първа</html>"
+    assert archive.get("https://example.com/a", "2025-12-31T00:00:00") is None
+    assert archive.get("https://example.com/missing") is None
+
+
+def test_identical_bodies_are_stored_once(archive):
+    html = "<html>" + "обява " * 10_000 + "</html>"
+    for minute in range(10):
+        archive.add("https://example.com/a", html, f"2026-01-01T00:{minute:02d}:00")
+    archive.add("https://example.com/b", html, "2026-01-01T00:00:00")
+    archive.flush()
+    stats = archive.stats()
+    assert stats["pages"] == len(archive) == 11
+    assert stats["blobs"] == 1
+    assert stats["fetched_bytes"] == 11 * stats["raw_bytes"]
+    assert stats["stored_bytes"] < stats["raw_bytes"] / 10
+    assert [url for url, _, _ in archive.entries(start="2026-01-01T00:00:00", end="2026-01-01T00:01:00")] == [
+        "https://example.com/a", "https://example.com/b"]
+
+
+def test_segments_rotate_and_persist(tmp_path):
+    path = str(tmp_path / "archive")
+    archive = HtmlArchive(path, segment_size=1000)
+    pages = {f"https://example.com/{i}": os.urandom(400).hex() for i in range(5)}
+    for url, html in pages.items():
+        archive.add(url, html, "2026-01-01T00:00:00")
+    archive.close()
+    assert len([name for name in os.listdir(path) if name.endswith(".pack")]) > 1
+
+    archive = HtmlArchive(path, segment_size=1000)
+    archive.add("https://example.com/new", "<html></html>", "2026-01-02T00:00:00")
+    archive.flush()
+    assert {url: archive.get(url) for url in pages} == pages
+    assert archive.get("https://example.com/new") == "<html></html>"
+    archive.close()
+
+
+def test_write_errors_surface_on_flush(archive):
+    archive.add("https://example.com/a", "\ud800", "2026-01-01T00:00:00")  # не може да се кодира в UTF-8
+    archive.add("https://example.com/b", "<html></html>", "2026-01-01T00:00:00")  # add() не вдига грешката
+    with pytest.raises(UnicodeEncodeError):
+        archive.flush()
+    archive.add("https://example.com/a", "<html></html>", "2026-01-01T00:00:00")
+    archive.flush()
+    assert len(archive) == 2 and archive.stats()["errors"] == 1
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    archive = HtmlArchive(str(tmp_path / "archive"), max_pending=1)
+    release = threading.Event()
+    write = archive._write
+    archive._write = lambda *item: (release.wait(), write(*item))
+    try:
+        assert archive.add("https://example.com/a", "<html>1</html>", "2026-01-01T00:00:00", block=False)
+        # Пишещата нишка държи първата страница; втората чака в опашката, третата се изпуска
+        while archive._queue.qsize():
+            pass
+        assert archive.add("https://example.com/a", "<html>2</html>", "2026-01-01T00:01:00", block=False)
+        assert not archive.add("https://example.com/a", "<html>3</html>", "2026-01-01T00:02:00", block=False)
+        release.set()
+        archive.flush()
+        assert len(archive) == 2 and archive.stats()["dropped"] == 1
+    finally:
+        release.set()
+        archive.close()
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from archive import HtmlArchive
+from backfill import backfill, safe_name
+from store import SnapshotStore
+
+A = "https://www.olx.bg/cars/"
+B = "https://www.olx.bg/bikes/"
+
+
+def page(title: str, price: str) -> str:
+    return f'<html><body><h6 class="title">{title}</h6><p class="price">{price}</p></body></html>'
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = str(tmp_path / "archive")
+    with HtmlArchive(path) as archive:
+        for minute in range(6):
+            # Цената на A се сменя на всеки 3 минути - повечето тела се повтарят
+            archive.add(A, page("Golf", f"{100 + minute // 3} лв."), f"2026-01-01T00:0{minute}:00")
+            archive.add(B, page("Cross", "50 лв."), f"2026-01-01T00:0{minute}:00")
+    return path
+
+
+def read_records(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_backfill_archive_to_jsonl(archive_path, tmp_path):
+    out = str(tmp_path / "history.jsonl")
+    counts = backfill(archive_path, out, [".price"], tracked={A: [".title"]}, workers=2)
+    assert counts == {"pages": 12, "parsed": 3, "skipped": 0, "failed": 0}
+    records = read_records(out)
+    assert [(r["url"], r["timestamp"]) for r in records[:2]] == [(B, "2026-01-01T00:00:00"),
+                                                                (B, "2026-01-01T00:01:00")]
+    a = [r for r in records if r["url"] == A]
+    assert a[0]["result"] == {".title": ["Golf"], ".price": ["100 лв."]}
+    assert a[-1]["result"] == {".title": ["Golf"], ".price": ["101 лв."]}
+    assert records[0]["result"] == {".price": ["50 лв."]}
+
+
+def test_backfill_resumes_after_interruption(archive_path, tmp_path):
+    out = str(tmp_path / "history.jsonl")
+    backfill(archive_path, out, [".price"], workers=1)
+    expected = read_records(out)
+
+    # Прекъсване: само първите 5 реда, последният записан наполовина
+    with open(out, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(out, "w", encoding="utf-8") as f:
+        f.writelines(lines[:4])
+        f.write(lines[4][:10])
+
+    counts = backfill(archive_path, out, [".price"], workers=1)
+    assert counts["skipped"] == 4 and counts["pages"] == 8
+    assert read_records(out) == expected
+
+
+def test_backfill_to_store_for_one_url(archive_path, tmp_path):
+    db = str(tmp_path / "snapshots.db")
+    assert backfill(archive_path, db, [".title"], url=A, end="2026-01-01T00:03:00", workers=1)["pages"] == 3
+    assert backfill(archive_path, db, [".title"], url=A, workers=1) == {"pages": 3, "parsed": 1, "skipped": 3,
+                                                                        "failed": 0}
+    store = SnapshotStore(db)
+    assert len(store) == 6
+    assert store.get("2026-01-01T00:05:00") == {A: {".title": ["Golf"]}}
+    store.close()
+
+
+def test_backfill_legacy_directory(tmp_path):
+    folder = tmp_path / "saved_htmls"
+    folder.mkdir()
+    (folder / f"{safe_name(A)}_2026-01-01T00_00_00.html").write_text(page("Golf", "100 лв."), encoding="utf-8")
+    (folder / f"{safe_name(A)}_2026-01-01T00_05_00_123456.html").write_text(page("Golf", "90 лв."),
+                                                                             encoding="utf-8")
+    (folder / "notes.txt").write_text("x", encoding="utf-8")
+    out = str(tmp_path / "history.jsonl")
+    assert backfill(str(folder), out, tracked={A: [".price"]}, workers=1)["pages"] == 2
+    assert [(r["url"], r["timestamp"], r["result"]) for r in read_records(out)] == [
+        (A, "2026-01-01T00:00:00", {".price": ["100 лв."]}),
+        (A, "2026-01-01T00:05:00.123456", {".price": ["90 лв."]}),
+    ]
+
+
+def test_backfill_rejects_bad_input(archive_path, tmp_path):
+    with pytest.raises(ValueError):
+        backfill(archive_path, str(tmp_path / "history.csv"), [".title"], workers=1)
+    with pytest.raises(ValueError):
+        backfill(archive_path, str(tmp_path / "history.jsonl"), ["p["], workers=1)
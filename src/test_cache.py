@@ -0,0 +1,66 @@
+import pytest
+from cache import PageCache
+
+URL = "https://example.com"
+SELECTORS = frozenset({".title"})
+RESULT = {".title": ["Hello"]}
+
+
+@pytest.fixture
+def cache():
+    cache = PageCache()
+    cache.store(URL, SELECTORS, {"ETag": '"v1"', "Last-Modified": "Thu, 01 Jan 2026 00:00:00 GMT"}, "<html/>", RESULT)
+    return cache
+
+
+def test_request_headers(cache):
+    assert cache.request_headers(URL, SELECTORS) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Thu, 01 Jan 2026 00:00:00 GMT",
+    }
+
+
+def test_request_headers_unknown_url(cache):
+    assert cache.request_headers("https://other.com", SELECTORS) == {}
+
+
+def test_request_headers_changed_selectors(cache):
+    assert cache.request_headers(URL, frozenset({".title", ".price"})) == {}
+
+
+def test_lookup_not_modified(cache):
+    assert cache.lookup(URL, SELECTORS, None) == RESULT
+    assert cache.not_modified == 1
+
+
+def test_lookup_same_body(cache):
+    assert cache.lookup(URL, SELECTORS, "<html/>", {"ETag": '"v2"'}) == RESULT
+    assert cache.unchanged == 1
+    assert cache.request_headers(URL, SELECTORS)["If-None-Match"] == '"v2"'
+
+
+def test_lookup_changed_body(cache):
+    assert cache.lookup(URL, SELECTORS, "<html>new</html>") is None
+    assert cache.hits == 0
+
+
+def test_hit_rate(cache):
+    assert cache.hit_rate == 0.0
+    cache.lookup(URL, SELECTORS, None)
+    cache.lookup(URL, SELECTORS, "<html>new</html>")
+    assert cache.hit_rate == 0.5
+    assert cache.stats()["requests"] == 2
+
+
+def test_discard(cache):
+    cache.discard(URL)
+    assert cache.lookup(URL, SELECTORS, None) is None
+
+
+def test_results_do_not_share_lists(cache):
+    stored = {".title": ["Hello"]}
+    cache.store(URL, SELECTORS, {}, "<html/>", stored)
+    stored[".title"].append("changed by the caller")
+    first = cache.lookup(URL, SELECTORS, None)
+    first[".title"].append("changed by a consumer")
+    assert cache.lookup(URL, SELECTORS, None) == {".title": ["Hello"]}
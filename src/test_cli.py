@@ -0,0 +1,221 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from aiohttp import web
+
+import bootstrap
+import cli
+from store import SnapshotStore
+
+PAGE = '<html><body><h1 class="title">Hello</h1><p class="price">100 лв.</p></body></html>'
+SEARCH = ('<html><body><div class="css-1sw7q4x"><p data-testid="ad-price">9 500 лв.</p><h6>Opel Astra</h6>'
+          '<a href="/d/ad/opel-astra-CID360-IDq1w2e3.html"></a></div></body></html>')
+
+
+@pytest.fixture
+def base_url(serve):
+    async def page(request):
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def search(request):
+        return web.Response(text=SEARCH, content_type="text/html")
+
+    return serve({"/page": page, "/search": search})
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / "tracked.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return str(path)
+
+
+# --- load_config() ---
+
+def test_load_config(tmp_path):
+    path = write_config(tmp_path, {"tracked": {"https://example.com": ".title"}, "interval": 60})
+    config = cli.load_config(path)
+    assert config["tracked"] == {"https://example.com": [".title"]}
+    assert config["interval"] == 60
+
+
+@pytest.mark.parametrize("config", [{}, {"tracked": {}}, {"tracked": {"https://example.com": []}},
+                                    {"tracked": {"https://example.com": [" "]}},
+                                    {"tracked": {"https://example.com": ".title"}, "proxies": "http://10.0.0.2:3128"}])
+def test_load_config_invalid(tmp_path, config):
+    with pytest.raises(ValueError):
+        cli.load_config(write_config(tmp_path, config))
+
+
+def test_main_bad_config_exit_code(tmp_path):
+    assert cli.main([str(tmp_path / "missing.json"), "--once"]) == 2
+
+
+# --- parse_args() ---
+
+def test_once_defaults_to_stdout():
+    assert cli.parse_args(["c.json", "--once"]).output == "-"
+
+
+def test_periodic_requires_destination():
+    with pytest.raises(SystemExit):
+        cli.parse_args(["c.json"])
+
+
+# --- run() ---
+
+def test_run_once_to_file(tmp_path, base_url):
+    config = {"tracked": {base_url + "/page": [".title", ".price"]}}
+    out = tmp_path / "out.jsonl"
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "-o", str(out)])
+    assert cli.run(args, config) == 0
+    record = json.loads(out.read_text(encoding="utf-8"))
+    assert record["url"] == base_url + "/page"
+    assert record["result"] == {".title": ["Hello"], ".price": ["100 лв."]}
+
+
+def test_run_once_to_store(tmp_path, base_url):
+    config = {"tracked": {base_url + "/page": [".title"]}}
+    db = str(tmp_path / "snapshots.db")
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "--store", db])
+    assert cli.run(args, config) == 0
+    store = SnapshotStore(db)
+    assert list(store.to_dict().values()) == [{base_url + "/page": {".title": ["Hello"]}}]
+    store.close()
+
+
+def test_run_once_metrics_and_profile(tmp_path, base_url):
+    import pstats
+
+    config = {"tracked": {base_url + "/page": [".title"]}}
+    metrics, profile = tmp_path / "tracker.prom", tmp_path / "cycle.prof"
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "-o", str(tmp_path / "out.jsonl"),
+                           "--metrics-file", str(metrics), "--profile", str(profile)])
+    assert cli.run(args, config) == 0
+    assert 'tracker_responses_total{status="200"} 1' in metrics.read_text(encoding="utf-8")
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+
+def test_run_once_stream(tmp_path, base_url):
+    config = {"tracked": {base_url + "/page": [".title"]}}
+    out = tmp_path / "out.jsonl"
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "--stream", "-o", str(out)])
+    assert cli.run(args, config) == 0
+    assert json.loads(out.read_text(encoding="utf-8"))["result"] == {".title": ["Hello"]}
+
+
+def test_run_once_archive(tmp_path, base_url):
+    from archive import HtmlArchive
+
+    config = {"tracked": {base_url + "/page": [".title"]}}
+    path = str(tmp_path / "archive")
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "-o", str(tmp_path / "out.jsonl"),
+                           "--archive", path])
+    assert cli.run(args, config) == 0
+    with HtmlArchive(path) as archive:
+        assert "Hello" in archive.get(base_url + "/page")
+
+
+def test_run_once_failure_exit_code(tmp_path, base_url):
+    config = {"tracked": {base_url + "/missing": [".title"]}}
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "-o", str(tmp_path / "out.jsonl")])
+    assert cli.run(args, config) == 1
+
+
+def test_run_periodic_uses_scheduler(tmp_path, base_url):
+    config = {"tracked": {base_url + "/page": [".title"], base_url + "/missing": [".title"]},
+              "interval": 0.1, "intervals": {base_url + "/missing": 60}}
+    out = tmp_path / "out.jsonl"
+    args = cli.parse_args([write_config(tmp_path, config), "-o", str(out), "--parse-mode", "inline"])
+    stop = threading.Event()
+    threading.Timer(0.5, stop.set).start()
+    assert cli.run(args, config, stop) == 0
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    urls = [record["url"] for record in records]
+    assert urls.count(base_url + "/page") >= 3
+    assert urls.count(base_url + "/missing") <= 1
+
+
+def test_run_periodic_changes_only(tmp_path, base_url):
+    config = {"tracked": {base_url + "/page": [".title"]}, "interval": 0.1}
+    out = tmp_path / "changes.jsonl"
+    db = str(tmp_path / "snapshots.db")
+    args = cli.parse_args([write_config(tmp_path, config), "-o", str(out), "--store", db, "--changes",
+                           "--parse-mode", "inline"])
+    stop = threading.Event()
+    threading.Timer(0.5, stop.set).start()
+    assert cli.run(args, config, stop) == 0
+    # Страницата не се променя: едно събитие и един keyframe, въпреки няколкото извличания
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(r["selector"], r["added"]) for r in records] == [(".title", ["Hello"])]
+    store = SnapshotStore(db)
+    assert len(store) == 1
+    store.close()
+
+
+def test_run_once_crawl(tmp_path, base_url):
+    config = {"tracked": {base_url + "/search": ["h6"]}}
+    out = tmp_path / "ads.jsonl"
+    args = cli.parse_args([write_config(tmp_path, config), "--once", "--crawl", "-o", str(out)])
+    assert cli.run(args, config) == 0
+    ad = json.loads(out.read_text(encoding="utf-8"))
+    assert ad["Price"] == "9 500 лв." and ad["Product/Title"] == "Opel Astra"
+    assert ad["Ad_URL"] == base_url + "/d/ad/opel-astra-CID360-IDq1w2e3.html"
+    assert ad["Source_URL"] == base_url + "/search"
+
+
+def test_run_once_crawl_with_seen_index(tmp_path, base_url):
+    config = {"tracked": {base_url + "/search": ["h6"]}}
+    out = tmp_path / "ads.jsonl"
+    argv = [write_config(tmp_path, config), "--once", "--crawl", "--seen", str(tmp_path / "seen.db"), "-o", str(out)]
+    assert cli.run(cli.parse_args(argv), config) == 0
+    assert cli.run(cli.parse_args(argv), config) == 0
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_run_once_crawl_price_history(tmp_path, base_url):
+    from prices import PriceHistory
+
+    config = {"tracked": {base_url + "/search": ["h6"]}}
+    path = str(tmp_path / "prices.bin")
+    argv = [write_config(tmp_path, config), "--once", "--crawl", "--prices", path, "-o", str(tmp_path / "ads.jsonl")]
+    assert cli.run(cli.parse_args(argv), config) == 0
+    assert cli.run(cli.parse_args(argv), config) == 0
+    history = PriceHistory.load(path)
+    assert history.stats("q1w2e3")["max"] == 9500.0
+    assert len(history.categories[base_url + "/search"]) == 2
+
+
+def test_run_once_crawl_price_history_with_seen_index(tmp_path, base_url):
+    from prices import PriceHistory
+
+    config = {"tracked": {base_url + "/search": ["h6"]}}
+    path = str(tmp_path / "prices.bin")
+    argv = [write_config(tmp_path, config), "--once", "--crawl", "--seen", str(tmp_path / "seen.db"),
+            "--prices", path, "-o", str(tmp_path / "ads.jsonl")]
+    assert cli.run(cli.parse_args(argv), config) == 0
+    assert cli.run(cli.parse_args(argv), config) == 0
+    # Втория път обявата е вече видяна и не се записва в -o, но цената ѝ е наблюдавана отново
+    assert len((tmp_path / "ads.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+    history = PriceHistory.load(path)
+    assert len(history.series("q1w2e3")) == 2
+
+
+# --- lazy imports ---
+
+def test_import_cli_is_light():
+    code = "import sys, cli; print(sorted(m for m in ('aiohttp', 'lxml', 'bs4', 'tracker') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=cli.__file__.rsplit("cli.py", 1)[0] or ".")
+    assert out.stdout.strip() == "[]"
+
+
+def test_import_tracker_defers_aiohttp_and_lxml():
+    code = "import sys, tracker; print(sorted(m for m in ('aiohttp', 'lxml', 'bs4') if m in sys.modules))"
+    # tracker.py не е входна точка: коренът на репото (пакетът exceptions) идва от PYTHONPATH
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=cli.__file__.rsplit("cli.py", 1)[0] or ".", env={**os.environ, "PYTHONPATH": bootstrap.ROOT})
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,142 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+from crawler import Crawler
+from seen import SeenIndex
+from tracker import ClassTracker
+
+CARD = '''
+<div class="css-1sw7q4x">
+    <p data-testid="ad-price">{price} лв.</p>
+    <h6>Обява {ad_id}</h6>
+    <a href="/d/ad/car-CID360-ID{ad_id}.html"></a>
+</div>
+'''
+
+
+def listing(ad_ids: list, per_page: int = 5, prices: dict = None) -> dict:
+    """page number -> html of a newest-first search listing with a pagination bar."""
+    chunks = [ad_ids[i:i + per_page] for i in range(0, len(ad_ids), per_page)] or [[]]
+    bar = "".join(f'<a href="/cars/?search=golf&page={n}">{n}</a>' for n in range(2, len(chunks) + 1))
+    return {
+        page: "<html><body>" + "".join(CARD.format(ad_id=ad_id, price=(prices or {}).get(ad_id, 100)) for ad_id in ids)
+        + f"<nav>{bar}</nav></body></html>"
+        for page, ids in enumerate(chunks, start=1)
+    }
+
+
+@pytest.fixture
+def tracker():
+    tracker = ClassTracker(parse_mode="inline", host_rate=1000, host_burst=1000)
+    yield tracker
+    tracker.close()
+
+
+@pytest.fixture
+def server(serve):
+    """Search results at /cars/?page=N; `pages` is replaced between crawls, `hits` counts pages served."""
+    state = SimpleNamespace(pages={}, hits=Counter(), failures={}, base=None)
+
+    async def handler(request):
+        page = int(request.query.get("page", 1))
+        state.hits[page] += 1
+        await asyncio.sleep(0.01)
+        if state.failures.get(page):
+            return web.Response(status=state.failures[page].pop(0), headers={"Retry-After": "0"})
+        if page not in state.pages:
+            raise web.HTTPNotFound()
+        return web.Response(text=state.pages[page], content_type="text/html")
+
+    state.base = serve({"/cars/": handler}) + "/cars/?search=golf"
+    return state
+
+
+def ids(result) -> list:
+    return [ad.ad_id for ad in result.ads]
+
+
+def test_page_url():
+    assert Crawler.page_url("https://www.olx.bg/cars/?search=golf", 3) == "https://www.olx.bg/cars/?search=golf&page=3"
+    assert Crawler.page_url("https://www.olx.bg/cars/?page=3&q=a", 1) == "https://www.olx.bg/cars/?q=a"
+
+
+def test_full_crawl_discovers_all_pages(tracker, server):
+    server.pages = listing([f"a{i}" for i in range(23)])
+    result = Crawler(tracker).crawl(server.base)
+    assert result.last_page == 5 and result.pages == 5
+    assert ids(result) == [f"a{i}" for i in range(23)]
+    assert not result.errors and not result.stopped_early
+    assert set(server.hits) == {1, 2, 3, 4, 5}
+
+
+def test_incremental_crawl_stops_at_seen_ads(tracker, server):
+    crawler = Crawler(tracker, stop_after_seen=2)
+    server.pages = listing([f"a{i}" for i in range(50)])
+    crawler.crawl(server.base)
+    server.hits.clear()
+
+    server.pages = listing(["n1", "n2"] + [f"a{i}" for i in range(50)])
+    result = crawler.crawl(server.base)
+    assert ids(result) == ["n1", "n2"]
+    assert result.stopped_early and result.pages == 1
+    assert sum(server.hits.values()) == 1
+
+
+def test_incremental_crawl_grows_window(tracker, server):
+    crawler = Crawler(tracker, concurrency=4, stop_after_seen=1)
+    server.pages = listing([f"a{i}" for i in range(10)])
+    crawler.crawl(server.base)
+    server.hits.clear()
+
+    new = [f"n{i}" for i in range(12)]
+    server.pages = listing(new + [f"a{i}" for i in range(10)])
+    result = crawler.crawl(server.base)
+    assert ids(result) == new
+    assert result.pages == 3 and result.stopped_early
+    # Прозорецът расте 1 -> 2 -> 4 страници, затова се изтеглят най-много няколко излишни
+    assert sum(server.hits.values()) <= 5
+
+
+def test_full_refresh_walks_every_page(tracker, server):
+    crawler = Crawler(tracker, stop_after_seen=1)
+    server.pages = listing([f"a{i}" for i in range(12)])
+    crawler.crawl(server.base)
+    server.pages = listing(["n1"] + [f"a{i}" for i in range(12)])
+    result = crawler.crawl(server.base, full=True)
+    assert ids(result) == ["n1"] and result.pages == 3 and not result.stopped_early
+
+
+def test_updated_ads_flow_downstream(tracker, server, tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.db"))
+    server.pages = listing([f"a{i}" for i in range(5)])
+    Crawler(tracker, index).crawl(server.base)
+    # Нов процес, същият индекс: a0 е поевтиняла
+    server.pages = listing(["n1"] + [f"a{i}" for i in range(5)], prices={"a0": 90})
+    result = Crawler(tracker, index).crawl(server.base)
+    assert ids(result) == ["n1", "a0"] and result.ads[1].price == "90 лв."
+    index.close()
+
+
+def test_max_pages(tracker, server):
+    server.pages = listing([f"a{i}" for i in range(30)])
+    result = Crawler(tracker, max_pages=2).crawl(server.base)
+    assert result.last_page == 2 and len(result.ads) == 10
+    assert set(server.hits) == {1, 2}
+
+
+def test_page_error_is_recorded(tracker, server):
+    server.pages = listing([f"a{i}" for i in range(15)])
+    del server.pages[2]
+    result = Crawler(tracker).crawl(server.base)
+    assert ids(result) == [f"a{i}" for i in list(range(5)) + list(range(10, 15))]
+    assert list(result.errors) == [server.base + "&page=2"]
+
+
+def test_first_page_error(tracker, server):
+    result = Crawler(tracker).crawl(server.base)
+    assert result.ads == [] and result.pages == 0
+    assert type(result.errors[server.base]).__name__ == "AutoNotFoundError"
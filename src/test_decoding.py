@@ -0,0 +1,66 @@
+import codecs
+import gzip
+import pickle
+import zlib
+
+import pytest
+
+from decoding import Body, decidable, decompressor, resolve, sniff
+
+PAGE = "<html><head>{meta}</head><body>Цена</body></html>"
+
+
+@pytest.mark.parametrize("head, expected", [
+    ('<meta charset="windows-1251">', "cp1251"),
+    ("<meta http-equiv='Content-Type' content='text/html; charset=UTF-8'>", "utf-8"),
+    ('<meta charset="no-such-codec">', None),
+    ("", None),
+])
+def test_sniff_meta(head, expected):
+    assert sniff(PAGE.format(meta=head).encode("utf-8")) == expected
+
+
+def test_sniff_bom():
+    assert sniff(codecs.BOM_UTF8 + b"<html>") == "utf-8-sig"
+
+
+def test_resolve_order():
+    utf8 = PAGE.format(meta="").encode("utf-8")
+    cp1251 = PAGE.format(meta="").encode("cp1251")
+    assert resolve("utf-8", cp1251) == ("utf-8", "header")
+    assert resolve(None, PAGE.format(meta='<meta charset="windows-1251">').encode("cp1251")) == ("cp1251", "meta")
+    assert resolve(None, utf8) == ("utf-8", "detected")
+    assert resolve(None, cp1251) == ("cp1251", "detected")
+    # Непълен UTF-8 символ в края на първото парче не е грешка
+    assert resolve(None, "Цена".encode("utf-8")[:-1], final=False)[0] == "utf-8"
+
+
+def test_decidable_waits_for_a_byte_that_tells_encodings_apart():
+    assert not decidable(None, b"<html><body>", b"<html><body>")
+    assert decidable("windows-1251", b"<html>", b"<html>")
+    assert not decidable("no-such-codec", b"<html>", b"<html>")
+    assert decidable(None, b"<p>", b'<meta charset="utf-8"><p>')
+    assert decidable(None, "Цена".encode("cp1251"), b"<html>")
+
+
+@pytest.mark.parametrize("name, compress", [
+    ("gzip", gzip.compress), ("deflate", zlib.compress), ("identity", None), (None, None),
+])
+def test_decompressor(name, compress):
+    data = PAGE.encode("utf-8") * 100
+    decompress = decompressor(name)
+    if compress is None:
+        assert decompress is None
+        return
+    packed = compress(data)
+    assert decompress.decompress(packed[:50]) + decompress.decompress(packed[50:]) + decompress.flush() == data
+
+
+def test_unsupported_content_encoding():
+    with pytest.raises(ValueError, match="unsupported Content-Encoding: compress"):
+        decompressor("compress")
+
+
+def test_body_pickles_with_encoding():
+    body = pickle.loads(pickle.dumps(Body("Цена".encode("cp1251"), "cp1251")))
+    assert body.encoding == "cp1251" and body.text() == "Цена" and body.utf8() == "Цена".encode("utf-8")
@@ -0,0 +1,145 @@
+import pytest
+from diff import Change, ChangeDetector, diff_texts
+from store import SnapshotStore
+
+URL = "https://www.olx.bg/cars/"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    yield store
+    store.close()
+
+
+# --- diff_texts() ---
+
+def test_diff_identical():
+    assert diff_texts(["a", "b"], ["a", "b"]) == ([], [], [])
+
+
+def test_diff_added_and_removed():
+    assert diff_texts(["a", "b", "c"], ["new", "a", "c"]) == (["new"], ["b"], [])
+
+
+def test_diff_changed_in_place():
+    assert diff_texts(["Golf 15 900 лв.", "Astra 8 000 лв."], ["Golf 14 500 лв.", "Astra 8 000 лв."]) == \
+        ([], [], [("Golf 15 900 лв.", "Golf 14 500 лв.")])
+
+
+def test_diff_replace_with_extra_items():
+    added, removed, changed = diff_texts(["x"], ["y", "z"])
+    assert changed == [("x", "y")] and added == ["z"] and removed == []
+
+
+def test_diff_from_empty():
+    assert diff_texts([], ["a"]) == (["a"], [], [])
+
+
+# --- ChangeDetector.observe() ---
+
+def test_first_observation_is_all_added():
+    detector = ChangeDetector()
+    changes = detector.observe("t1", URL, {".title": ["a", "b"], ".empty": []})
+    assert changes == [Change("t1", URL, ".title", added=["a", "b"])]
+
+
+def test_unchanged_result_emits_nothing():
+    detector = ChangeDetector()
+    detector.observe("t1", URL, {".title": ["a"]})
+    assert detector.observe("t2", URL, {".title": ["a"]}) == []
+
+
+def test_changed_result():
+    detector = ChangeDetector()
+    detector.observe("t1", URL, {".title": ["a", "b"], ".price": ["1"]})
+    changes = detector.observe("t2", URL, {".title": ["a", "c"], ".price": ["1"]})
+    assert changes == [Change("t2", URL, ".title", changed=[("b", "c")])]
+
+
+def test_failed_fetch_keeps_previous_state():
+    detector = ChangeDetector()
+    detector.observe("t1", URL, {".title": ["a"]})
+    assert detector.observe("t2", URL, None) == []
+    assert detector.observe("t3", URL, {".title": ["a"]}) == []
+
+
+def test_removed_selector():
+    detector = ChangeDetector()
+    detector.observe("t1", URL, {".title": ["a"], ".price": ["1"]})
+    assert detector.observe("t2", URL, {".title": ["a"]}) == [Change("t2", URL, ".price", removed=["1"])]
+
+
+def test_subscribers_get_changes_only():
+    detector = ChangeDetector()
+    events = []
+    detector.subscribe(events.append)
+    detector.observe("t1", URL, {".title": ["a"]})
+    detector.observe("t2", URL, {".title": ["a"]})
+    detector.observe("t3", URL, {".title": ["b"]})
+    assert [[c.timestamp for c in batch] for batch in events] == [["t1"], ["t3"]]
+    detector.unsubscribe(events.append)
+    detector.observe("t4", URL, {".title": ["c"]})
+    assert len(events) == 2
+
+
+def test_change_to_dict():
+    change = Change("t1", URL, ".title", added=["a"], changed=[("b", "c")])
+    assert change.to_dict() == {"timestamp": "t1", "url": URL, "selector": ".title",
+                                "added": ["a"], "removed": [], "changed": [["b", "c"]]}
+
+
+# --- keyframes + deltas ---
+
+def test_persists_keyframe_then_deltas(store):
+    detector = ChangeDetector(store, keyframe_every=50)
+    detector.observe("2026-01-01T00:00", URL, {".title": ["a", "b"], ".price": ["1", "2"]})
+    detector.observe("2026-01-01T00:05", URL, {".title": ["a", "b"], ".price": ["1", "2"]})
+    detector.observe("2026-01-01T00:10", URL, {".title": ["a", "c"], ".price": ["1", "2"]})
+
+    assert store.timestamps() == ["2026-01-01T00:00", "2026-01-01T00:10"]
+    assert store.get("2026-01-01T00:10") == {URL: {".title": ["a", "c"]}}
+    assert store.state_at(URL) == {".title": ["a", "c"], ".price": ["1", "2"]}
+    assert store.state_at(URL, "2026-01-01T00:05") == {".title": ["a", "b"], ".price": ["1", "2"]}
+    assert store.state_at("https://other.com") is None
+
+
+def test_periodic_keyframe(store):
+    detector = ChangeDetector(store, keyframe_every=2)
+    for i in range(5):
+        detector.observe(f"2026-01-01T00:0{i}", URL, {".title": [str(i)], ".static": ["s"]})
+    keyframes = [ts for ts, snapshot in store.items() if ".static" in snapshot[URL]]
+    assert keyframes == ["2026-01-01T00:00", "2026-01-01T00:03"]
+    assert store.state_at(URL) == {".title": ["4"], ".static": ["s"]}
+
+
+def test_storage_reduction_for_static_pages(store):
+    detector = ChangeDetector(store)
+    listing = {".title": [f"ad {i}" for i in range(40)], ".price": [f"{i} лв." for i in range(40)]}
+    for i in range(100):
+        detector.observe(f"2026-01-01T{i // 60:02d}:{i % 60:02d}", URL, listing)
+    assert len(store) == 1
+    assert len(list(store.query())) == 80
+
+
+def test_history(store):
+    detector = ChangeDetector(store)
+    detector.observe("t1", URL, {".price": ["100"]})
+    detector.observe("t2", URL, {".price": ["100"]})
+    detector.observe("t3", URL, {".price": ["90"]})
+    assert list(store.history(URL, ".price")) == [("t1", ["100"]), ("t3", ["90"])]
+
+
+def test_store_migrates_old_schema(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (timestamp TEXT NOT NULL, url TEXT NOT NULL, selector TEXT, "
+                 "position INTEGER, text TEXT)")
+    conn.execute("INSERT INTO results VALUES ('t1', ?, '.title', 0, 'a')", (URL,))
+    conn.commit()
+    conn.close()
+    store = SnapshotStore(path)
+    assert store.state_at(URL) == {".title": ["a"]}
+    store.close()
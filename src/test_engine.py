@@ -0,0 +1,92 @@
+import pytest
+from benchmarks.olx_pages import OLX_SELECTORS, make_page
+from engine import LxmlEngine, SoupEngine, compile_selector, get_engine, valid_selector
+
+
+@pytest.fixture
+def lxml_engine():
+    return LxmlEngine()
+
+
+TRICKY_HTML = """
+<html><body>
+    <div class="card">  Hello <!-- comment --> <b>bold</b>   world
+        <script>var x = 1;</script><style>.a{}</style>
+        <span>  tail  </span> end
+    </div>
+    <ul><li class="item">One</li><li class="item">Two</li><li class="item">Three</li></ul>
+    <a href="/d/ad/x-IDabc.html" title="ad">link</a>
+    <p class="empty"></p>
+    <script class="data">{"json": true}</script>
+</body></html>
+"""
+
+TRICKY_SELECTORS = [
+    ".card",
+    "li.item:nth-child(2)",
+    "li.item, a[href*='/d/ad/']",
+    "a[title=ad]",
+    ".empty",
+    "script.data",
+    ".missing",
+]
+
+
+# --- equivalence with BeautifulSoup ---
+
+@pytest.mark.parametrize("selector", TRICKY_SELECTORS)
+def test_equivalent_to_bs4(lxml_engine, selector):
+    assert lxml_engine.extract(TRICKY_HTML, [selector]) == SoupEngine().extract(TRICKY_HTML, [selector])
+
+
+def test_equivalent_to_bs4_on_olx_page(lxml_engine):
+    html = make_page(cards=20, padding_kb=4)
+    expected = SoupEngine().extract(html, OLX_SELECTORS)
+    assert lxml_engine.extract(html, OLX_SELECTORS) == expected
+    assert len(expected[OLX_SELECTORS[0]]) == 20
+
+
+def test_nested_script_text_skipped(lxml_engine):
+    assert lxml_engine.extract(TRICKY_HTML, [".card"])[".card"] == ["Hello bold world tail end"]
+
+
+# --- compile_selector() ---
+
+def test_compile_selector_is_cached():
+    assert compile_selector("div.cached > p") is compile_selector("div.cached > p")
+
+
+def test_compile_selector_unsupported():
+    assert compile_selector("p:-soup-contains('x')") is None
+
+
+def test_unsupported_selector_falls_back_to_bs4(lxml_engine):
+    html = "<html><body><p>лв. 100</p><p>other</p></body></html>"
+    assert lxml_engine.extract(html, ["p:-soup-contains('лв.')"]) == {"p:-soup-contains('лв.')": ["лв. 100"]}
+
+
+# --- parse edge cases ---
+
+def test_empty_document(lxml_engine):
+    assert lxml_engine.extract("", [".x"]) == {".x": []}
+
+
+def test_xml_declaration(lxml_engine):
+    html = '<?xml version="1.0" encoding="utf-8"?><html><body><p class="x">Здравей</p></body></html>'
+    assert lxml_engine.extract(html, [".x"]) == {".x": ["Здравей"]}
+
+
+# --- get_engine() ---
+
+def test_get_engine():
+    assert get_engine("bs4").name == "bs4"
+    assert get_engine().name == "lxml"
+    with pytest.raises(ValueError):
+        get_engine("nope")
+
+
+@pytest.mark.parametrize("selector, valid", [
+    (".css-1sw7q4x h6", True), ("div:-soup-contains('BMW')", True), ("a[", False), ("", False),
+])
+def test_valid_selector(selector, valid):
+    assert valid_selector(selector) is valid
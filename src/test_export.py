@@ -0,0 +1,110 @@
+import gzip
+import json
+
+import pytest
+import export
+
+DATA = {
+    "2026-01-01T00:00:00": {
+        "https://example.com": {".title": ["Hello {world}"], ".price": ["100 лв.", "200 лв."], ".none": []},
+        "https://down.com": None,
+    },
+    "2026-01-01T00:05:00": {
+        "https://example.com": {".title": ["Hello, \"again\""], ".price": [], ".none": []},
+    },
+}
+
+
+def generate(count):
+    for i in range(count):
+        yield f"2026-01-01T00:{i:02d}:00", {"https://example.com": {".n": [str(i)]}}
+
+
+# --- JSON ---
+
+@pytest.mark.parametrize("name", ["out.json", "out.json.gz"])
+def test_json_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    export.write_json(DATA, path)
+    assert dict(export.read_json(path)) == DATA
+
+
+def test_write_json_matches_json_dump(tmp_path):
+    path = tmp_path / "out.json"
+    export.write_json(iter(DATA.items()), str(path))
+    assert path.read_text(encoding="utf-8") == json.dumps(DATA, ensure_ascii=False, indent=4)
+
+
+def test_write_json_gzip_is_compressed(tmp_path):
+    path = tmp_path / "out.json.gz"
+    export.write_json(DATA, str(path))
+    assert json.loads(gzip.decompress(path.read_bytes())) == DATA
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_read_json_small_chunks(tmp_path, chunk_size):
+    path = tmp_path / "out.json"
+    data = {"a": {"n": 12345678901234567890, "f": -1.5e10, "s": "x}y,z"}, "b": [1, 2, {"c": None}], "c": 42}
+    path.write_text(json.dumps(data), encoding="utf-8")
+    assert dict(export.read_json(str(path), chunk_size=chunk_size)) == data
+
+
+def test_read_json_empty_object(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("  { }  ", encoding="utf-8")
+    assert list(export.read_json(str(path))) == []
+
+
+def test_read_json_not_an_object(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("[1, 2]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(export.read_json(str(path)))
+
+
+def test_read_json_is_lazy(tmp_path):
+    path = tmp_path / "out.json"
+    export.write_json(generate(50), str(path))
+    first = next(export.read_json(str(path), chunk_size=256))
+    assert first == ("2026-01-01T00:00:00", {"https://example.com": {".n": ["0"]}})
+
+
+# --- JSON Lines ---
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.jsonl.gz"])
+def test_jsonl_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    assert export.write_jsonl(DATA, path) == 3
+    assert dict(export.read_jsonl(path)) == DATA
+
+
+def test_jsonl_one_record_per_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    export.write_jsonl(DATA, str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[1]) == {"timestamp": "2026-01-01T00:00:00", "url": "https://down.com", "result": None}
+
+
+# --- CSV ---
+
+@pytest.mark.parametrize("name", ["out.csv", "out.csv.gz"])
+def test_csv_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    assert export.write_csv(DATA, path) == 4
+    assert dict(export.read_csv(path)) == {
+        "2026-01-01T00:00:00": {"https://example.com": {".title": ["Hello {world}"], ".price": ["100 лв.", "200 лв."]}},
+        "2026-01-01T00:05:00": {"https://example.com": {".title": ["Hello, \"again\""]}},
+    }
+
+
+def test_csv_chunked(tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert export.write_csv(generate(25), path, chunk_rows=10) == 25
+    assert len(list(export.read_csv(path))) == 25
+
+
+def test_read_csv_wrong_header(tmp_path):
+    path = tmp_path / "other.csv"
+    path.write_text("a,b\n1,2\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(export.read_csv(str(path)))
@@ -152,4 +152,42 @@ def test_save_to_csv_creates_file(extractor, tmp_path):
     assert test_filename.exists()
     content = test_filename.read_text(encoding="utf-8")
     assert "10 000 лв." in content
-    assert "Test Car" in content
\ No newline at end of file
+    assert "Test Car" in content
+
+
+def test_bulk_extraction_matches_card_methods(extractor):
+    # Страницата се парсва веднъж с lxml; резултатът трябва да съвпада с get_* върху всяка карта
+    from benchmarks.olx_pages import make_page
+
+    html = make_page(cards=20, padding_kb=1)
+    ads = extractor.extract_information_from_page(html)
+    cards = BeautifulSoup(html, "lxml").select("div.css-1sw7q4x")
+    assert len(ads) == len(cards) == 20
+    for ad, card in zip(ads, cards):
+        assert ad["Price"] == extractor.get_price(card)
+        assert ad["Product/Title"] == extractor.get_product(card)
+        assert ad["Ad_URL"] == extractor.get_ad_url(card)
+    assert re.fullmatch(r"\d+ \d{3} лв\.", ads[0]["Price"])  # без вложеното "Договаряне"
+
+
+@pytest.mark.parametrize("price", [
+    '15 900 <span>Договаряне</span>лв.',
+    '<span>Договаряне</span> 15 900 лв.',
+    '<!-- цена -->15 900 лв.',
+    '<span>15 900 лв.</span>',
+])
+def test_bulk_price_matches_get_price(extractor, price):
+    html = ('<div class="css-1sw7q4x"><a href="/d/ad/car-IDabc.html"><h6>Car</h6></a>'
+            f'<p data-testid="ad-price">{price}</p></div>')
+    ad, = extractor.extract_information_from_page(html)
+    card = BeautifulSoup(html, "lxml").select_one("div")
+    assert ad["Price"] == extractor.get_price(card) == "15 900 лв."
+
+
+def test_save_to_csv_records(extractor, tmp_path):
+    extractor.extract_information_from_page(SAMPLE_AD_WITH_PRICE + SAMPLE_AD_BAD_LINK)
+    test_filename = tmp_path / "ads.csv"
+    assert extractor.save_to_csv(filename=str(test_filename)) == 2
+    lines = test_filename.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "Price,Product/Title,Ad_URL,Source_URL,Extracted_At"
+    assert lines[2].startswith("8 000 лв.,Mercedes Old Model,N/A,https://www.olx.bg/dummy/,")
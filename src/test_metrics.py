@@ -0,0 +1,69 @@
+import urllib.request
+
+from metrics import BUCKETS, Histogram, Metrics
+
+
+def test_histogram_quantiles():
+    h = Histogram()
+    for seconds in [0.002] * 90 + [0.3] * 9 + [30]:
+        h.observe(seconds)
+    assert h.count == 100
+    assert h.quantile(0.5) == 0.005
+    assert h.quantile(0.99) == 0.5
+    assert h.quantile(1.0) == BUCKETS[-1]
+
+
+def test_observe_timings_splits_parse_and_selectors():
+    metrics = Metrics()
+    metrics.observe_timings("https://a", {"parse": 0.01, ".title": 0.002})
+    metrics.observe_timings("https://a", {"parse": 0.03, ".title": 0.004})
+    snapshot = metrics.snapshot()
+    assert snapshot["phases"]["parse"]["count"] == 2
+    assert snapshot["selectors"][".title"]["count"] == 2
+    assert snapshot["urls"]["https://a"]["last"] == {"parse": 0.03, ".title": 0.004}
+    metrics.forget("https://a")
+    assert metrics.snapshot()["urls"] == {}
+
+
+def test_prometheus_format():
+    metrics = Metrics()
+    metrics.observe_response("https://a", 200, 1000)
+    metrics.observe_response("https://a", 429, 0)
+    metrics.observe("https://a", "ttfb", 0.02)
+    metrics.observe_timings("https://a", {'div[data-x="1"]': 0.001})
+    metrics.observe_cycle(1.5, 1)
+    metrics.observe_coalesced("inflight")
+    metrics.observe_proxy("10.0.0.2:3128", False, ejected=True)
+    text = metrics.to_prometheus()
+    assert 'tracker_responses_total{status="429"} 1' in text
+    assert "tracker_response_bytes_total 1000" in text
+    assert 'tracker_phase_seconds_bucket{phase="ttfb",le="0.025"} 1' in text
+    assert 'tracker_phase_seconds_count{phase="ttfb"} 1' in text
+    assert 'selector="div[data-x=\\"1\\"]"' in text
+    assert "tracker_last_cycle_seconds 1.5" in text
+    assert 'tracker_coalesced_total{kind="inflight"} 1' in text
+    assert 'tracker_proxy_requests_total{proxy="10.0.0.2:3128",outcome="failed"} 1' in text
+    assert 'tracker_proxy_ejections_total{proxy="10.0.0.2:3128"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_write_prometheus(tmp_path):
+    metrics = Metrics()
+    metrics.observe_cycle(0.5, 3)
+    path = tmp_path / "tracker.prom"
+    metrics.write_prometheus(str(path))
+    assert "tracker_cycles_total 1" in path.read_text(encoding="utf-8")
+    assert [p.name for p in tmp_path.iterdir()] == ["tracker.prom"]
+
+
+def test_serve():
+    metrics = Metrics()
+    metrics.observe_cycle(0.5, 3)
+    server = metrics.serve(port=0)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert "tracker_cycles_total 1" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,103 @@
+import pytest
+
+from extractor import Ad
+from prices import PriceHistory, parse_number, parse_price, parse_prices
+
+SEARCH = "https://www.olx.bg/avtomobili/"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("15 900 лв.", (15900.0, "BGN")),
+    ("9 500 лв.Договаряне", (9500.0, "BGN")),
+    ("1 200 €", (1200.0, "EUR")),
+    ("€ 1 200", (1200.0, "EUR")),
+    ("EUR 1.200,50", (1200.5, "EUR")),
+    ("12.50 лв.", (12.5, "BGN")),
+    ("2 500 $", (2500.0, "USD")),
+    ("Безплатно", (0.0, None)),
+    ("Размяна", (None, None)),
+    ("N/A", (None, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize("number, expected", [
+    ("1,200", 1200.0),
+    ("12,345,678", 12345678.0),
+    ("1 200,50", 1200.5),
+    ("1.200,50", 1200.5),
+    ("1,200.50", 1200.5),
+    ("1,5", 1.5),
+    ("1,20", 1.2),
+    ("1200,500", 1200.5),
+    ("1.200", 1200.0),
+])
+def test_parse_number_separators(number, expected):
+    assert parse_number(number) == expected
+
+
+def test_parse_prices_batch():
+    assert parse_prices(["100 лв.", "100 лв.", "Размяна"]) == [(100.0, "BGN"), (100.0, "BGN"), (None, None)]
+
+
+@pytest.fixture
+def history():
+    history = PriceHistory()
+    history.add_prices(["a", "b", "c"], "2026-01-01 10:00:00", ["10 000 лв.", "5 000 €", "Размяна"], SEARCH)
+    history.add_prices(["a", "b"], "2026-01-02 10:00:00", ["9 000 лв.", "5 000 €"], SEARCH)
+    history.add_prices(["a"], "2026-01-03 10:00:00", ["8 500 лв."], SEARCH)
+    history.add("z", "2026-01-02 12:00:00", 100, "BGN", "https://www.olx.bg/elektronika/")
+    return history
+
+
+def test_stats_and_currency(history):
+    assert len(history) == 6 and history.skipped == 1
+    assert history.stats("a") == {"count": 3, "min": 8500.0, "max": 10000.0, "median": 9000.0, "mean": 9166.666666666666}
+    assert history.stats("b")["max"] == pytest.approx(5000 * 1.95583)
+    assert history.stats("a", start="2026-01-02") == {"count": 2, "min": 8500.0, "max": 9000.0, "median": 8750.0,
+                                                      "mean": 8750.0}
+    assert history.stats("a", start="2027-01-01") is None
+
+
+def test_drops(history):
+    assert history.drops(0.1) == [("a", 10000.0, 8500.0, pytest.approx(-0.15))]
+    assert history.drops(0.2) == []
+    assert history.drops(0.05, since="2026-01-02") == [("a", 9000.0, 8500.0, pytest.approx(-0.0556, abs=1e-4))]
+
+
+def test_aggregate_windows(history):
+    days = history.aggregate(SEARCH, window=86400, start="2026-01-01", end="2026-01-04")
+    assert [(day["start"], day["count"], day["min"], day["max"]) for day in days] == [
+        ("2026-01-01 00:00:00", 2, pytest.approx(9779.15), 10000.0),
+        ("2026-01-02 00:00:00", 2, 9000.0, pytest.approx(9779.15)),
+        ("2026-01-03 00:00:00", 1, 8500.0, 8500.0),
+    ]
+    assert sum(day["count"] for day in history.aggregate(window=86400, start="2026-01-01")) == 6
+
+
+def test_out_of_order_observations_are_sorted():
+    history = PriceHistory()
+    history.add("a", "2026-01-02", 200)
+    history.add("a", "2026-01-01", 100)
+    assert list(history.series("a").amounts) == [100.0, 200.0]
+
+
+def test_add_ads_and_save_load(history, tmp_path):
+    ads = [Ad("7 000 лв.", "Golf", "https://www.olx.bg/d/ad/golf-CID360-IDq1w2.html", SEARCH, "2026-01-04 10:00:00"),
+           Ad("1 лв.", "no id", "N/A", SEARCH, "2026-01-04 10:00:00")]
+    assert history.add_ads(ads) == 1
+    path = str(tmp_path / "prices.bin")
+    history.save(path)
+    loaded = PriceHistory.load(path)
+    assert loaded.skipped == history.skipped == 2
+    assert {ad_id: list(s.amounts) for ad_id, s in loaded.ads.items()} == {
+        ad_id: list(s.amounts) for ad_id, s in history.ads.items()}
+    assert loaded.ad_category == history.ad_category
+    assert loaded.aggregate(SEARCH) == history.aggregate(SEARCH)
+    assert loaded.stats("q1w2")["max"] == 7000.0
+
+
+def test_rejects_unknown_currency():
+    with pytest.raises(ValueError):
+        PriceHistory("USD")
@@ -0,0 +1,116 @@
+import asyncio
+import email.utils
+import time
+
+import pytest
+from ratelimit import HostLimiter, RetryPolicy, TokenBucket, error_for_status, parse_retry_after
+from exceptions import (
+    AutoAuthenticationError,
+    AutoException,
+    AutoNotFoundError,
+    AutoRateLimitError,
+    AutoServerError,
+)
+
+
+# --- parse_retry_after() ---
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("120") == 120.0
+
+
+def test_parse_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < parse_retry_after(when) <= 30
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_parse_retry_after_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+# --- error_for_status() ---
+
+@pytest.mark.parametrize("status, error_type", [
+    (429, AutoRateLimitError),
+    (401, AutoAuthenticationError),
+    (403, AutoAuthenticationError),
+    (404, AutoNotFoundError),
+    (410, AutoNotFoundError),
+    (500, AutoServerError),
+    (503, AutoServerError),
+    (418, AutoException),
+])
+def test_error_for_status(status, error_type):
+    error = error_for_status("https://example.com", status)
+    assert type(error) is error_type
+    assert error.status == status
+    assert error.url == "https://example.com"
+
+
+def test_error_for_status_ok():
+    assert error_for_status("https://example.com", 200) is None
+
+
+def test_rate_limit_error_retry_after():
+    error = error_for_status("https://example.com", 429, {"Retry-After": "7"})
+    assert error.retry_after == 7.0
+
+
+# --- TokenBucket ---
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=100, capacity=3)
+
+    async def take(n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(take(3)) < 0.01
+    assert asyncio.run(take(5)) >= 0.04
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.05)
+    assert 0.04 < bucket.wait_time() <= 0.05
+
+
+def test_token_bucket_pause_earns_no_tokens():
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.pause(0.05)
+    bucket._refill(bucket.blocked_until + 0.1)
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_host_limiter_buckets_per_host():
+    limiter = HostLimiter(rate=1, burst=1, overrides={"fast.com": (50, 5)})
+    assert limiter.bucket("https://a.com/x") is limiter.bucket("https://a.com/y")
+    assert limiter.bucket("https://a.com/x") is not limiter.bucket("https://b.com/x")
+    assert limiter.bucket("https://fast.com/").capacity == 5
+
+
+# --- RetryPolicy ---
+
+def test_retry_policy_retryable():
+    policy = RetryPolicy(attempts=3)
+    assert policy.should_retry(AutoServerError("u", status=500), 0)
+    assert policy.should_retry(AutoRateLimitError("u"), 1)
+    assert not policy.should_retry(AutoServerError("u", status=500), 2)
+    assert not policy.should_retry(AutoNotFoundError("u", status=404), 0)
+
+
+def test_retry_policy_honours_retry_after():
+    assert RetryPolicy(max_delay=60).delay(AutoRateLimitError("u", retry_after=12), 0) == 12
+    # Retry-After над бюджета: не повтаряме по-рано, отколкото сървърът позволява
+    assert not RetryPolicy(max_delay=5).should_retry(AutoRateLimitError("u", retry_after=12), 0)
+    assert RetryPolicy(max_delay=60).should_retry(AutoRateLimitError("u", retry_after=12), 0)
+
+
+def test_retry_policy_exponential_jitter():
+    policy = RetryPolicy(base_delay=1, max_delay=100)
+    for attempt in range(4):
+        delay = policy.delay(AutoServerError("u", status=500), attempt)
+        assert 2 ** attempt / 2 <= delay <= 2 ** attempt
@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from diff import ChangeDetector
+from export import read_jsonl, write_jsonl
+from results import Interner, Result, ResultTable
+
+SNAPSHOT = {
+    "https://example.com": {".title": ["Hello"], ".price": ["100 лв.", "200 лв.", "100 лв."], ".none": []},
+    "https://empty.com": {},
+    "https://down.com": None,
+}
+
+
+@pytest.fixture
+def table():
+    return ResultTable()
+
+
+def test_interner():
+    strings = Interner()
+    assert [strings.intern(s) for s in ["a", "b", "a"]] == [0, 1, 0]
+    assert strings[1] == "b" and len(strings) == 2
+
+
+def test_empty(table):
+    assert not table
+    assert len(table) == 0
+    assert table.to_dict() == {}
+    assert table.get("2026-01-01T00:00:00") is None
+    assert table.latest(3) == []
+
+
+def test_round_trip_is_lossless(table):
+    table.add("2026-01-01T00:00:00", SNAPSHOT)
+    snapshot = table.get("2026-01-01T00:00:00")
+    assert snapshot == SNAPSHOT
+    assert list(snapshot) == list(SNAPSHOT)
+    assert list(snapshot["https://example.com"]) == [".title", ".price", ".none"]
+
+
+def test_add_result_per_url(table):
+    for url, result in SNAPSHOT.items():
+        table.add_result("2026-01-01T00:00:00", url, result)
+    assert table.to_dict() == {"2026-01-01T00:00:00": SNAPSHOT}
+
+
+def test_add_replaces_existing_timestamp(table):
+    table.add("2026-01-01T00:00:00", SNAPSHOT)
+    table.add("2026-01-01T00:00:00", {"https://other.com": {".x": ["y"]}})
+    assert table.get("2026-01-01T00:00:00") == {"https://other.com": {".x": ["y"]}}
+
+
+def test_repeated_results_and_texts_are_stored_once(table):
+    for hour in range(10, 20):
+        table.add(f"2026-01-01T{hour}:00:00", {
+            "https://example.com": {".title": ["Hello"], ".price": [f"{hour} лв."]},
+            "https://static.com": {".title": ["Hello"]},
+        })
+    stats = table.stats()
+    assert stats["snapshots"] == 10 and stats["entries"] == 20
+    assert stats["results"] == 11  # 10 различни цени + една непроменена страница
+    assert stats["urls"] == 2 and stats["selectors"] == 2
+    assert stats["texts"] == 11
+
+
+def test_items_range_and_filters(table):
+    for day in range(1, 6):
+        table.add(f"2026-01-0{day}T00:00:00", {**SNAPSHOT, "https://example.com": {".title": [str(day)]}})
+    assert table.timestamps("2026-01-02", "2026-01-04") == ["2026-01-02T00:00:00", "2026-01-03T00:00:00"]
+    assert [ts for ts, _ in table.items(start="2026-01-04")] == ["2026-01-04T00:00:00", "2026-01-05T00:00:00"]
+    assert list(table.history("https://example.com", ".title", end="2026-01-03")) == [
+        ("2026-01-01T00:00:00", ["1"]), ("2026-01-02T00:00:00", ["2"])]
+    assert list(table.items(url="https://down.com"))[0][1] == {"https://down.com": None}
+
+
+def test_exports_like_a_dict(table, tmp_path):
+    data = {"2026-01-01T00:00:00": SNAPSHOT, "2026-01-02T00:00:00": {"https://example.com": {".title": ["Hi"]}}}
+    table.update(data)
+    path = str(tmp_path / "out.jsonl")
+    assert write_jsonl(table, path) == write_jsonl(data, str(tmp_path / "dict.jsonl"))
+    assert dict(read_jsonl(path)) == data
+
+
+def test_change_detector_deltas_are_kept_as_given(table):
+    changes = ChangeDetector(store=table)
+    changes.observe("t1", "https://example.com", {".title": ["a"], ".price": ["1"]})
+    changes.observe("t2", "https://example.com", {".title": ["a"], ".price": ["2"]})
+    changes.observe("t3", "https://example.com", None)
+    assert table.to_dict() == {
+        "t1": {"https://example.com": {".title": ["a"], ".price": ["1"]}},
+        "t2": {"https://example.com": {".price": ["2"]}},
+        "t3": {"https://example.com": None},
+    }
+    assert table.state_at("https://example.com") == {".title": ["a"], ".price": ["2"]}
+    assert table.state_at("https://example.com", "t1") == {".title": ["a"], ".price": ["1"]}
+    assert dict(table.states(start="t2")) == {
+        "t2": {"https://example.com": {".title": ["a"], ".price": ["2"]}},
+        "t3": {"https://example.com": None},
+    }
+
+
+def test_export_and_import_keep_state(table, tmp_path):
+    changes = ChangeDetector(store=table)
+    changes.observe("t1", "https://example.com", {".a": ["1"], ".b": ["x"]})
+    changes.observe("t2", "https://example.com", {".a": ["2"], ".b": ["x"]})
+    path = str(tmp_path / "out.jsonl")
+    write_jsonl(table.states(), path)
+    restored = ResultTable()
+    restored.update(read_jsonl(path))
+    assert restored.state_at("https://example.com", "t2") == {".a": ["2"], ".b": ["x"]}
+    restored.add_result("t3", "https://example.com", {".a": ["3"]}, keyframe=False)
+    restored.compact()
+    assert restored.state_at("https://example.com") == {".a": ["3"], ".b": ["x"]}
+
+
+def test_result_equality_is_typed():
+    strings = Interner()
+    result = Result(strings.intern("https://example.com"))
+    assert result == Result(0)
+    assert result != 0 and result != "https://example.com"
+
+
+def test_prune_and_compact(table):
+    for day in range(1, 6):
+        table.add(f"2026-01-0{day}T00:00:00", {"https://example.com": {".title": [str(day)]}})
+    assert table.prune(before="2026-01-02") == 1
+    assert table.prune(keep_last=2) == 2
+    assert table.timestamps() == ["2026-01-04T00:00:00", "2026-01-05T00:00:00"]
+    table.compact()
+    assert table.stats()["texts"] == 2 and table.stats()["results"] == 2
+    assert table.latest(1) == [("2026-01-05T00:00:00", {"https://example.com": {".title": ["5"]}})]
+
+def test_prune_past_keyframe_keeps_state(table):
+    changes = ChangeDetector(table)
+    changes.observe("2026-01-01T00:00", "u", {"a": ["1"], "b": ["x"]})
+    changes.observe("2026-01-02T00:00", "u", {"a": ["2"], "b": ["x"]})
+    changes.observe("2026-01-03T00:00", "u", {"a": ["3"], "b": ["x"]})
+    table.prune(before="2026-01-02T00:00")
+    assert table.state_at("u") == {"a": ["3"], "b": ["x"]}
+    assert dict(table.states()) == {
+        "2026-01-02T00:00": {"u": {"a": ["2"], "b": ["x"]}},
+        "2026-01-03T00:00": {"u": {"a": ["3"], "b": ["x"]}},
+    }
+    table.compact()
+    assert table.state_at("u", "2026-01-02T00:00") == {"a": ["2"], "b": ["x"]}
+    table.prune(keep_last=1)
+    assert table.state_at("u") == {"a": ["3"], "b": ["x"]}
+
+
+
+def test_concurrent_write_and_read(table):
+    def writer():
+        for i in range(200):
+            table.add_result(f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}", "https://example.com", {".title": [str(i)]})
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        list(table.items())
+    thread.join()
+    assert len(table) == 200
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from scheduler import Scheduler
+from tracker import ClassTracker
+
+
+@pytest.fixture
+def tracker():
+    tracker = ClassTracker(parse_mode="inline")
+    calls = []
+
+    async def extract_url_async(session, url, timeout=10):
+        calls.append((url, time.time()))
+        await asyncio.sleep(tracker.fake_duration)
+        return {".x": [url]}
+
+    tracker.fake_duration = 0.0
+    tracker.calls = calls
+    tracker.extract_url_async = extract_url_async
+    yield tracker
+    tracker.close()
+
+
+def collect():
+    results = []
+    lock = threading.Lock()
+
+    def on_result(timestamp, url, result):
+        with lock:
+            results.append((timestamp, url, result))
+
+    return results, on_result
+
+
+# --- next_deadline() ---
+
+def test_next_deadline_aligned_to_grid(tracker):
+    scheduler = Scheduler(tracker, None, interval=60)
+    offset = Scheduler.offset("https://a.com", 60)
+    deadline = scheduler.next_deadline("https://a.com", 1_000_000.0)
+    assert 1_000_000.0 < deadline <= 1_000_060.0
+    assert (deadline - offset) % 60 == pytest.approx(0, abs=1e-6)
+
+
+def test_next_deadline_skips_missed(tracker):
+    scheduler = Scheduler(tracker, None, interval=10)
+    first = scheduler.next_deadline("https://a.com", 0)
+    assert scheduler.next_deadline("https://a.com", first + 35) == pytest.approx(first + 40)
+
+
+def test_per_url_interval(tracker):
+    tracker.set_interval("https://slow.com", 86400)
+    scheduler = Scheduler(tracker, None, interval=30)
+    assert scheduler.interval_for("https://slow.com") == 86400
+    assert scheduler.interval_for("https://fast.com") == 30
+
+
+def test_offsets_spread_urls():
+    offsets = sorted(Scheduler.offset(f"https://www.olx.bg/page/{i}/", 300) for i in range(100))
+    assert offsets[0] < 30 and offsets[-1] > 270
+    assert len(set(offsets)) == 100
+
+
+def test_set_interval_rejects_non_positive(tracker):
+    with pytest.raises(ValueError):
+        tracker.set_interval("https://a.com", 0)
+
+
+# --- start_schedule() / stop_schedule() ---
+
+def test_schedule_runs_each_url_on_its_interval(tracker):
+    tracker.add("https://fast.com", ".x")
+    tracker.add("https://slow.com", ".x")
+    tracker.set_interval("https://slow.com", 60)
+    results, on_result = collect()
+    tracker.start_schedule(on_result, interval=0.1, jitter=0)
+    time.sleep(0.65)
+    tracker.stop_schedule()
+
+    fast = [r for r in results if r[1] == "https://fast.com"]
+    assert 5 <= len(fast) <= 7
+    assert all(r[2] == {".x": ["https://fast.com"]} for r in fast)
+    assert len([r for r in results if r[1] == "https://slow.com"]) <= 1
+
+
+def test_schedule_does_not_drift(tracker):
+    tracker.fake_duration = 0.04  # "извличането" отнема 40% от интервала
+    tracker.add("https://a.com", ".x")
+    results, on_result = collect()
+    tracker.start_schedule(on_result, interval=0.1, jitter=0)
+    time.sleep(0.75)
+    tracker.stop_schedule()
+
+    offset = Scheduler.offset("https://a.com", 0.1)
+    starts = [t for _, t in tracker.calls]
+    assert len(starts) >= 6
+    for start in starts:
+        lag = (start - offset) % 0.1
+        assert lag < 0.03  # всяко изпълнение е близо до своя срок, без натрупване
+
+
+def test_stop_cancels_immediately(tracker):
+    tracker.fake_duration = 30
+    tracker.add("https://a.com", ".x")
+    results, on_result = collect()
+    tracker.start_schedule(on_result, interval=0.05, jitter=0)
+    time.sleep(0.15)
+    started = time.monotonic()
+    tracker.stop_schedule()
+    assert time.monotonic() - started < 0.5
+    assert results == []
+    assert len(tracker.calls) == 1  # не се стартира второ извличане, докато първото тече
+
+
+def test_added_and_removed_urls_follow_tracked(tracker):
+    tracker.add("https://a.com", ".x")
+    results, on_result = collect()
+    tracker.start_schedule(on_result, interval=0.1, jitter=0)
+    time.sleep(0.25)
+    tracker.add("https://b.com", ".x")
+    tracker.remove_url("https://a.com")
+    seen_a = len([r for r in results if r[1] == "https://a.com"])
+    time.sleep(0.3)
+    tracker.stop_schedule()
+    assert len([r for r in results if r[1] == "https://a.com"]) == seen_a
+    assert any(r[1] == "https://b.com" for r in results)
+
+
+def test_start_twice_raises(tracker):
+    results, on_result = collect()
+    tracker.start_schedule(on_result)
+    with pytest.raises(RuntimeError):
+        tracker.start_schedule(on_result)
+
+
+def test_close_stops_scheduler(tracker):
+    results, on_result = collect()
+    scheduler = tracker.start_schedule(on_result)
+    tracker.close()
+    assert tracker.scheduler is None
+    assert not scheduler.running
+
+
+def test_unexpected_error_reports_none_and_keeps_schedule(tracker):
+    async def extract_url_async(session, url, timeout=10):
+        tracker.calls.append((url, time.time()))
+        raise ValueError("bug in a parser")
+
+    tracker.extract_url_async = extract_url_async
+    tracker.add("https://a.com", ".x")
+    results, on_result = collect()
+    tracker.start_schedule(on_result, interval=0.05, jitter=0)
+    time.sleep(0.2)
+    tracker.stop_schedule()
+    assert len(results) >= 2  # грешката не спира следващите изпълнения
+    assert all(result is None for _, _, result in results)
+    assert isinstance(tracker.last_errors["https://a.com"], ValueError)
+
+
+def test_wake_and_reschedule_from_other_threads(tracker):
+    tracker.add("https://a.com", ".x")
+    results, on_result = collect()
+    scheduler = tracker.start_schedule(on_result, interval=0.05, jitter=0)
+    stop = threading.Event()
+
+    def poke():
+        while not stop.is_set():
+            scheduler.wake()
+            scheduler.reschedule("https://a.com")
+            time.sleep(0.001)
+
+    def poking(seconds):
+        stop.clear()
+        threads = [threading.Thread(target=poke) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        return threads
+
+    def join(threads):
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    join(poking(0.2))
+    time.sleep(0.2)
+    assert results  # планировчикът продължава след вълната от събуждания
+    threads = poking(0.05)
+    for _ in range(5):
+        tracker.stop_schedule()  # спирането не бива да увисне, докато други нишки го събуждат
+        scheduler = tracker.start_schedule(on_result, interval=0.05, jitter=0)
+        time.sleep(0.02)
+    tracker.stop_schedule()
+    join(threads)
+    scheduler.wake()
+    scheduler.reschedule("https://a.com")  # след stop() - без ефект и без грешка
@@ -0,0 +1,95 @@
+import pytest
+
+from extractor import Ad, Extractor
+from seen import NEW, SEEN, UPDATED, BloomFilter, SeenIndex
+
+
+def ad(ad_id: str, price: str = "1 000 лв.", title: str = "Golf") -> Ad:
+    return Ad(price, title, f"https://www.olx.bg/d/ad/golf-CID360-ID{ad_id}.html", "https://www.olx.bg/cars/",
+              "2026-01-01 00:00:00")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.db"))
+    yield index
+    index.close()
+
+
+# --- BloomFilter ---
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    for i in range(1000):
+        bloom.add(f"id{i}")
+    assert all(f"id{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other{i}" in bloom for i in range(10_000))
+    assert false_positives < 300  # ~1% при 10 бита на ключ
+
+
+# --- SeenIndex ---
+
+def test_observe_statuses(index):
+    assert not index
+    assert index.observe([ad("a"), ad("b")], "t1") == [NEW, NEW]
+    assert index.observe([ad("a"), ad("b", price="900 лв."), ad("c")], "t2") == [SEEN, UPDATED, NEW]
+    assert index.observe([ad("b", price="900 лв.")], "t3") == [SEEN]
+    assert len(index) == 3
+    assert index.get("a") == ("t1", "t2")
+    assert index.get("missing") is None
+
+
+def test_ads_without_id_are_always_new(index):
+    no_id = Ad("1 лв.", "x", "N/A", "https://www.olx.bg/", "t")
+    assert index.observe([no_id], "t1") == [NEW]
+    assert index.observe([no_id], "t2") == [NEW]
+    assert len(index) == 0
+
+
+def test_duplicate_in_batch(index):
+    assert index.observe([ad("a"), ad("a")], "t1") == [NEW, SEEN]
+
+
+def test_persists_across_runs(tmp_path):
+    path = str(tmp_path / "seen.db")
+    index = SeenIndex(path)
+    index.observe([ad(f"id{i}") for i in range(100)], "t1")
+    index.close()
+
+    index = SeenIndex(path)
+    assert "id5" in index and "nope" not in index
+    assert index.observe([ad("id5"), ad("new")], "t2") == [SEEN, NEW]
+    index.close()
+
+
+def test_bloom_grows_with_the_index(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.db"), capacity=100)
+    index.observe([ad(f"id{i}") for i in range(500)], "t1")
+    assert index.bloom.capacity >= 500
+    assert all(f"id{i}" in index for i in range(500))
+    index.close()
+
+
+def test_without_bloom(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.db"), bloom=False)
+    index.observe([ad("a")], "t1")
+    assert "a" in index and "b" not in index
+    index.close()
+
+
+def test_prune(index):
+    index.observe([ad("old")], "2026-01-01")
+    index.observe([ad("fresh")], "2026-03-01")
+    assert index.prune("2026-02-01") == 1
+    assert "old" not in index and "fresh" in index
+    assert index.observe([ad("old")], "2026-03-02") == [NEW]
+
+
+def test_extractor_skips_seen_ads(index):
+    page = ('<div class="css-1sw7q4x"><p data-testid="ad-price">{price}</p><h6>Golf</h6>'
+            '<a href="/d/ad/golf-CID360-IDg1.html"></a></div>')
+    extractor = Extractor("https://www.olx.bg/cars/", index)
+    assert len(extractor.extract_information_from_page(page.format(price="1 000 лв."))) == 1
+    assert extractor.extract_information_from_page(page.format(price="1 000 лв.")) == []
+    assert len(extractor.extract_information_from_page(page.format(price="950 лв."))) == 1
+    assert len(extractor.data) == 2
@@ -0,0 +1,162 @@
+import threading
+
+import pytest
+from diff import ChangeDetector
+from export import read_json, write_json
+from store import SnapshotStore
+
+SNAPSHOT = {
+    "https://example.com": {".title": ["Hello"], ".price": ["100 лв.", "200 лв."], ".none": []},
+    "https://down.com": None,
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    yield store
+    store.close()
+
+
+def test_empty(store):
+    assert not store
+    assert len(store) == 0
+    assert store.to_dict() == {}
+    assert store.get("2026-01-01T00:00:00") is None
+
+
+def test_add_round_trip(store):
+    store.add("2026-01-01T00:00:00", SNAPSHOT)
+    assert store.get("2026-01-01T00:00:00") == SNAPSHOT
+    assert "2026-01-01T00:00:00" in store
+    assert len(store) == 1
+
+
+def test_add_result_per_url(store):
+    for url, result in SNAPSHOT.items():
+        store.add_result("2026-01-01T00:00:00", url, result)
+    assert store.to_dict() == {"2026-01-01T00:00:00": SNAPSHOT}
+
+
+def test_add_replaces_existing_timestamp(store):
+    store.add("2026-01-01T00:00:00", SNAPSHOT)
+    store.add("2026-01-01T00:00:00", {"https://other.com": {".x": ["y"]}})
+    assert store.get("2026-01-01T00:00:00") == {"https://other.com": {".x": ["y"]}}
+
+
+def test_items_range_query(store):
+    for day in range(1, 6):
+        store.add(f"2026-01-0{day}T00:00:00", {"https://example.com": {".title": [str(day)]}})
+    assert store.timestamps("2026-01-02", "2026-01-04") == ["2026-01-02T00:00:00", "2026-01-03T00:00:00"]
+    assert [ts for ts, _ in store.items(start="2026-01-04")] == ["2026-01-04T00:00:00", "2026-01-05T00:00:00"]
+
+
+def test_query_by_url_and_selector(store):
+    store.add("2026-01-01T00:00:00", SNAPSHOT)
+    store.add("2026-01-02T00:00:00", SNAPSHOT)
+    rows = list(store.query(url="https://example.com", selector=".price"))
+    assert [row[3] for row in rows] == ["100 лв.", "200 лв.", "100 лв.", "200 лв."]
+    assert {row[0] for row in rows} == {"2026-01-01T00:00:00", "2026-01-02T00:00:00"}
+
+
+def test_update_from_dict(store):
+    data = {"2026-01-01T00:00:00": SNAPSHOT, "2026-01-02T00:00:00": {"https://example.com": {".title": ["Hi"]}}}
+    store.update(data)
+    assert store.to_dict() == data
+
+
+def test_states_apply_deltas(store):
+    changes = ChangeDetector(store)
+    changes.observe("t1", "https://example.com", {".a": ["1"], ".b": ["x"]})
+    changes.observe("t2", "https://example.com", None)
+    changes.observe("t3", "https://example.com", {".a": ["2"], ".b": ["x"]})
+    assert store.get("t3") == {"https://example.com": {".a": ["2"]}}  # записана е само делтата
+    assert dict(store.states()) == {
+        "t1": {"https://example.com": {".a": ["1"], ".b": ["x"]}},
+        "t2": {"https://example.com": None},
+        "t3": {"https://example.com": {".a": ["2"], ".b": ["x"]}},
+    }
+    assert list(store.states(start="t3")) == [("t3", {"https://example.com": {".a": ["2"], ".b": ["x"]}})]
+
+
+def test_export_and_import_keep_state(store, tmp_path):
+    changes = ChangeDetector(store)
+    changes.observe("t1", "https://example.com", {".a": ["1"], ".b": ["x"]})
+    changes.observe("t2", "https://example.com", {".a": ["2"], ".b": ["x"]})
+    path = str(tmp_path / "export.json")
+    write_json(store.states(), path)
+
+    restored = SnapshotStore(str(tmp_path / "restored.db"))
+    try:
+        restored.update(read_json(path))
+        assert restored.state_at("https://example.com", "t2") == {".a": ["2"], ".b": ["x"]}
+        # Нови делти след вноса се прилагат върху внесеното състояние
+        restored.add_result("t3", "https://example.com", {".a": ["3"]}, keyframe=False)
+        assert restored.state_at("https://example.com") == {".a": ["3"], ".b": ["x"]}
+    finally:
+        restored.close()
+
+
+def test_add_delta_snapshot(store):
+    store.add("t1", {"https://example.com": {".a": ["1"], ".b": ["x"]}})
+    store.add("t2", {"https://example.com": {".a": ["2"]}}, keyframe=False)
+    assert store.state_at("https://example.com") == {".a": ["2"], ".b": ["x"]}
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+    first = SnapshotStore(path)
+    first.add("2026-01-01T00:00:00", SNAPSHOT)
+    first.close()
+    second = SnapshotStore(path)
+    assert second.get("2026-01-01T00:00:00") == SNAPSHOT
+    second.close()
+
+
+def test_prune_before_and_keep_last(store):
+    for day in range(1, 6):
+        store.add(f"2026-01-0{day}T00:00:00", {"https://example.com": {".title": [str(day)]}})
+    assert store.prune(before="2026-01-02") == 1
+    assert store.prune(keep_last=2) == 2
+    assert store.timestamps() == ["2026-01-04T00:00:00", "2026-01-05T00:00:00"]
+    store.compact()
+    assert len(store) == 2
+
+def test_prune_past_keyframe_keeps_state(store):
+    changes = ChangeDetector(store)
+    changes.observe("2026-01-01T00:00", "u", {"a": ["1"], "b": ["x"]})
+    changes.observe("2026-01-02T00:00", "u", {"a": ["2"], "b": ["x"]})
+    changes.observe("2026-01-03T00:00", "u", {"a": ["3"], "b": ["x"]})
+    store.prune(before="2026-01-02T00:00")
+    assert store.state_at("u") == {"a": ["3"], "b": ["x"]}
+    assert dict(store.states()) == {
+        "2026-01-02T00:00": {"u": {"a": ["2"], "b": ["x"]}},
+        "2026-01-03T00:00": {"u": {"a": ["3"], "b": ["x"]}},
+    }
+    store.compact()
+    assert store.state_at("u", "2026-01-02T00:00") == {"a": ["2"], "b": ["x"]}
+    store.prune(keep_last=1)
+    assert store.state_at("u") == {"a": ["3"], "b": ["x"]}
+
+
+
+def test_concurrent_write_and_read(store):
+    def writer():
+        for i in range(50):
+            store.add_result(f"2026-01-01T00:00:{i:02d}", "https://example.com", {".title": [str(i)]})
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        list(store.items())
+    thread.join()
+    assert len(store) == 50
+
+
+def test_latest(store):
+    assert store.latest(3) == []
+    for day in range(1, 6):
+        store.add(f"2026-01-0{day}T00:00:00", {"https://example.com": {".title": [str(day)]}})
+    latest = store.latest(2)
+    assert [ts for ts, _ in latest] == ["2026-01-04T00:00:00", "2026-01-05T00:00:00"]
+    assert latest[-1][1] == {"https://example.com": {".title": ["5"]}}
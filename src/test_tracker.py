@@ -1,13 +1,56 @@
 import pytest
 import asyncio
 import csv
+import gzip
 import json
+from collections import Counter
+from types import SimpleNamespace
+from aiohttp import web
+from ratelimit import RetryPolicy
 from tracker import ClassTracker
 
 
 @pytest.fixture
 def tracker():
-    return ClassTracker()
+    tracker = ClassTracker()
+    yield tracker
+    tracker.close()
+
+
+@pytest.fixture
+def server(serve):
+    """Local aiohttp server.
+
+    pages maps path -> html, delays path -> seconds, failures path -> list of statuses served first;
+    raw maps path -> (body bytes, headers) served as is. request_headers keeps the last request's headers.
+    """
+    pages = {}
+    raw = {}
+    request_headers = {}
+    delays = {}
+    failures = {}
+    hits = Counter()
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        hits[request.path] += 1
+        request_headers[request.path] = request.headers
+        await asyncio.sleep(delays.get(request.path, 0))
+        if request.path in raw:
+            body, headers = raw[request.path]
+            return web.Response(body=body, headers=headers)
+        if failures.get(request.path):
+            return web.Response(status=failures[request.path].pop(0), headers={"Retry-After": "0"})
+        if request.path not in pages:
+            raise web.HTTPNotFound()
+        etag = f'"{hash(pages[request.path])}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=pages[request.path], content_type="text/html", headers={"ETag": etag})
+
+    return SimpleNamespace(base=serve({"/{tail:.*}": handler}), pages=pages, delays=delays, failures=failures,
+                           hits=hits, peers=peers, raw=raw, request_headers=request_headers)
 
 
 # --- add() ---
@@ -104,6 +147,15 @@ def test_extract_strips_whitespace(tracker):
     assert result[".x"] == ["spaced  out"]
 
 
+def test_extract_bs4_engine_matches_lxml(tracker):
+    soup_tracker = ClassTracker(engine="bs4")
+    for t in (tracker, soup_tracker):
+        t.add("https://example.com", ".price")
+        t.add("https://example.com", "h1")
+    assert soup_tracker.extract_from_html("https://example.com", SAMPLE_HTML) == \
+        tracker.extract_from_html("https://example.com", SAMPLE_HTML)
+
+
 # --- extract_all_async() ---
 
 def test_extract_all_async_empty(tracker):
@@ -111,6 +163,384 @@ def test_extract_all_async_empty(tracker):
     assert result == {}
 
 
+# --- extract_all() / persistent loop and session ---
+
+def test_loop_is_persistent(tracker):
+    loop = tracker.loop
+    assert tracker.extract_all() == {}
+    assert tracker.loop is loop
+    assert loop.is_running()
+
+
+def test_extract_all_reuses_session_and_connection(tracker, server):
+    base, pages = server.base, server.pages
+    pages["/a"] = SAMPLE_HTML
+    tracker.add(base + "/a", ".title")
+
+    first = tracker.extract_all()
+    session = tracker._session
+    second = tracker.extract_all()
+
+    assert first == second == {base + "/a": {".title": ["Hello World"]}}
+    assert tracker._session is session
+    assert len(server.peers) == 1  # keep-alive: one TCP connection for both cycles
+
+
+def test_extract_all_on_result_callback(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".title")
+    tracker.add(server.base + "/missing", ".title")
+    seen = {}
+    data = tracker.extract_all(on_result=lambda url, result: seen.__setitem__(url, result))
+    assert seen == data
+
+
+def test_extract_all_missing_page(tracker, server):
+    base = server.base
+    tracker.add(base + "/missing", ".title")
+    assert tracker.extract_all() == {base + "/missing": None}
+    assert tracker.error_summary() == {"AutoNotFoundError": 1}
+    assert server.hits["/missing"] == 1  # 404 is not retried
+
+
+def test_extract_all_retries_rate_limit_and_server_errors(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    server.failures["/a"] = [429, 503]
+    tracker.add(server.base + "/a", ".title")
+    assert tracker.extract_all() == {server.base + "/a": {".title": ["Hello World"]}}
+    assert server.hits["/a"] == 3
+    assert tracker.error_summary() == {}
+
+
+# --- Декодиране ---
+
+CP1251_HTML = "<html><body><h1 class='title'>Цена 15 900 лв.</h1></body></html>"
+
+
+def test_gzip_body_with_meta_charset(tracker, server):
+    html = CP1251_HTML.replace("<body>", "<head><meta charset='windows-1251'></head><body>" + "<p>Обява</p>" * 100)
+    server.raw["/a"] = (gzip.compress(html.encode("cp1251")), {"Content-Type": "text/html", "Content-Encoding": "gzip"})
+    tracker.add(server.base + "/a", ".title")
+    assert tracker.extract_all() == {server.base + "/a": {".title": ["Цена 15 900 лв."]}}
+    assert "gzip" in server.request_headers["/a"]["Accept-Encoding"]
+    metrics = tracker.metrics
+    assert metrics.content_encodings == {"gzip": 1} and metrics.charsets == {"meta": 1}
+    assert metrics.wire_bytes < metrics.bytes
+    assert metrics.native_bytes == metrics.bytes and metrics.decoded_bytes == 0
+
+
+def test_undeclared_encodings_mixed_on_one_host(tracker, server):
+    server.raw["/a"] = (CP1251_HTML.encode("utf-8"), {"Content-Type": "text/html"})
+    server.raw["/b"] = (CP1251_HTML.encode("cp1251"), {"Content-Type": "text/html"})
+    tracker.add(server.base + "/a", ".title")
+    assert tracker.extract_all()[server.base + "/a"] == {".title": ["Цена 15 900 лв."]}
+    # Същият хост, но тази страница не е UTF-8
+    tracker.add(server.base + "/b", ".title")
+    tracker.remove_url(server.base + "/a")
+    assert tracker.extract_all()[server.base + "/b"] == {".title": ["Цена 15 900 лв."]}
+    # И обратно: след cp1251 страница UTF-8 страница не се чете като cp1251
+    tracker.remove_url(server.base + "/b")
+    tracker.add(server.base + "/a", ".title")
+    assert tracker.extract_all()[server.base + "/a"] == {".title": ["Цена 15 900 лв."]}
+    assert tracker.metrics.charsets == {"detected": 3}
+
+
+def test_fetch_decodes_text_for_other_callers(tracker, server):
+    server.raw["/a"] = (CP1251_HTML.encode("cp1251"), {"Content-Type": "text/html; charset=windows-1251"})
+
+    async def fetch():
+        async with tracker.session_scope() as session:
+            return await tracker.fetch(session, server.base + "/a")
+
+    assert tracker.run(fetch()) == CP1251_HTML
+    assert tracker.metrics.decoded_bytes == len(CP1251_HTML.encode("cp1251"))
+
+
+# --- Споделяне на едновременни извличания ---
+
+def test_overlapping_extractions_share_one_fetch(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    server.delays["/a"] = 0.2
+    url = server.base + "/a"
+    tracker.add(url, ".title")
+
+    async def both():
+        async with tracker.session_scope() as session:
+            return await asyncio.gather(tracker.extract_url_async(session, url), tracker.extract_url_async(session, url))
+
+    assert tracker.run(both()) == [{".title": ["Hello World"]}] * 2
+    assert server.hits["/a"] == 1
+    assert tracker.metrics.coalesced == {"inflight": 1}
+
+
+def test_coalesced_callers_get_their_own_results(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    server.delays["/a"] = 0.2
+    url = server.base + "/a"
+    tracker.add(url, ".title")
+    tracker.fresh_for = 60
+
+    async def both():
+        async with tracker.session_scope() as session:
+            return await asyncio.gather(tracker.extract_url_async(session, url), tracker.extract_url_async(session, url))
+
+    first, second = tracker.run(both())
+    first[".title"].append("changed")
+    first["extra"] = []
+    assert second == {".title": ["Hello World"]}
+    third = tracker.run(tracker.extract_url_async(None, url))  # от fresh_for, без заявка
+    third[".title"].clear()
+    assert tracker.run(tracker.extract_url_async(None, url)) == {".title": ["Hello World"]}
+    assert server.hits["/a"] == 1
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    server.delays["/a"] = 0.2
+    url = server.base + "/a"
+    tracker.add(url, ".title")
+
+    async def one_gives_up():
+        async with tracker.session_scope() as session:
+            first = asyncio.ensure_future(tracker.extract_url_async(session, url))
+            second = asyncio.ensure_future(tracker.extract_url_async(session, url))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            return await second
+
+    assert tracker.run(one_gives_up()) == {".title": ["Hello World"]}
+    assert server.hits["/a"] == 1
+
+
+def test_fresh_result_is_reused_within_window(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".title")
+    tracker.fresh_for = 60
+    first = tracker.extract_all()
+    assert tracker.extract_all() == first
+    assert server.hits["/a"] == 1
+    assert tracker.metrics.coalesced == {"fresh": 1}
+
+    tracker.add(server.base + "/a", ".price")  # други селектори - нова заявка
+    tracker.extract_all()
+    assert server.hits["/a"] == 2
+
+
+def test_extract_all_gives_up_after_attempts(server):
+    tracker = ClassTracker(parse_mode="inline", retry=RetryPolicy(attempts=2, base_delay=0.01))
+    server.pages["/a"] = SAMPLE_HTML
+    server.failures["/a"] = [500, 500, 500]
+    tracker.add(server.base + "/a", ".title")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": None}
+        assert tracker.error_summary() == {"AutoServerError": 1}
+        assert server.hits["/a"] == 2
+    finally:
+        tracker.close()
+
+
+def test_extract_all_network_error(tracker):
+    tracker.retry = RetryPolicy(attempts=1)
+    tracker.add("http://127.0.0.1:1/", ".title")
+    assert tracker.extract_all() == {"http://127.0.0.1:1/": None}
+    assert tracker.error_summary() == {"AutoNetworkError": 1}
+
+
+def test_extract_all_not_modified_reuses_result(tracker, server, monkeypatch):
+    base, pages = server.base, server.pages
+    pages["/a"] = SAMPLE_HTML
+    tracker.add(base + "/a", ".title")
+    first = tracker.extract_all()
+
+    monkeypatch.setattr(tracker, "extract_from_html", lambda url, html: pytest.fail("re-parsed"))
+    assert tracker.extract_all() == first
+    assert tracker.page_cache.not_modified == 1
+    assert tracker.page_cache.hit_rate == 0.5
+
+
+def test_extract_all_changed_page_is_reparsed(tracker, server):
+    base, pages = server.base, server.pages
+    pages["/a"] = SAMPLE_HTML
+    tracker.add(base + "/a", ".title")
+    tracker.extract_all()
+    pages["/a"] = SAMPLE_HTML.replace("Hello World", "Changed")
+    assert tracker.extract_all() == {base + "/a": {".title": ["Changed"]}}
+    assert tracker.page_cache.hits == 0
+
+
+def test_extract_all_new_selector_skips_conditional_get(tracker, server):
+    base, pages = server.base, server.pages
+    pages["/a"] = SAMPLE_HTML
+    tracker.add(base + "/a", ".title")
+    tracker.extract_all()
+    tracker.add(base + "/a", ".price")
+    result = tracker.extract_all()[base + "/a"]
+    assert result == {".title": ["Hello World"], ".price": ["100 лв.", "200 лв."]}
+
+
+@pytest.mark.parametrize("parse_mode", ["process", "thread", "inline"])
+def test_parse_modes_agree(server, parse_mode):
+    tracker = ClassTracker(parse_mode=parse_mode, parse_workers=2)
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".price")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": {".price": ["100 лв.", "200 лв."]}}
+    finally:
+        tracker.close()
+
+
+def test_invalid_parse_mode():
+    with pytest.raises(ValueError):
+        ClassTracker(parse_mode="gpu")
+
+
+# --- streaming ---
+
+def test_streaming_matches_buffered_and_uses_cache(server):
+    tracker = ClassTracker(stream=True)
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".price")
+    tracker.add(server.base + "/a", "p:-soup-contains('200')")  # bs4 резервен селектор
+    try:
+        expected = {".price": ["100 лв.", "200 лв."], "p:-soup-contains('200')": ["200 лв."]}
+        assert tracker.extract_all() == {server.base + "/a": expected}
+        assert tracker.extract_all() == {server.base + "/a": expected}
+        assert tracker.page_cache.not_modified == 1
+        assert tracker.metrics.snapshot()["selectors"][".price"]["count"] == 1
+    finally:
+        tracker.close()
+
+
+def test_streaming_decompresses_and_detects_encoding(server):
+    tracker = ClassTracker(stream=True)
+    server.raw["/a"] = (gzip.compress(CP1251_HTML.encode("cp1251")), {"Content-Encoding": "gzip"})
+    tracker.add(server.base + "/a", ".title")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": {".title": ["Цена 15 900 лв."]}}
+        assert tracker.metrics.charsets == {"detected": 1}
+    finally:
+        tracker.close()
+
+
+def test_streaming_waits_for_non_ascii_before_choosing_encoding(server, tmp_path):
+    from archive import HtmlArchive
+
+    tracker = ClassTracker(stream=True)
+    tracker.archive = archive = HtmlArchive(str(tmp_path / "archive"))
+    # Първите 100 KB са само ASCII; windows-1251 байтовете идват в по-късно парче
+    html = CP1251_HTML.replace("<body>", "<body>" + "<p>padding</p>" * 8000)
+    server.raw["/a"] = (html.encode("cp1251"), {"Content-Type": "text/html"})
+    tracker.add(server.base + "/a", ".title")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": {".title": ["Цена 15 900 лв."]}}
+        archive.flush()
+        assert archive.get(server.base + "/a") == html
+    finally:
+        tracker.close()
+
+
+def test_streaming_ascii_page(server):
+    tracker = ClassTracker(stream=True)
+    server.raw["/a"] = (b"<html><body><h1 class='title'>Price 15 900</h1></body></html>", {"Content-Type": "text/html"})
+    tracker.add(server.base + "/a", ".title")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": {".title": ["Price 15 900"]}}
+    finally:
+        tracker.close()
+
+
+def test_streaming_stops_once_every_selector_matched(server):
+    cards = "".join(f'<div class="card"><p class="price">{i} лв.</p></div>' for i in range(20_000))
+    server.pages["/big"] = f"<html><body><h1 class='title'>Обяви</h1>{cards}</body></html>"
+    size = len(server.pages["/big"].encode("utf-8"))
+    tracker = ClassTracker(stream=True, stream_stop_early=True)
+    tracker.add(server.base + "/big", ".title")
+    tracker.add(server.base + "/big", ".price")
+    try:
+        result = tracker.extract_all()[server.base + "/big"]
+        assert result[".title"] == ["Обяви"]
+        assert result[".price"][:2] == ["0 лв.", "1 лв."]
+        assert len(result[".price"]) < 20_000
+        assert tracker.metrics.snapshot()["bytes"] < size / 2
+    finally:
+        tracker.close()
+
+
+def test_streaming_needs_lxml():
+    with pytest.raises(ValueError):
+        ClassTracker(engine="bs4", stream=True)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_max_body_size(server, stream):
+    tracker = ClassTracker(stream=stream, max_body_size=100)
+    server.pages["/a"] = SAMPLE_HTML * 10
+    tracker.add(server.base + "/a", ".title")
+    try:
+        assert tracker.extract_all() == {server.base + "/a": None}
+        assert tracker.error_summary() == {"AutoBodyTooLargeError": 1}
+        assert server.hits["/a"] == 1  # не се опитва отново
+    finally:
+        tracker.close()
+
+
+def test_stream_extract_yields_fast_pages_first(tracker, server):
+    server.pages["/slow"] = SAMPLE_HTML
+    server.pages["/fast"] = SAMPLE_HTML
+    server.delays["/slow"] = 0.3
+    tracker.add(server.base + "/slow", ".title")
+    tracker.add(server.base + "/fast", ".title")
+
+    async def collect():
+        return [url async for url, result in tracker.stream_extract_async()]
+
+    assert tracker.run(collect()) == [server.base + "/fast", server.base + "/slow"]
+    # extract_all() still returns URLs in tracked order
+    assert list(tracker.extract_all()) == [server.base + "/slow", server.base + "/fast"]
+
+
+def test_close_stops_loop(tracker):
+    loop = tracker.loop
+    tracker.extract_all()
+    tracker.close()
+    assert loop.is_closed()
+    assert tracker._session is None
+    tracker.close()  # idempotent
+
+
+# --- metrics ---
+
+def test_metrics_cover_network_and_parse_phases(tracker, server):
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".title")
+    tracker.add(server.base + "/missing", ".title")
+    tracker.extract_all()
+
+    snapshot = tracker.metrics.snapshot()
+    assert snapshot["statuses"] == {200: 1, 404: 1}
+    assert snapshot["bytes"] == len(SAMPLE_HTML.encode("utf-8"))
+    assert snapshot["errors"] == {"AutoNotFoundError": 1}
+    assert snapshot["cycles"] == 1 and snapshot["last_cycle_seconds"] > 0
+    for phase in ("connect", "ttfb", "download", "decode", "parse"):
+        assert snapshot["phases"][phase]["count"] >= 1, phase
+    assert snapshot["selectors"][".title"]["count"] == 1
+    assert set(snapshot["urls"][server.base + "/a"]["last"]) >= {"ttfb", "download", "parse", ".title"}
+    assert "tracker_responses_total{status=\"200\"} 1" in tracker.metrics.to_prometheus()
+    assert "Последен цикъл: 2 URL-а" in tracker.metrics.summary()
+
+
+def test_profile_next_cycle(tracker, server, tmp_path):
+    import pstats
+
+    server.pages["/a"] = SAMPLE_HTML
+    tracker.add(server.base + "/a", ".title")
+    path = str(tmp_path / "cycle.prof")
+    tracker.profile_next_cycle(path)
+    tracker.extract_all()
+    assert pstats.Stats(path).total_calls > 0
+    assert tracker.profile_path is None
+
+
 # --- save_to_json() / load_from_json() ---
 
 def test_json_round_trip(tracker, tmp_path):
@@ -121,6 +551,30 @@ def test_json_round_trip(tracker, tmp_path):
     assert loaded == data
 
 
+def test_save_to_json_streams_from_store(tracker, tmp_path):
+    from store import SnapshotStore
+
+    data = {
+        "2026-01-01T00:00:00": {"https://example.com": {".title": ["Hello"]}},
+        "2026-01-02T00:00:00": {"https://example.com": None},
+    }
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    store.update(data)
+    path = tmp_path / "out.json"
+    tracker.save_to_json(store, str(path))
+    store.close()
+    assert path.read_text(encoding="utf-8") == json.dumps(data, ensure_ascii=False, indent=4)
+
+
+@pytest.mark.parametrize("name", ["out.json", "out.jsonl.gz", "out.csv.gz"])
+def test_iter_from_file_round_trip(tracker, tmp_path, name):
+    data = {"2026-01-01T00:00:00": {"https://example.com": {".title": ["Hello"]}}}
+    path = str(tmp_path / name)
+    save = tracker.save_to_jsonl if ".jsonl" in name else tracker.save_to_csv if ".csv" in name else tracker.save_to_json
+    save(data, path)
+    assert dict(tracker.iter_from_file(path)) == data
+
+
 # --- save_to_csv() ---
 
 def test_save_to_csv(tracker, tmp_path):
@@ -167,6 +621,69 @@ def test_save_to_csv_skips_none(tracker, tmp_path):
 def test_save_fetched_html(tracker, tmp_path, monkeypatch):
     monkeypatch.chdir(tmp_path)
     tracker.save_fetched_html("https://example.com/page", "<html></html>", "2026-01-01T00:00:00")
-    saved = list(tmp_path.glob("saved_htmls/*.html"))
-    assert len(saved) == 1
-    assert saved[0].read_text(encoding="utf-8") == "<html></html>"
\ No newline at end of file
+    tracker.save_fetched_html("https://example.com/page", "<html></html>", "2026-01-01T00:05:00")
+    tracker.archive.flush()
+    assert tracker.archive.get("https://example.com/page", "2026-01-01T00:00:00") == "<html></html>"
+    assert tracker.archive.stats()["blobs"] == 1
+    assert len(list(tmp_path.glob("html_archive/segment-*.pack"))) == 1
+
+
+def test_extract_all_archives_fetched_pages(tracker, server, tmp_path):
+    from archive import HtmlArchive
+
+    tracker.archive = archive = HtmlArchive(str(tmp_path / "archive"))
+    server.pages["/a"] = "<p class='x'>1</p>"
+    tracker.add(server.base + "/a", ".x")
+    tracker.extract_all()
+    tracker.extract_all()  # 304 - няма ново тяло за архивиране
+    archive.flush()
+    assert archive.get(server.base + "/a") == "<p class='x'>1</p>"
+    assert len(archive) == 1
+
+
+def test_archive_errors_do_not_fail_extraction(tracker, server, tmp_path):
+    from archive import HtmlArchive
+
+    tracker.archive = archive = HtmlArchive(str(tmp_path / "archive"))
+    archive._write = lambda *item: 1 / 0
+    server.pages["/a"] = "<p class='x'>1</p>"
+    server.pages["/b"] = "<p class='x'>2</p>"
+    tracker.add(server.base + "/a", ".x")
+    assert tracker.extract_all() == {server.base + "/a": {".x": ["1"]}}
+    tracker.add(server.base + "/b", ".x")
+    assert tracker.extract_all()[server.base + "/b"] == {".x": ["2"]}
+    with pytest.raises(ZeroDivisionError):
+        archive.flush()
+    assert archive.stats()["errors"] == 2
+
+
+# --- Списък с проследявани: add_many(), import_tracked(), export_tracked() ---
+
+def test_add_many_returns_new_pairs(tracker):
+    tracker.add("https://example.com", ".title")
+    added = tracker.add_many([("https://example.com", ".title"), ("https://example.com", ".price"),
+                              ("https://example.org", "h1"), ("https://example.org", "h1")])
+    assert added == [("https://example.com", ".price"), ("https://example.org", "h1")]
+    assert tracker.tracked == {"https://example.com": {".title", ".price"}, "https://example.org": {"h1"}}
+
+
+def test_import_export_tracked(tracker, tmp_path):
+    tracker.add("https://example.com", ".title")
+    tracker.set_interval("https://example.com", 30)
+    path = str(tmp_path / "tracked.csv")
+    assert tracker.export_tracked(path) == 1
+
+    other = ClassTracker()
+    try:
+        assert other.import_tracked(path) == [("https://example.com", ".title")]
+        assert other.intervals == {"https://example.com": 30}
+    finally:
+        other.close()
+
+
+def test_import_tracked_invalid_file_adds_nothing(tracker, tmp_path):
+    path = tmp_path / "pairs.txt"
+    path.write_text("https://example.com .title\nhttps://example.org a[\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 2: invalid selector"):
+        tracker.import_tracked(str(path))
+    assert tracker.tracked == {}
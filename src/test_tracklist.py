@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from tracklist import read_tracked, write_tracked
+
+A = "https://www.olx.bg/avtomobili/"
+B = "https://www.olx.bg/imoti/"
+
+
+def test_read_config_json(tmp_path):
+    path = tmp_path / "tracked.json"
+    path.write_text(json.dumps({"tracked": {A: [".price", "h6"], B: ".title"}, "intervals": {A: 60},
+                                "interval": 300}), encoding="utf-8")
+    pairs, intervals = read_tracked(str(path))
+    assert pairs == [(A, ".price"), (A, "h6"), (B, ".title")]
+    assert intervals == {A: 60}
+
+
+def test_read_pair_list_json(tmp_path):
+    path = tmp_path / "pairs.json"
+    path.write_text(json.dumps([[A, "h6"], [B, "div:-soup-contains('BMW')"]]), encoding="utf-8")
+    assert read_tracked(str(path))[0] == [(A, "h6"), (B, "div:-soup-contains('BMW')")]
+
+
+def test_read_csv_and_text(tmp_path):
+    csv_path = tmp_path / "pairs.csv"
+    csv_path.write_text(f"url,selector,interval\n{A},.css-1sw7q4x h6,30\n{B},.title,\n", encoding="utf-8")
+    assert read_tracked(str(csv_path)) == ([(A, ".css-1sw7q4x h6"), (B, ".title")], {A: 30})
+
+    text_path = tmp_path / "pairs.txt"
+    text_path.write_text(f"# OLX\n{A} .css-1sw7q4x h6\n\n{B}\t.title\n", encoding="utf-8")
+    assert read_tracked(str(text_path)) == ([(A, ".css-1sw7q4x h6"), (B, ".title")], {})
+
+
+def test_invalid_entries_are_all_reported(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text(f"{A},h6\nolx.bg/x,h6\n{A},a[\n{B},h6,-5\n{B}\n", encoding="utf-8")
+    with pytest.raises(ValueError) as error:
+        read_tracked(str(path))
+    message = str(error.value)
+    assert "4 invalid entries" in message
+    assert "row 2: invalid URL" in message and "row 3: invalid selector 'a['" in message
+    assert "row 4: invalid interval '-5'" in message and "row 5: invalid selector None" in message
+
+
+@pytest.mark.parametrize("name", ["out.json", "out.csv", "out.txt", "out.json.gz"])
+def test_write_read_round_trip(tmp_path, name):
+    tracked = {A: {"h6", ".price"}, B: {"p:nth-child(2)"}}
+    path = str(tmp_path / name)
+    assert write_tracked(tracked, path, {A: 45, "https://gone.example": 10}) == 3
+    pairs, intervals = read_tracked(path)
+    assert pairs == [(A, ".price"), (A, "h6"), (B, "p:nth-child(2)")]
+    assert intervals == ({} if name.endswith(".txt") else {A: 45})
+    assert [p.name for p in tmp_path.iterdir()] == [name]
@@ -1,110 +1,686 @@
-import aiohttp
 import asyncio
-import datetime
-import json
-import csv
-from bs4 import BeautifulSoup
+import codecs
+import contextlib
+import functools
+import hashlib
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING
+
+import export
+from cache import PageCache
+from decoding import ACCEPT_ENCODING, SNIFF_BYTES, Body, decidable, decompressor, lxml_can_decode, resolve
+from diff import ChangeDetector
+from engine import StreamParser, extract_page, get_engine
+from metrics import Metrics
+from proxies import ProxyPool
+from ratelimit import HostLimiter, RetryPolicy, error_for_status
+from scheduler import Scheduler
+from exceptions import AutoBodyTooLargeError, AutoException, AutoNetworkError, AutoRateLimitError
+
+if TYPE_CHECKING:
+    # aiohttp се зарежда при първата заявка (виж cli.py - бърз старт без мрежа)
+    import aiohttp
+
+CHUNK_SIZE = 64 * 1024
+
+
+def copy_result(result: dict) -> dict:
+    """A copy of an extraction result that shares no lists with it; None stays None."""
+    return None if result is None else {selector: list(texts) for selector, texts in result.items()}
+
+
+class Flight:
+    """One in-flight extraction of a URL and the number of callers waiting for it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
 
 
 class ClassTracker:
-    def __init__(self):
+    def __init__(self, limit: int = 100, limit_per_host: int = 8, dns_cache_ttl: int = 300,
+                 keepalive_timeout: float = 60.0, engine: str = "lxml", parse_mode: str = "process",
+                 parse_workers: int = None, max_concurrency: int = 32, host_rate: float = 5.0,
+                 host_burst: float = 10.0, retry: RetryPolicy = None, stream: bool = False,
+                 stream_stop_early: bool = False, max_body_size: int = 32 * 2 ** 20, fresh_for: float = 0.0,
+                 proxies=None, proxy_strategy: str = "least-loaded"):
+        if parse_mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown parse mode: {parse_mode!r}")
+        if stream and engine != "lxml":
+            raise ValueError("Streaming parsing needs the lxml engine")
         self.tracked = {}  # dict[str, set[str]]
+        self.engine = get_engine(engine)
+        self.page_cache = PageCache()
+        self.changes = ChangeDetector()  # за потребителите на резултатите: делти и абонамент за промени
+        self.metrics = Metrics()
+        self.profile_path = None  # задава се от profile_next_cycle()
+        self.archive = None  # HtmlArchive: ако е зададен, всяко изтеглено тяло се архивира (виж archive.py)
+
+        # Парсването върви в отделен pool, за да не блокира event loop-а
+        self.parse_mode = parse_mode
+        self.parse_workers = parse_workers
+        self._executor = None
+
+        # stream=True: тялото се парсва на части още докато се изтегля (в loop-а, не в pool-а);
+        # stream_stop_early: спира изтеглянето щом всеки селектор има съвпадение (само първите съвпадения)
+        self.stream = stream
+        self.stream_stop_early = stream_stop_early
+        self.max_body_size = max_body_size  # None - без ограничение
+
+        # Едновременните извличания на един URL (ръчно + периодично) споделят една заявка и парсване;
+        # резултат, по-млад от fresh_for секунди, се връща отново без заявка
+        self.fresh_for = fresh_for
+        self._flights = {}  # dict[(url, frozenset), Flight]
+        self._fresh = {}  # dict[str, (selectors, time.monotonic(), result)]
+
+        # Общ лимит на едновременните заявки, token bucket за всеки хост и повторни опити
+        self.max_concurrency = max_concurrency
+        self.host_limiter = HostLimiter(host_rate, host_burst)
+        self.retry = retry or RetryPolicy()
+        # Изходящи проксита: всяко със собствени сесия, token bucket-и и здраве (виж proxies.py);
+        # без тях заявките излизат направо, през host_limiter
+        if proxies is not None and not isinstance(proxies, ProxyPool):
+            proxies = ProxyPool(proxies, proxy_strategy, host_rate, host_burst)
+        self.proxy_pool = proxies
+        if proxies is not None:
+            proxies.observer = self.metrics.observe_proxy
+        self.last_errors = {}  # dict[str, AutoException] от последния цикъл
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        self.intervals = {}  # dict[str, float] - собствен интервал на URL (иначе този на scheduler-а)
+        self.scheduler = None
+
+        # Настройки на споделения connector (keep-alive, DNS кеш, лимит на хост)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._session = None
 
     def add(self, url: str, selector: str):
         if url not in self.tracked:
             self.tracked[url] = {selector}
+            if self.scheduler is not None:
+                self.scheduler.wake()
             return 1
         if selector in self.tracked[url]:
             return 0
         self.tracked[url].add(selector)
         return 2
 
+    def add_many(self, pairs) -> list:
+        """Add (url, selector) pairs in one go; returns the pairs that were not tracked yet, in order."""
+        added = []
+        new_url = False
+        for url, selector in pairs:
+            selectors = self.tracked.get(url)
+            if selectors is None:
+                selectors = self.tracked[url] = set()
+                new_url = True
+            if selector not in selectors:
+                selectors.add(selector)
+                added.append((url, selector))
+        if new_url and self.scheduler is not None:
+            self.scheduler.wake()
+        return added
+
     def remove_url(self, url: str):
-        return self.tracked.pop(url, None) is not None
+        self.page_cache.discard(url)
+        self._fresh.pop(url, None)
+        self.changes.forget(url)
+        self.metrics.forget(url)
+        removed = self.tracked.pop(url, None) is not None
+        if removed and self.scheduler is not None:
+            self.scheduler.wake()
+        return removed
 
     def remove_selector(self, url: str, selector: str):
         if url in self.tracked and selector in self.tracked[url]:
             self.tracked[url].remove(selector)
             if not self.tracked[url]:
-                del self.tracked[url]
+                self.remove_url(url)
             return True
         return False
 
+    def set_interval(self, url: str, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.intervals[url] = seconds
+        if self.scheduler is not None:
+            self.scheduler.reschedule(url)
+
+    # --- Периодично извличане ---
+
+    def start_schedule(self, on_result, interval: float = 300, jitter: float = 0.1, timeout: int = 10) -> Scheduler:
+        """Start per-URL periodic extraction; on_result(timestamp, url, result) runs on the tracker loop."""
+        if self.scheduler is not None:
+            raise RuntimeError("Scheduler is already running")
+        self.scheduler = Scheduler(self, on_result, interval, jitter, timeout)
+        self.run(self.scheduler.start())
+        return self.scheduler
+
+    def stop_schedule(self):
+        """Cancel the scheduler and any extraction it has in flight."""
+        scheduler, self.scheduler = self.scheduler, None
+        if scheduler is not None:
+            self.run(scheduler.stop())
+
     def extract_from_html(self, url: str, html: str) -> dict:
-        soup = BeautifulSoup(html, "lxml")
-        result = {}
-        for selector in self.tracked[url]:
-            elements = soup.select(selector)
-            print(elements)
-            result[selector] = [el.get_text(separator=" ", strip=True) for el in elements]
-        return result
+        return self.engine.extract(html, self.tracked[url])
 
-    async def fetch(self, session: aiohttp.ClientSession, url: str, timeout: int = 10) -> str:
+    # --- Event loop и сесия ---
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="tracker-loop", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def run(self, coro):
+        loop = self.loop
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("ClassTracker.run() cannot be called from the tracker loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def make_connector(self) -> "aiohttp.TCPConnector":
+        import aiohttp
+
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+
+    def make_session(self, proxy: str = None) -> "aiohttp.ClientSession":
+        import aiohttp
+
+        # Тялото се разкомпресира в read_body / fetch_stream (decoding.py), а не от aiohttp
+        return aiohttp.ClientSession(
+            connector=self.make_connector(), trace_configs=[self.metrics.trace_config()],
+            headers={"Accept-Encoding": ACCEPT_ENCODING}, auto_decompress=False, proxy=proxy,
+        )
+
+    @contextlib.asynccontextmanager
+    async def session_scope(self):
+        # В собствения loop използваме дълготрайната сесия; в чужд loop (напр. asyncio.run) - временна.
+        if asyncio.get_running_loop() is self._loop:
+            if self._session is None or self._session.closed:
+                self._session = self.make_session()
+            yield self._session
+        else:
+            try:
+                async with self.make_session() as session:
+                    yield session
+            finally:
+                if self.proxy_pool is not None:
+                    await self.proxy_pool.close()
+
+    @property
+    def executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        with self._lock:
+            if self._executor is None and self.parse_mode != "inline":
+                if self.parse_mode == "process":
+                    # spawn: работниците не наследяват нишките на loop-а и GUI-то
+                    self._executor = ProcessPoolExecutor(
+                        self.parse_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(self.parse_workers, thread_name_prefix="tracker-parse")
+            return self._executor
+
+    def close(self):
+        if self._loop is not None:
+            self.stop_schedule()
+        with self._lock:
+            loop, thread = self._loop, self._loop_thread
+            executor = self._executor
+            self._loop = self._loop_thread = self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        archive, self.archive = self.archive, None
+        if archive is not None:
+            archive.close()
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            self._session = None
+        if self.proxy_pool is not None:
+            asyncio.run_coroutine_threadsafe(self.proxy_pool.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    # --- Извличане ---
+
+    def check_body_size(self, url: str, size: int):
+        if self.max_body_size is not None and size is not None and size > self.max_body_size:
+            raise AutoBodyTooLargeError(url, f"body larger than {self.max_body_size} bytes")
+
+    def body_decompressor(self, url: str, response: "aiohttp.ClientResponse"):
+        try:
+            return decompressor(response.headers.get("Content-Encoding"))
+        except ValueError as e:
+            raise AutoException(url, str(e)) from None
+
+    async def iter_body(self, url: str, response: "aiohttp.ClientResponse", wire: list):
+        """Yield the decompressed body in chunks, enforcing max_body_size; wire[0] counts bytes received."""
+        import zlib
+
+        self.check_body_size(url, response.content_length)
+        decompress = self.body_decompressor(url, response)
+        size = 0
         try:
-            async with session.get(url, timeout=timeout) as response:
-                response.raise_for_status()
-                return await response.text()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                wire[0] += len(chunk)
+                if decompress is not None:
+                    chunk = decompress.decompress(chunk)
+                size += len(chunk)
+                self.check_body_size(url, size)
+                yield chunk
+            if decompress is not None:
+                chunk = decompress.flush()
+                self.check_body_size(url, size + len(chunk))
+                yield chunk
+        except zlib.error as e:
+            raise AutoNetworkError(url, f"corrupt {response.headers.get('Content-Encoding')} body: {e}") from e
+
+    async def read_body(self, url: str, response: "aiohttp.ClientResponse", wire: list = None) -> bytes:
+        wire = wire if wire is not None else [0]
+        return b"".join([chunk async for chunk in self.iter_body(url, response, wire)])
+
+    async def fetch_page(self, session: "aiohttp.ClientSession", url: str, timeout: int = 10, headers: dict = None,
+                         native: bool = False):
+        """Return (status, text, headers); text is None on 304 Not Modified. Raises AutoException.
+
+        With native=True, a page lxml can decode itself comes back as a decoding.Body (bytes tagged
+        with their encoding) instead of str, so no Python-side decode is done.
+        """
+        import aiohttp
+
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers) as response:
+                if response.status == 304:
+                    self.metrics.observe_response(url, response.status, 0)
+                    return response.status, None, response.headers
+                error = error_for_status(url, response.status, response.headers)
+                if error is not None:
+                    self.metrics.observe_response(url, response.status, 0)
+                    raise error
+                # Като response.text(), но с отделно време за изтегляне и за декодиране
+                start = time.perf_counter()
+                wire = [0]
+                try:
+                    body = await self.read_body(url, response, wire)
+                except AutoBodyTooLargeError:
+                    self.metrics.observe_response(url, response.status, 0)
+                    raise
+                downloaded = time.perf_counter()
+                encoding, source = resolve(response.charset, body)
+                native = native and self.engine.name == "lxml" and lxml_can_decode(encoding)
+                text = Body(body, encoding) if native else body.decode(encoding, errors="replace")
+                self.metrics.observe(url, "download", downloaded - start)
+                self.metrics.observe(url, "decode", time.perf_counter() - downloaded)
+                self.metrics.observe_response(url, response.status, len(body))
+                self.metrics.observe_body(response.headers.get("Content-Encoding", "identity"), wire[0], source)
+                self.metrics.observe_decoded(len(body), native)
+                return response.status, text, response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AutoNetworkError(url, str(e) or e.__class__.__name__) from e
+
+    async def fetch_stream(self, session: "aiohttp.ClientSession", url: str, timeout: int = 10,
+                           headers: dict = None, selectors=()):
+        """Like fetch_page, but each body chunk goes to lxml's incremental parser as it arrives.
+
+        Returns (status, result, headers, digest); result and digest are None on 304. The body is
+        kept in memory only when pages are archived.
+        """
+        import aiohttp
+
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers) as response:
+                if response.status == 304:
+                    self.metrics.observe_response(url, response.status, 0)
+                    return response.status, None, response.headers, None
+                error = error_for_status(url, response.status, response.headers)
+                if error is not None:
+                    self.metrics.observe_response(url, response.status, 0)
+                    raise error
+                parser = transcode = None
+                encoding, source = "utf-8", None
+                digest = hashlib.blake2b(digest_size=16)
+                kept = [] if self.archive is not None else None
+                pending, head = [], b""  # парчета, чакащи кодирането, и началото на страницата за <meta>
+                start = time.perf_counter()
+                parsing = 0.0
+                size, wire = 0, [0]
+
+                def begin(data: bytes, final: bool):
+                    # Кодирането - по заглавието, по <meta> или по първите не-ASCII байтове
+                    encoding, source = resolve(response.charset, data, final)
+                    transcode = None
+                    if not lxml_can_decode(encoding):
+                        transcode = codecs.getincrementaldecoder(encoding)(errors="replace")
+                    return encoding, source, transcode, StreamParser(selectors, "utf-8" if transcode else encoding)
+
+                try:
+                    async for chunk in self.iter_body(url, response, wire):
+                        if not chunk:
+                            continue
+                        size += len(chunk)
+                        digest.update(chunk)
+                        if kept is not None:
+                            kept.append(chunk)
+                        if parser is None:
+                            pending.append(chunk)
+                            if len(head) < SNIFF_BYTES:
+                                head = (head + chunk)[:SNIFF_BYTES]
+                            if not decidable(response.charset, chunk, head):
+                                continue  # засега само ASCII: UTF-8 и windows-1251 го четат еднакво
+                            chunk, pending = b"".join(pending), None
+                            encoding, source, transcode, parser = begin(chunk, final=False)
+                        fed = time.perf_counter()
+                        parser.feed(transcode.decode(chunk).encode("utf-8") if transcode else chunk)
+                        # Архивираме цели страници, затова при архив не спираме по-рано
+                        stop = self.stream_stop_early and kept is None and parser.matched()
+                        parsing += time.perf_counter() - fed
+                        if stop:
+                            response.close()
+                            break
+                    if pending:
+                        # Цялата страница е ASCII - вече се вижда целият отговор
+                        data = b"".join(pending)
+                        encoding, source, transcode, parser = begin(data, final=True)
+                        fed = time.perf_counter()
+                        parser.feed(transcode.decode(data, True).encode("utf-8") if transcode else data)
+                        parsing += time.perf_counter() - fed
+                except AutoBodyTooLargeError:
+                    self.metrics.observe_response(url, response.status, size)
+                    raise
+                downloaded = time.perf_counter()
+                timings = {}
+                root = parser.close() if parser is not None else None
+                result = self.engine.select(root, selectors, timings)
+                timings["parse"] = parsing + time.perf_counter() - downloaded - sum(timings.values())
+                self.metrics.observe(url, "download", downloaded - start - parsing)
+                self.metrics.observe_timings(url, timings)
+                self.metrics.observe_response(url, response.status, size)
+                self.metrics.observe_body(response.headers.get("Content-Encoding", "identity"), wire[0],
+                                          source or "none")
+                self.metrics.observe_decoded(size, transcode is None)
+                if kept is not None:
+                    self.archive.add(url, Body(b"".join(kept), encoding), block=False)
+                return response.status, result, response.headers, digest.hexdigest()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AutoNetworkError(url, str(e) or e.__class__.__name__) from e
+
+    def concurrency_limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def fetch_with_retry(self, session: "aiohttp.ClientSession", url: str, timeout: int = 10,
+                               headers: dict = None, fetch=None):
+        """fetch (default: fetch_page) under the rate and concurrency limits, retrying transient errors.
+
+        With a proxy pool every attempt picks a proxy and goes out through that proxy's session, under
+        its own rate limit; `session` is then not used.
+        """
+        fetch = fetch or self.fetch_page
+        attempt = 0
+        while True:
+            limiter = self.host_limiter
+            try:
+                if self.proxy_pool is None:
+                    await limiter.acquire(url)
+                    async with self.concurrency_limit():
+                        return await fetch(session, url, timeout, headers)
+                proxy = self.proxy_pool.pick(url)
+                limiter = proxy.limiter
+                with self.proxy_pool.using(proxy):
+                    await limiter.acquire(url)
+                    async with self.concurrency_limit():
+                        return await fetch(self.proxy_pool.session(proxy, self.make_session), url, timeout, headers)
+            except AutoException as e:
+                if not self.retry.should_retry(e, attempt):
+                    if isinstance(e, AutoRateLimitError) and e.retry_after is not None:
+                        # Retry-After важи за хоста и когато не повтаряме заявката
+                        limiter.bucket(url).pause(e.retry_after)
+                    raise
+                delay = self.retry.delay(e, attempt)
+                if isinstance(e, AutoRateLimitError):
+                    limiter.bucket(url).pause(delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def fetch(self, session: "aiohttp.ClientSession", url: str, timeout: int = 10) -> str:
+        try:
+            return (await self.fetch_page(session, url, timeout))[1]
         except Exception:
             return None
 
-    async def extract_all_async(self, timeout: int = 10) -> dict:
+    async def parse_async(self, html, selectors, url: str = None) -> dict:
+        """Parse in the pool; with `url`, parse and per-selector timings go to `metrics`."""
+        executor = self.executor
+        if executor is None:
+            result, timings = extract_page(self.engine.name, html, selectors, True)
+        else:
+            loop = asyncio.get_running_loop()
+            result, timings = await loop.run_in_executor(
+                executor, extract_page, self.engine.name, html, tuple(selectors), True
+            )
+        if url is not None:
+            self.metrics.observe_timings(url, timings)
+        return result
+
+    async def extract_url_async(self, session: "aiohttp.ClientSession", url: str, timeout: int = 10) -> dict:
+        """Fetch and parse `url`; None if it failed (the error is in last_errors).
+
+        Calls for the same URL and selectors that overlap on the tracker loop share one fetch and
+        parse, and a result younger than `fresh_for` seconds is returned without a request; each
+        caller gets its own copy of the result.
+        """
+        selectors = frozenset(self.tracked[url])
+        fresh = self._fresh.get(url)
+        if fresh is not None and fresh[0] == selectors and time.monotonic() - fresh[1] < self.fresh_for:
+            self.metrics.observe_coalesced("fresh")
+            return copy_result(fresh[2])
+        if asyncio.get_running_loop() is not self._loop:
+            # Чужд loop (напр. asyncio.run) има собствена сесия за кратко - не споделяме заявки с него
+            return copy_result(await self._extract_url(session, url, selectors, timeout))
+
+        key = (url, selectors)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = Flight(
+                asyncio.ensure_future(self._extract_url(session, url, selectors, timeout))
+            )
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.metrics.observe_coalesced("inflight")
+        flight.waiters += 1
+        try:
+            # shield: отказът на един от чакащите не прекъсва извличането за останалите;
+            # всеки чакащ получава свое копие, за да не вижда промените на другите
+            return copy_result(await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    async def _extract_url(self, session: "aiohttp.ClientSession", url: str, selectors: frozenset,
+                           timeout: int) -> dict:
+        result = await self._fetch_and_parse(session, url, selectors, timeout)
+        if result is not None and self.fresh_for > 0:
+            self._fresh[url] = (selectors, time.monotonic(), result)
+        return result
+
+    async def _fetch_and_parse(self, session: "aiohttp.ClientSession", url: str, selectors: frozenset,
+                               timeout: int) -> dict:
+        headers = self.page_cache.request_headers(url, selectors)
+        try:
+            if self.stream:
+                fetch = functools.partial(self.fetch_stream, selectors=tuple(selectors))
+                status, result, headers, digest = await self.fetch_with_retry(session, url, timeout, headers, fetch)
+            else:
+                # native: страницата стига до lxml като байтове, без декодиране в Python
+                fetch = functools.partial(self.fetch_page, native=True)
+                status, html, headers = await self.fetch_with_retry(session, url, timeout, headers, fetch)
+        except AutoException as e:
+            self.last_errors[url] = e
+            self.metrics.observe_error(url, e)
+            return None
+
+        if self.stream:
+            # Тялото вече е парсвано по време на изтеглянето; кешът дава предишния резултат при 304
+            cached = self.page_cache.lookup(url, selectors, None, headers, digest)
+            if cached is not None or result is None:
+                return cached
+            self.page_cache.store(url, selectors, headers, None, result, digest)
+            return result
+
+        if html is not None and self.archive is not None:
+            self.archive.add(url, html, block=False)
+        # 304 или същото тяло -> връщаме предишния резултат без парсване
+        result = self.page_cache.lookup(url, selectors, html, headers)
+        if result is not None or html is None:
+            return result
+        result = await self.parse_async(html, selectors, url)
+        self.page_cache.store(url, selectors, headers, html, result)
+        return result
+
+    async def stream_extract_async(self, timeout: int = 10):
+        """Yield (url, result) as each page is fetched and parsed, fastest first."""
+        if not self.tracked:
+            return
+        self.last_errors = {}
+
+        async def job(url):
+            return url, await self.extract_url_async(session, url, timeout)
+
+        async with self.session_scope() as session:
+            tasks = [asyncio.ensure_future(job(url)) for url in list(self.tracked)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def extract_all_async(self, timeout: int = 10, on_result=None) -> dict:
+        """Extract every tracked URL; on_result(url, result) is called as each one completes."""
         all_data = {}
         if not self.tracked:
             return all_data
 
-        timestamp = datetime.datetime.now().isoformat()
+        order = list(self.tracked)
+        profiler = None
+        if self.profile_path is not None:
+            import cProfile
 
-        async with aiohttp.ClientSession() as session:
-            fetch_coroutines = [self.fetch(session, url, timeout) for url in self.tracked]
-            html_pages = await asyncio.gather(*fetch_coroutines)
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            async for url, result in self.stream_extract_async(timeout):
+                all_data[url] = result
+                if on_result is not None:
+                    on_result(url, result)
+        finally:
+            self.metrics.observe_cycle(time.perf_counter() - start, len(all_data))
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+                self.profile_path = None
+        return {url: all_data[url] for url in order if url in all_data}
 
-            for url, html in zip(self.tracked.keys(), html_pages):
-                if html is not None:
-                    all_data[url] = self.extract_from_html(url, html)
-                else:
-                    all_data[url] = None
+    def extract_all(self, timeout: int = 10, on_result=None) -> dict:
+        return self.run(self.extract_all_async(timeout, on_result))
 
-        return all_data
+    def profile_next_cycle(self, path: str):
+        """cProfile the event loop thread during the next extract_all cycle and dump the stats to `path`.
 
-    def save_fetched_html(self, url: str, html: str, timestamp: str):
-        import os
+        Parsing in the process pool is not included; use parse_mode="inline" to profile it too.
+        """
+        self.profile_path = path
 
-        safe_url = url.removeprefix("https://").removeprefix("http://")
-        for invalid in r'\/:*?"<>|':
-            safe_url = safe_url.replace(invalid, "_")
-        safe_url = safe_url[:150]
-        if not safe_url:
-            safe_url = "unknown_url"
+    def error_summary(self) -> dict:
+        """Number of failed URLs in the last cycle by exception type."""
+        return dict(Counter(type(e).__name__ for e in self.last_errors.values()))
 
-        timestamp_safe = timestamp.replace(":", "_").replace(".", "_")
+    def save_fetched_html(self, url: str, html: str, timestamp: str = None):
+        """Queue a raw page for the HtmlArchive in `archive` (html_archive/ if none was set)."""
+        if self.archive is None:
+            from archive import HtmlArchive
 
-        filename = f"{safe_url}_{timestamp_safe}.html"
-        folder = "saved_htmls"
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, filename)
+            self.archive = HtmlArchive()
+        self.archive.add(url, html, timestamp)
 
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(html)
-            print(f"[DEBUG] Saved HTML for {url} at {path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to save HTML for {url}: {e}")
+    def backfill(self, source: str, output: str, **kwargs) -> dict:
+        """Re-extract the saved pages of the tracked URLs with their current selectors (see backfill.py)."""
+        from backfill import backfill
+
+        kwargs.setdefault("engine", self.engine.name)
+        kwargs.setdefault("workers", self.parse_workers)
+        return backfill(source, output, tracked=self.tracked, **kwargs)
+
+    def import_tracked(self, filename: str) -> list:
+        """Add the URL/selector pairs (and intervals) of a .json, .csv or text list; see tracklist.py.
+
+        The whole file is validated first: if any entry is invalid, ValueError is raised and nothing
+        is added. Returns the pairs that were new.
+        """
+        from tracklist import read_tracked
+
+        pairs, intervals = read_tracked(filename)
+        added = self.add_many(pairs)
+        for url, seconds in intervals.items():
+            self.set_interval(url, seconds)
+        return added
 
-    def save_to_json(self, data: dict, filename: str):
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+    def export_tracked(self, filename: str) -> int:
+        """Write the tracked pairs (and intervals) in the format of the file name; returns the pair count."""
+        from tracklist import write_tracked
+
+        return write_tracked(self.tracked, filename, self.intervals)
+
+    def save_to_json(self, data, filename: str):
+        # data е dict, SnapshotStore или поток от (timestamp, snapshot); .gz се компресира
+        export.write_json(data, filename)
 
     def load_from_json(self, filename: str) -> dict:
-        with open(filename, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def save_to_csv(self, data: dict, filename: str):
-        with open(filename, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["timestamp", "url", "selector", "text"])
-            for timestamp, urls in data.items():
-                for url, selectors in urls.items():
-                    if selectors:
-                        for selector, texts in selectors.items():
-                            for text in texts:
-                                writer.writerow([timestamp, url, selector, text])
\ No newline at end of file
+        return dict(export.read_json(filename))
+
+    def save_to_jsonl(self, data, filename: str) -> int:
+        return export.write_jsonl(data, filename)
+
+    def save_to_csv(self, data, filename: str) -> int:
+        return export.write_csv(data, filename)
+
+    def iter_from_file(self, filename: str):
+        """Stream (timestamp, snapshot) pairs from a .json, .jsonl or .csv export (optionally .gz)."""
+        name = filename.removesuffix(".gz")
+        if name.endswith(".jsonl"):
+            return export.read_jsonl(filename)
+        if name.endswith(".csv"):
+            return export.read_csv(filename)
+        return export.read_json(filename)
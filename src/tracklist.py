@@ -0,0 +1,156 @@
+"""Bulk import / export of tracked URL + selector pairs.
+
+The format follows the file name (a trailing .gz is compressed):
+
+- .json -- the cli.py config: {"tracked": {url: [selectors]}, "intervals": {url: seconds}};
+  a bare {url: [selectors]} mapping or a list of [url, selector] pairs is read too
+- .csv  -- url,selector[,interval] rows; the header row is optional
+- anything else -- one "url selector" pair per line; blank lines and # comments are skipped
+"""
+import csv
+import json
+import os
+from urllib.parse import urlsplit
+
+from engine import valid_selector
+from export import open_text
+
+# Колко от грешките да се изброят в съобщението на ValueError
+MAX_REPORTED_ERRORS = 10
+
+
+def file_format(filename: str) -> str:
+    name = str(filename).removesuffix(".gz")
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(".csv"):
+        return "csv"
+    return "text"
+
+
+def valid_url(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+
+# --- Четене ---
+
+def json_entries(data):
+    """Yield (where, url, selector, interval) from a parsed .json document."""
+    if isinstance(data, list):
+        for number, pair in enumerate(data, 1):
+            if not isinstance(pair, list) or len(pair) != 2:
+                yield f"entry {number}", pair, None, None
+            else:
+                yield f"entry {number}", pair[0], pair[1], None
+        return
+    if not isinstance(data, dict):
+        raise ValueError("expected an object or a list of [url, selector] pairs")
+    tracked = data["tracked"] if "tracked" in data else data
+    intervals = (data.get("intervals") or {}) if "tracked" in data else {}
+    if not isinstance(tracked, dict) or not isinstance(intervals, dict):
+        raise ValueError("'tracked' and 'intervals' must be objects")
+    for url, selectors in tracked.items():
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        if not isinstance(selectors, list) or not selectors:
+            yield url, url, None, None
+            continue
+        for selector in selectors:
+            yield url, url, selector, intervals.get(url)
+
+
+def csv_entries(f):
+    for number, row in enumerate(csv.reader(f), 1):
+        if not row or (number == 1 and row[0].strip().lower() == "url"):
+            continue
+        yield f"row {number}", row[0], row[1] if len(row) > 1 else None, row[2] if len(row) > 2 else None
+
+
+def text_entries(f):
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        # URL-ът няма интервали, а селекторът може да има: делим по първия
+        url, *selector = line.split(None, 1)
+        yield f"line {number}", url, selector[0] if selector else None, None
+
+
+def read_tracked(filename: str) -> tuple:
+    """Read and validate a whole list in one pass: ([(url, selector)], {url: interval}).
+
+    Raises ValueError naming the invalid entries (bad URL, selector or interval) if there are any,
+    so a bad file adds nothing.
+    """
+    kind = file_format(filename)
+    with open_text(filename) as f:
+        if kind == "json":
+            try:
+                entries = list(json_entries(json.load(f)))
+            except ValueError as e:
+                raise ValueError(f"{filename}: {e}") from None
+        else:
+            entries = list(csv_entries(f) if kind == "csv" else text_entries(f))
+
+    pairs, intervals, errors = [], {}, []
+    for where, url, selector, interval in entries:
+        url = url.strip() if isinstance(url, str) else url
+        selector = selector.strip() if isinstance(selector, str) else selector
+        if not isinstance(url, str) or not valid_url(url):
+            errors.append(f"{where}: invalid URL {url!r}")
+            continue
+        if not isinstance(selector, str) or not selector or not valid_selector(selector):
+            errors.append(f"{where}: invalid selector {selector!r}")
+            continue
+        if interval not in (None, ""):
+            try:
+                seconds = float(interval)
+                if not seconds > 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append(f"{where}: invalid interval {interval!r}")
+                continue
+            intervals[url] = int(seconds) if seconds.is_integer() else seconds
+        pairs.append((url, selector))
+
+    if errors:
+        shown = "; ".join(errors[:MAX_REPORTED_ERRORS])
+        more = f" (+{len(errors) - MAX_REPORTED_ERRORS} more)" if len(errors) > MAX_REPORTED_ERRORS else ""
+        raise ValueError(f"{filename}: {len(errors)} invalid entries: {shown}{more}")
+    return pairs, intervals
+
+
+# --- Запис ---
+
+def write_tracked(tracked: dict, filename: str, intervals: dict = None) -> int:
+    """Write {url: selectors} (and per-URL intervals, except in the text format); returns the pair count.
+
+    Selectors are written sorted. The file is replaced atomically, so an interrupted write keeps the old list.
+    """
+    kind = file_format(filename)
+    intervals = {url: seconds for url, seconds in (intervals or {}).items() if url in tracked}
+    count = 0
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open_text(tmp, "w", compress=str(filename).endswith(".gz")) as f:
+        if kind == "json":
+            data = {"tracked": {url: sorted(selectors) for url, selectors in tracked.items()}}
+            if intervals:
+                data["intervals"] = intervals
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            count = sum(len(selectors) for selectors in tracked.values())
+        elif kind == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["url", "selector", "interval"])
+            for url, selectors in tracked.items():
+                interval = intervals.get(url, "")
+                rows = [(url, selector, interval) for selector in sorted(selectors)]
+                writer.writerows(rows)
+                count += len(rows)
+        else:
+            for url, selectors in tracked.items():
+                lines = [f"{url} {selector}\n" for selector in sorted(selectors)]
+                f.writelines(lines)
+                count += len(lines)
+    os.replace(tmp, filename)
+    return count